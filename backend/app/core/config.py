@@ -10,12 +10,53 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30 * 24 * 60  # 30 days
     
+    # Authentication caches (per worker process)
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    AUTH_TOKEN_CACHE_TTL: int = 300  # Seconds a verified token skips signature checks
+    AUTH_USER_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_TTL: int = 30  # Bounds how stale another worker's change can be
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # bcrypt threads; defaults to CPU count - 1
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # Hashes waiting for a thread before logins get 503
+    
     # CORS
     CORS_ORIGINS: Optional[str] = None
     
     # File Upload
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: list = [".jpg", ".jpeg", ".png", ".gif"]
+    UPLOAD_DIR: str = "uploads"
+    IMAGE_WORKERS: int = 2  # Processes rendering thumbnails and WebP/AVIF variants
+    
+    # Adoption posters (falls back to Pillow's built-in font if missing)
+    POSTER_WORKERS: int = 2
+    POSTER_FONT: str = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+    POSTER_FONT_BOLD: str = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+    
+    # External photo mirroring
+    PHOTO_MIRROR_CONCURRENCY: int = 8  # Simultaneous downloads per sync
+    PHOTO_MIRROR_RETENTION_DAYS: int = 30  # Keep photos of dogs unseen for this long
+    
+    # Bulk dog imports: valid rows inserted per transaction, and most rows read from one file
+    DOG_IMPORT_BATCH_SIZE: int = 1000
+    DOG_IMPORT_MAX_ROWS: int = 500000
+    
+    # Admin dashboard counters are recounted from the tables this often, to correct drift
+    STATS_RECONCILE_MINUTES: int = 60
+    
+    # Analytics rollups: refreshed this often, backfilled and rebuilt this many days per transaction
+    ANALYTICS_ROLLUP_MINUTES: int = 60
+    ANALYTICS_CHUNK_DAYS: int = 30
+    
+    # Requests running more queries than this are logged (likely an N+1)
+    QUERY_COUNT_WARN: int = 50
+    
+    # Slow-query log and request profiler; admins toggle them at runtime in /auth/admin/diagnostics
+    SLOW_QUERY_LOG: bool = False
+    SLOW_QUERY_MS: int = 200  # Statements slower than this are logged with their query plan
+    SLOW_QUERY_LOG_SIZE: int = 200  # Slow queries kept in memory
+    PROFILE_SAMPLE_RATE: int = 0  # Profile 1 in N requests; 0 disables sampling
+    PROFILE_HEADER: bool = False  # Profile requests sent with an X-Profile header
+    PROFILE_KEEP: int = 20  # Profiles kept in memory
     
     # App
     APP_NAME: str = "FosterDogs"
@@ -1,12 +1,17 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
 
-# Create SQLite engine
+# Create SQLite engine. Async endpoints query on the event loop and keep their
+# connection until the request ends, so a bounded pool deadlocks under load: the
+# loop blocks waiting for a connection that only the loop can release. Opening a
+# SQLite connection is cheap, so don't pool them.
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Only needed for SQLite
+    connect_args={"check_same_thread": False},  # Only needed for SQLite
+    poolclass=NullPool
 )
 
 # Create SessionLocal class
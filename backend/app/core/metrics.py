@@ -0,0 +1,228 @@
+from threading import Lock
+from typing import Dict, List, Sequence, Tuple
+from app.core.query_counter import count_queries
+import abc
+import math
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # PlainTextResponse appends the charset
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SCRAPER_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(abc.ABC):
+    """A metric family; samples are keyed by label values in `labelnames` order"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every sample; called with the lock held"""
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> [per-bucket counts, sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def total(self, **labels) -> Tuple[float, int]:
+        """(sum, count) observed so far for one label set"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+        return (state[1], state[2]) if state else (0.0, 0)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics of this worker process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+http_requests = metrics.counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte", ("method", "route"))
+http_requests_in_progress = metrics.gauge(
+    "http_requests_in_progress", "Requests currently being served")
+http_response_size = metrics.histogram(
+    "http_response_size_bytes", "Response body size", ("method", "route"), buckets=SIZE_BUCKETS)
+db_queries_per_request = metrics.histogram(
+    "db_queries_per_request", "SQL statements executed per request", ("method", "route"), buckets=QUERY_BUCKETS)
+db_query_seconds_per_request = metrics.histogram(
+    "db_query_seconds_per_request", "Time spent executing SQL per request", ("method", "route"))
+scraper_stage_duration = metrics.histogram(
+    "scraper_stage_duration_seconds", "External shelter sync time by stage", ("shelter", "integration", "stage"),
+    buckets=SCRAPER_BUCKETS)
+scraper_syncs = metrics.counter(
+    "scraper_syncs_total", "External shelter syncs by outcome", ("shelter", "integration", "result"))
+
+
+class MetricsMiddleware:
+    """Records latency, response size and SQL per request, labelled by route template.
+
+    Routes are resolved after the request: Starlette stores the matched endpoint in
+    the scope, which maps back to its path template (`/dogs/{dog_id}`), keeping label
+    cardinality bounded. Unmatched paths are reported as "unmatched".
+    """
+
+    def __init__(self, app, routes_app=None):
+        self.app = app
+        self.routes_app = routes_app
+        self._templates: Dict[object, str] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if not self._templates and self.routes_app is not None:
+            for route in self.routes_app.routes:
+                target = getattr(route, "endpoint", None) or getattr(route, "app", None)
+                self._templates.setdefault(target, route.path)
+        return self._templates.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        http_requests_in_progress.inc()
+        started = time.perf_counter()
+        try:
+            with count_queries() as queries:
+                await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_progress.dec()
+            method, route = scope["method"], self._route(scope)
+            http_requests.inc(method=method, route=route, status=status)
+            http_request_duration.observe(elapsed, method=method, route=route)
+            http_response_size.observe(size, method=method, route=route)
+            db_queries_per_request.observe(queries.count, method=method, route=route)
+            db_query_seconds_per_request.observe(queries.seconds, method=method, route=route)
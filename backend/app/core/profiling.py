@@ -0,0 +1,226 @@
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import count
+from threading import Lock
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.query_counter import statement_elapsed
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+MAX_PARAMETERS_LENGTH = 500
+
+# "GET /dogs/all" while a request is served, so slow queries say where they came from
+_current_request: ContextVar[Optional[str]] = ContextVar("current_request", default=None)
+
+
+@dataclass
+class SlowQuery:
+    statement: str
+    parameters: str
+    duration_ms: float
+    plan: List[str]
+    request: Optional[str]
+    captured_at: datetime
+
+
+@dataclass
+class RequestProfile:
+    id: int
+    request: str
+    status: int
+    duration_ms: float
+    captured_at: datetime
+    profiler: cProfile.Profile
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "request": self.request,
+            "status": self.status,
+            "duration_ms": self.duration_ms,
+            "captured_at": self.captured_at,
+        }
+
+    def pstats_bytes(self) -> bytes:
+        """The .prof format cProfile's dump_stats writes, for snakeviz or `python -m pstats`"""
+        return marshal.dumps(self.profiler.stats)
+
+    def text(self, limit: int = 50) -> str:
+        stream = io.StringIO()
+        stream.write(f"{self.request} -> {self.status} in {self.duration_ms:.1f} ms\n")
+        pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+
+class Diagnostics:
+    """Slow-query log and sampled request profiler of this worker process.
+
+    Starts from the SLOW_QUERY_* and PROFILE_* settings; admins change them at
+    runtime through /auth/admin/diagnostics without a restart.
+    """
+
+    def __init__(self):
+        self.slow_query_log = settings.SLOW_QUERY_LOG
+        self.slow_query_ms = settings.SLOW_QUERY_MS
+        self.profile_sample_rate = settings.PROFILE_SAMPLE_RATE
+        self.profile_header = settings.PROFILE_HEADER
+        self.slow_queries: deque = deque(maxlen=settings.SLOW_QUERY_LOG_SIZE)
+        self.profiles: deque = deque(maxlen=settings.PROFILE_KEEP)
+        self._ids = count(1)
+        self._lock = Lock()
+        # cProfile allows one active profiler per thread, and requests share the event loop's
+        self._profiling = Lock()
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "slow_query_log": self.slow_query_log,
+            "slow_query_ms": self.slow_query_ms,
+            "profile_sample_rate": self.profile_sample_rate,
+            "profile_header": self.profile_header,
+            "slow_queries_captured": len(self.slow_queries),
+            "profiles_captured": len(self.profiles),
+        }
+
+    def configure(self, **changes):
+        for name, value in changes.items():
+            if value is not None:
+                setattr(self, name, value)
+        logger.info(f"Diagnostics settings changed: {self.state()}")
+
+    def clear(self):
+        with self._lock:
+            self.slow_queries.clear()
+            self.profiles.clear()
+
+    # ----- Slow-query log -----
+
+    def record_query(self, conn, cursor, statement, parameters, context, executemany):
+        if not self.slow_query_log:
+            return
+        elapsed = statement_elapsed(context)
+        if elapsed is None or elapsed * 1000 < self.slow_query_ms:
+            return
+
+        entry = SlowQuery(
+            statement=statement,
+            parameters=repr(parameters)[:MAX_PARAMETERS_LENGTH],
+            duration_ms=round(elapsed * 1000, 2),
+            plan=[] if executemany else self._query_plan(conn, statement, parameters),
+            request=_current_request.get(),
+            captured_at=datetime.utcnow(),
+        )
+        with self._lock:
+            self.slow_queries.append(entry)
+        logger.warning(f"Slow query ({entry.duration_ms} ms) in {entry.request}: {' '.join(statement.split())[:200]}")
+
+    def _query_plan(self, conn, statement: str, parameters) -> List[str]:
+        """EXPLAIN QUERY PLAN on the same connection, through a raw cursor so no listener sees it"""
+        if conn.dialect.name != "sqlite" or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return []
+        plan_cursor = conn.connection.cursor()
+        try:
+            plan_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[-1] for row in plan_cursor.fetchall()]
+        except Exception as e:
+            return [f"Plan unavailable: {e}"]
+        finally:
+            plan_cursor.close()
+
+    # ----- Request profiler -----
+
+    def begin_profile(self, scope) -> Optional[int]:
+        """Id for a new profile if this request should be profiled and no other profile is running"""
+        wanted = self.profile_header and any(name == PROFILE_HEADER for name, _ in scope.get("headers", []))
+        wanted = wanted or (self.profile_sample_rate > 0 and random.random() * self.profile_sample_rate < 1)
+        if not wanted or not self._profiling.acquire(blocking=False):
+            return None
+        return next(self._ids)
+
+    def end_profile(self, profile_id: int, request: str, status: int, elapsed: float, profiler: cProfile.Profile):
+        try:
+            profiler.create_stats()
+            profile = RequestProfile(
+                id=profile_id,
+                request=request,
+                status=status,
+                duration_ms=round(elapsed * 1000, 2),
+                captured_at=datetime.utcnow(),
+                profiler=profiler,
+            )
+            with self._lock:
+                self.profiles.append(profile)
+        finally:
+            self._profiling.release()
+
+    def get_profile(self, profile_id: int) -> Optional[RequestProfile]:
+        with self._lock:
+            return next((profile for profile in self.profiles if profile.id == profile_id), None)
+
+
+# Global diagnostics instance
+diagnostics = Diagnostics()
+
+event.listen(Engine, "after_cursor_execute", diagnostics.record_query)
+
+
+class ProfilerMiddleware:
+    """Tags queries with the current request and profiles sampled requests with cProfile.
+
+    A request is profiled when sampling picks it (1 in PROFILE_SAMPLE_RATE) or it
+    carries an X-Profile header while header profiling is on; the response then gets
+    an X-Profile-Id header. The profiler covers the event loop thread, so requests
+    running concurrently on it appear in the profile too; one profile runs at a time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = f"{scope['method']} {scope['path']}"
+        token = _current_request.set(request)
+        try:
+            profile_id = diagnostics.begin_profile(scope)
+            if profile_id is None:
+                await self.app(scope, receive, send)
+            else:
+                await self._profile(profile_id, request, scope, receive, send)
+        finally:
+            _current_request.reset(token)
+
+    async def _profile(self, profile_id: int, request: str, scope, receive, send):
+        status = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", str(profile_id).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            diagnostics.end_profile(profile_id, request, status, time.perf_counter() - started, profiler)
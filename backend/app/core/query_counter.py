@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Active counters of the current request or block; nested blocks all count
+_counters: ContextVar[Tuple["QueryCount", ...]] = ContextVar("query_counters", default=())
+
+
+@dataclass
+class QueryCount:
+    count: int = 0
+    seconds: float = 0.0
+    statements: List[str] = field(default_factory=list)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCount]:
+    """Count the SQL statements executed inside the block, including in threadpool dependencies"""
+    counter = QueryCount()
+    token = _counters.set(_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _counters.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryCount]:
+    """Fail when the block runs more than `limit` statements, e.g. after an N+1 regression"""
+    with count_queries() as counter:
+        yield counter
+    if counter.count > limit:
+        statements = "\n".join(counter.statements)
+        raise AssertionError(f"{counter.count} queries, expected at most {limit}:\n{statements}")
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    for counter in _counters.get():
+        counter.count += 1
+        counter.statements.append(statement)
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def statement_elapsed(context) -> Optional[float]:
+    """Seconds the statement of `context` has been running; for after_cursor_execute listeners"""
+    started = getattr(context, "_query_started", None)
+    return None if started is None else time.perf_counter() - started
+
+
+def _time_statement(conn, cursor, statement, parameters, context, executemany):
+    elapsed = statement_elapsed(context)
+    if elapsed is None:
+        return
+    for counter in _counters.get():
+        counter.seconds += elapsed
+
+
+event.listen(Engine, "before_cursor_execute", _count_statement)
+event.listen(Engine, "after_cursor_execute", _time_statement)
+
+
+class QueryCountMiddleware:
+    """Counts queries per request; logs requests over QUERY_COUNT_WARN and, in DEBUG, adds X-Query-Count"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as counter:
+            async def send_with_count(message):
+                if message["type"] == "http.response.start" and settings.DEBUG:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-query-count", str(counter.count).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_count)
+
+        if counter.count > settings.QUERY_COUNT_WARN:
+            logger.warning(f"{scope['method']} {scope['path']} ran {counter.count} queries")
@@ -0,0 +1,29 @@
+from typing import Sequence, Type
+from fastapi.responses import ORJSONResponse
+from pydantic import AliasChoices, BaseModel
+from sqlalchemy import inspect
+
+
+def response_columns(model, schema: Type[BaseModel], *extra) -> list:
+    """Mapped columns of `model` that `schema` reads, for list queries that skip ORM hydration.
+
+    Rows from `db.query(*columns)` validate with `schema.model_validate(row._asdict())`.
+    """
+    names = set(schema.model_fields)
+    for field in schema.model_fields.values():
+        if isinstance(field.validation_alias, AliasChoices):
+            names.update(choice for choice in field.validation_alias.choices if isinstance(choice, str))
+        elif isinstance(field.validation_alias, str):
+            names.add(field.validation_alias)
+    columns = [getattr(model, attr.key) for attr in inspect(model).column_attrs if attr.key in names]
+    return columns + list(extra)
+
+
+def models_response(items: Sequence[BaseModel]) -> ORJSONResponse:
+    """JSON response for models that are already validated.
+
+    Returning a Response skips FastAPI's response_model round trip (dump,
+    validate again, serialize); the route's response_model still documents
+    the schema.
+    """
+    return ORJSONResponse([item.model_dump(mode="json") for item in items])
@@ -1,8 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Callable, Optional, Union
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+import asyncio
+import os
+import threading
+import time
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -23,4 +28,117 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+class PasswordHasherBusy(Exception):
+    """Too many password hashes already waiting; the request should be retried later"""
+
+
+class _QueueSlot:
+    """A place in PasswordHasher's queue, given back once: when its job starts or when its caller stops waiting"""
+    __slots__ = ("released",)
+
+    def __init__(self):
+        self.released = False
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL while hashing, so threads are enough. At most
+    `workers` hashes run at once and up to `max_queue` more wait for a
+    thread; beyond that calls fail fast with PasswordHasherBusy instead of
+    piling up behind a login storm.
+    """
+
+    def __init__(self, workers: Optional[int] = settings.PASSWORD_HASH_WORKERS, max_queue: int = settings.PASSWORD_HASH_MAX_QUEUE):
+        # One core is left to the event loop by default
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_queue = max_queue
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._pool
+
+    async def run(self, func: Callable, *args):
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+        slot = _QueueSlot()
+        submitted = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.pool, self._timed, slot, submitted, func, *args)
+        finally:
+            # Cancelled (e.g. the client went away) or failed before the job started
+            self._release(slot)
+
+    def _release(self, slot: "_QueueSlot") -> bool:
+        """Give the queue slot back; only the first of the job and its caller gets True"""
+        with self._lock:
+            if slot.released:
+                return False
+            slot.released = True
+            self.queued -= 1
+            return True
+
+    def _timed(self, slot: "_QueueSlot", submitted: float, func: Callable, *args):
+        if not self._release(slot):
+            # The caller stopped waiting before a thread was free; skip the hash
+            return None
+        started = time.perf_counter()
+        with self._lock:
+            self.running += 1
+            self.wait_seconds += started - submitted
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.run_seconds += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queued": self.queued,
+                "peak_queued": self.peak_queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_seconds / completed * 1000, 2),
+                "avg_hash_ms": round(self.run_seconds / completed * 1000, 2),
+            }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run(get_password_hash, password)
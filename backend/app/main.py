@@ -1,23 +1,35 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from app.core.config import settings
-from app.routers import auth, dogs, fosters, search, shelters, external_shelters
+from app.routers import auth, dogs, fosters, search, shelters, external_shelters, images, analytics, changes
 from app.services.scheduler import scheduler_service
+from app.services.images import image_pipeline
+from app.services.posters import poster_service
+from app.core.security import PasswordHasherBusy, password_hasher
+from app.core.query_counter import QueryCountMiddleware
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, metrics
+from app.core.profiling import ProfilerMiddleware
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     scheduler_service.start()
+    poster_service.start()
     yield
     # Shutdown
     scheduler_service.stop()
+    image_pipeline.shutdown()
+    poster_service.shutdown()
+    password_hasher.shutdown()
 
 app = FastAPI(
     title="FosterDogs API",
     description="API para la plataforma de acogida y adopción de perros",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -37,10 +49,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Query-Count", "X-Profile-Id"],
 )
+app.add_middleware(QueryCountMiddleware)
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(MetricsMiddleware, routes_app=app)
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many login attempts in progress, please retry"},
+        headers={"Retry-After": "1"},
+    )
 
 # Mount static files
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["authentication"])
@@ -49,6 +73,9 @@ app.include_router(fosters.router, prefix="/fosters", tags=["fosters"])
 app.include_router(search.router, prefix="/search", tags=["search"])
 app.include_router(shelters.router, prefix="/api", tags=["shelters"])
 app.include_router(external_shelters.router, prefix="/api", tags=["external_shelters"])
+app.include_router(images.router, prefix="/images", tags=["images"])
+app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+app.include_router(changes.router, prefix="/changes", tags=["changes"])
 
 @app.get("/")
 async def root():
@@ -56,4 +83,8 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
\ No newline at end of file
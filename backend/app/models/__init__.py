@@ -1,6 +1,10 @@
 from .user import User
 from .dog import Dog
 from .foster_application import FosterApplication
-from .external_shelter import ExternalShelter, ExternalDog
+from .external_shelter import ExternalShelter, ExternalDog, MirroredPhoto
+from .photo import PhotoHash
+from .stats import StatCounter
+from .analytics import DailyRollup
+from .change_log import ChangeLogEntry
 
-__all__ = ["User", "Dog", "FosterApplication", "ExternalShelter", "ExternalDog"]
\ No newline at end of file
+__all__ = ["User", "Dog", "FosterApplication", "ExternalShelter", "ExternalDog", "MirroredPhoto", "PhotoHash", "StatCounter", "DailyRollup", "ChangeLogEntry"]
\ No newline at end of file
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float, Date, Index, UniqueConstraint
+from app.core.database import Base
+
+class DailyRollup(Base):
+    """One day of one analytics metric for one shelter, written by app.services.analytics"""
+    __tablename__ = "daily_rollups"
+
+    id = Column(Integer, primary_key=True)
+    metric = Column(String, nullable=False)  # e.g. "dogs_adopted"
+    owner_id = Column(Integer, nullable=False, default=0)  # Shelter user owning the dogs; 0 if none
+    day = Column(Date, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0)  # Summed durations in days, or dogs found for syncs
+
+    __table_args__ = (
+        UniqueConstraint('metric', 'owner_id', 'day', name='unique_daily_rollup'),
+        Index('ix_daily_rollups_metric_day', 'metric', 'day'),
+    )
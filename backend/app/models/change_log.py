@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class ChangeLogEntry(Base):
+    """Append-only record of a dog or foster application being created, changing status or deleted"""
+    __tablename__ = "change_log"
+
+    seq = Column(Integer, primary_key=True)  # Increases with every entry and is never reused
+    entity = Column(String, nullable=False)  # "dog", "foster_application" or "external_dog" (deletions only)
+    entity_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer)  # Shelter user owning the dog
+    action = Column(String, nullable=False)  # "created", "status_changed" or "deleted"
+    old_status = Column(String)
+    new_status = Column(String)
+
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_change_log_owner_seq', 'owner_id', 'seq'),
+        Index('ix_change_log_changed_at', 'changed_at'),  # Tombstones for /dogs/changes
+        {'sqlite_autoincrement': True},
+    )
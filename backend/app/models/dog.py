@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Enum, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Enum, ForeignKey, Float, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -33,6 +33,9 @@ class Dog(Base):
     
     # Location and contact
     location = Column(String)
+    latitude = Column(Float)  # Geocoded from location
+    longitude = Column(Float)
+    geohash = Column(String, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
     
     # Description and status
@@ -41,18 +44,19 @@ class Dog(Base):
     behavior_notes = Column(Text)
     status = Column(Enum(DogStatus), default=DogStatus.AVAILABLE)
     
-    # Requirements
-    good_with_kids = Column(Boolean, default=False)
-    good_with_dogs = Column(Boolean, default=False)
-    good_with_cats = Column(Boolean, default=False)
-    needs_yard = Column(Boolean, default=False)
+    # Requirements (NULL = not stated, which matching treats as unknown rather than "no")
+    good_with_kids = Column(Boolean)
+    good_with_dogs = Column(Boolean)
+    good_with_cats = Column(Boolean)
+    needs_yard = Column(Boolean)
     
     # Media
-    photos = Column(Text)  # JSON string of photo URLs
+    photos = Column(JSON)  # List of photo URLs
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), index=True)  # Indexed for /dogs/changes
+    status_changed_at = Column(DateTime(timezone=True))  # Set by app.services.analytics on every status change
     
     # Relationships
     owner = relationship("User", back_populates="dogs")
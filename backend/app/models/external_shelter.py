@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Enum, JSON, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Enum, JSON, ForeignKey, UniqueConstraint, Float, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -34,6 +34,9 @@ class ExternalShelter(Base):
     
     # Metadatos
     location = Column(String)  # Ubicación de la perrera
+    latitude = Column(Float)  # Geocoded from location
+    longitude = Column(Float)
+    geohash = Column(String, index=True)
     contact_email = Column(String)
     contact_phone = Column(String)
     description = Column(Text)
@@ -71,18 +74,26 @@ class ExternalDog(Base):
     medical_info = Column(Text)
     behavior_notes = Column(Text)
     location = Column(String)
+    latitude = Column(Float)  # Geocoded from location
+    longitude = Column(Float)
+    geohash = Column(String, index=True)
     
     # URLs y enlaces
     original_url = Column(String)  # URL original en la fuente
     photos = Column(JSON)  # Array de URLs de fotos
+    mirrored_photos = Column(JSON)  # {URL remota: URL local en /uploads/mirror}
+    
+    # Detección de duplicados entre perreras
+    minhash = Column(LargeBinary)  # Firma MinHash de nombre, raza y descripción
+    cluster_id = Column(Integer, index=True)  # Grupo de anuncios del mismo perro
     
     # Control de estado
     is_available = Column(Boolean, default=True)
     last_seen = Column(DateTime(timezone=True), server_default=func.now())  # Última vez que se vio en la fuente
     
-    # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Timestamps (indexed for incremental exports)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), index=True)  # Not bumped by syncs that only see the dog again
     
     # Relationships
     external_shelter = relationship("ExternalShelter", back_populates="external_dogs")
@@ -90,3 +101,26 @@ class ExternalDog(Base):
     __table_args__ = (
         UniqueConstraint('external_shelter_id', 'external_id', name='unique_external_dog'),
     )
+    
+    @property
+    def photo_urls(self):
+        """Fotos con las copias locales en lugar de las URLs remotas cuando existen"""
+        return mirrored_urls(self.photos, self.mirrored_photos)
+
+def mirrored_urls(photos, mirrored_photos):
+    """URLs de las fotos, usando la copia local de las que están replicadas"""
+    mirrored = mirrored_photos or {}
+    return [mirrored.get(url, url) for url in photos or []]
+
+class MirroredPhoto(Base):
+    """Copia local de una foto remota, guardada por su SHA-256"""
+    __tablename__ = "mirrored_photos"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    source_url = Column(String, nullable=False, unique=True, index=True)  # URL remota original
+    sha256 = Column(String, nullable=False, index=True)  # Hash del contenido
+    path = Column(String, nullable=False)  # Ruta relativa dentro de uploads
+    content_type = Column(String)
+    size_bytes = Column(Integer)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
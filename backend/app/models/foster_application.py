@@ -30,6 +30,7 @@ class FosterApplication(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    status_changed_at = Column(DateTime(timezone=True))  # Set by app.services.analytics on every status change
     
     # Relationships
     user = relationship("User", back_populates="foster_applications")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class PhotoHash(Base):
+    """Perceptual hash of a photo stored under the uploads directory"""
+    __tablename__ = "photo_hashes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String, nullable=False, unique=True, index=True)  # Relative to the uploads directory
+    phash = Column(BigInteger, nullable=False)  # 64-bit pHash, stored signed
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class StatCounter(Base):
+    """One admin dashboard counter, kept up to date by app.services.stats"""
+    __tablename__ = "stat_counters"
+
+    name = Column(String, primary_key=True)  # e.g. "dogs.status.available"
+    value = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Text, Float
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -24,6 +24,9 @@ class User(Base):
     name = Column(String, nullable=False)
     phone = Column(String)
     location = Column(String)
+    latitude = Column(Float)  # Geocoded from location
+    longitude = Column(Float)
+    geohash = Column(String, index=True)
     user_type = Column(Enum(UserType), default=UserType.FOSTER)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
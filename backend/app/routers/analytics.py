@@ -0,0 +1,90 @@
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.database import get_db
+from app.models.user import UserType
+from app.routers.auth import get_current_user, require_admin
+from app.schemas.analytics import AnalyticsResponse, RollupRebuildResult
+from app.services.analytics import BUCKETS, METRICS, PLATFORM_METRICS, analytics_service
+from app.services.auth_cache import AuthSnapshot
+
+router = APIRouter()
+
+DEFAULT_RANGE_DAYS = 90
+MAX_RANGE_DAYS = 3 * 366
+
+@router.get("/series", response_model=AnalyticsResponse)
+async def get_series(
+    metrics: str = Query("dogs_listed,dogs_adopted,approval_rate", description=f"Comma-separated: {', '.join(METRICS)}"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    bucket: str = Query("week", description=f"One of {', '.join(BUCKETS)}"),
+    owner_id: Optional[int] = Query(None, description="Shelter to report on (admins only; shelters always see their own)"),
+    current_user: AuthSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Tendencias por día, semana o mes, leídas de los agregados diarios"""
+
+    names = [name.strip() for name in metrics.split(",") if name.strip()]
+    unknown = [name for name in names if name not in METRICS]
+    if not names or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown metrics: {', '.join(unknown) or 'none given'}. Available: {', '.join(METRICS)}"
+        )
+    if bucket not in BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"bucket must be one of {', '.join(BUCKETS)}"
+        )
+
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end or (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"start must be before end and at most {MAX_RANGE_DAYS} days earlier"
+        )
+
+    # Shelters only see their own dogs; platform-wide metrics are for administrators
+    if current_user.user_type in (UserType.SHELTER, UserType.SHELTER_ADMIN):
+        if PLATFORM_METRICS.intersection(names):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Only administrators can see {', '.join(sorted(PLATFORM_METRICS.intersection(names)))}"
+            )
+        owner_id = current_user.id
+    elif current_user.user_type != UserType.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only shelters and administrators can see analytics"
+        )
+
+    return {
+        "start": start,
+        "end": end,
+        "bucket": bucket,
+        "owner_id": owner_id,
+        "series": analytics_service.series(db, names, start, end, bucket, owner_id),
+    }
+
+@router.post("/rebuild", response_model=RollupRebuildResult)
+def rebuild_rollups(
+    start: date,
+    end: Optional[date] = None,
+    current_user: AuthSnapshot = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """Recalcular los agregados diarios de un rango de fechas (administradores)"""
+
+    end = end or datetime.utcnow().date()
+    if start > end or (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"start must be before end and at most {MAX_RANGE_DAYS} days earlier"
+        )
+
+    # Síncrona a propósito: FastAPI la ejecuta en el threadpool y los tramos no bloquean el event loop
+    rows_written = analytics_service.rebuild(db, start, end)
+    return {"start": start, "end": end, "rows_written": rows_written}
@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import PlainTextResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from jose import JWTError, jwt
+from jose import JWTError
 from typing import List, Optional
 from app.core.database import get_db
-from app.core.security import create_access_token, verify_password, get_password_hash
-from app.core.config import settings
-from app.models.user import User, UserType, ShelterStatus
-from app.models.dog import Dog
+from app.core.profiling import diagnostics
+from app.core.security import create_access_token, get_password_hash_async, password_hasher, verify_password_async
+from app.models.user import User, UserType
 from app.schemas.user import UserCreate, UserLogin, UserResponse, UserUpdate
+from app.schemas.diagnostics import DiagnosticsState, DiagnosticsUpdate
+from app.services.auth_cache import AuthSnapshot, auth_cache
+from app.services.stats import stats_service
 
 router = APIRouter()
 security = HTTPBearer()
@@ -17,7 +19,8 @@ security = HTTPBearer()
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-):
+) -> AuthSnapshot:
+    """Authorization snapshot of the caller; cached, so usually no database round trip"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -25,22 +28,32 @@ def get_current_user(
     )
     
     try:
-        payload = jwt.decode(
-            credentials.credentials, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
+        payload = auth_cache.claims(credentials.credentials)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = auth_cache.snapshot(db, int(user_id))
     if user is None:
         raise credentials_exception
     return user
 
+def get_current_user_row(
+    current_user: AuthSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> User:
+    """Full user row, for endpoints that need more than the authorization snapshot"""
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
 @router.post("/register", response_model=dict)
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     # Check if user already exists
@@ -51,8 +64,11 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
             detail="Email already registered"
         )
     
+    # Close the connection while bcrypt runs
+    db.close()
+    
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         email=user_data.email,
         name=user_data.name,
@@ -72,15 +88,17 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     return {
         "access_token": access_token,
         "token_type": "bearer",
-        "user": UserResponse.from_orm(db_user)
+        "user": UserResponse.model_validate(db_user)
     }
 
 @router.post("/login", response_model=dict)
 async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     # Find user
     user = db.query(User).filter(User.email == user_credentials.email).first()
+    # Close the connection while bcrypt runs; the user stays loaded
+    db.close()
     
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    if not user or not await verify_password_async(user_credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -98,16 +116,16 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     return {
         "access_token": access_token,
         "token_type": "bearer",
-        "user": UserResponse.from_orm(user)
+        "user": UserResponse.model_validate(user)
     }
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
-    return UserResponse.from_orm(current_user)
+async def get_current_user_info(current_user: User = Depends(get_current_user_row)):
+    return UserResponse.model_validate(current_user)
 
 # ===== ADMIN ROUTES FOR USER MANAGEMENT =====
 
-def require_admin(current_user: User = Depends(get_current_user)):
+def require_admin(current_user: AuthSnapshot = Depends(get_current_user)):
     """Dependency to require admin access"""
     if current_user.user_type != UserType.ADMIN:
         raise HTTPException(
@@ -123,7 +141,7 @@ async def get_all_users(
     search: Optional[str] = None,
     user_type: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: AuthSnapshot = Depends(require_admin)
 ):
     """Get all users with filtering - Admin only"""
     
@@ -149,13 +167,13 @@ async def get_all_users(
     query = query.order_by(User.created_at.desc())
     
     users = query.offset(skip).limit(limit).all()
-    return [UserResponse.from_orm(user) for user in users]
+    return [UserResponse.model_validate(user) for user in users]
 
 @router.get("/admin/users/{user_id}", response_model=UserResponse)
 async def get_user_by_id(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: AuthSnapshot = Depends(require_admin)
 ):
     """Get a specific user by ID - Admin only"""
     
@@ -166,14 +184,14 @@ async def get_user_by_id(
             detail="User not found"
         )
     
-    return UserResponse.from_orm(user)
+    return UserResponse.model_validate(user)
 
 @router.put("/admin/users/{user_id}", response_model=UserResponse)
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: AuthSnapshot = Depends(require_admin)
 ):
     """Update a user - Admin only"""
     
@@ -196,20 +214,20 @@ async def update_user(
     for field, value in update_data.items():
         if field == "password" and value:
             # Hash password if provided
-            setattr(user, "hashed_password", get_password_hash(value))
+            setattr(user, "hashed_password", await get_password_hash_async(value))
         else:
             setattr(user, field, value)
     
     db.commit()
     db.refresh(user)
     
-    return UserResponse.from_orm(user)
+    return UserResponse.model_validate(user)
 
 @router.delete("/admin/users/{user_id}")
 async def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: AuthSnapshot = Depends(require_admin)
 ):
     """Delete a user - Admin only"""
     
@@ -274,7 +292,7 @@ async def delete_user(
 async def toggle_user_status(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: AuthSnapshot = Depends(require_admin)
 ):
     """Toggle user active status - Admin only"""
     
@@ -303,27 +321,99 @@ async def toggle_user_status(
         "is_active": user.is_active
     }
 
+@router.get("/admin/password-hasher")
+async def get_password_hasher_stats(current_user: AuthSnapshot = Depends(require_admin)):
+    """bcrypt pool load: running and queued hashes, rejections, wait and hash times - Admin only"""
+    return password_hasher.stats()
+
+@router.get("/admin/diagnostics", response_model=DiagnosticsState)
+async def get_diagnostics(current_user: AuthSnapshot = Depends(require_admin)):
+    """Slow-query log and profiler settings of this worker - Admin only"""
+    return diagnostics.state()
+
+@router.put("/admin/diagnostics", response_model=DiagnosticsState)
+async def update_diagnostics(
+    diagnostics_update: DiagnosticsUpdate,
+    current_user: AuthSnapshot = Depends(require_admin)
+):
+    """Turn the slow-query log and request profiler on or off without a restart - Admin only"""
+    diagnostics.configure(**diagnostics_update.model_dump(exclude_unset=True))
+    return diagnostics.state()
+
+@router.delete("/admin/diagnostics")
+async def clear_diagnostics(current_user: AuthSnapshot = Depends(require_admin)):
+    """Discard captured slow queries and profiles - Admin only"""
+    diagnostics.clear()
+    return {"message": "Diagnostics cleared"}
+
+@router.get("/admin/diagnostics/slow-queries")
+async def get_slow_queries(current_user: AuthSnapshot = Depends(require_admin)):
+    """Captured slow queries with parameters, query plan and duration, newest first - Admin only"""
+    return list(reversed(diagnostics.slow_queries))
+
+@router.get("/admin/diagnostics/profiles")
+async def get_profiles(current_user: AuthSnapshot = Depends(require_admin)):
+    """Captured request profiles, newest first - Admin only"""
+    return [profile.summary() for profile in reversed(diagnostics.profiles)]
+
+@router.get("/admin/diagnostics/profiles/{profile_id}")
+async def download_profile(
+    profile_id: int,
+    format: str = Query("pstats", pattern="^(pstats|text)$"),
+    current_user: AuthSnapshot = Depends(require_admin)
+):
+    """Download a profile as a .prof file (snakeviz, `python -m pstats`) or as text - Admin only"""
+    profile = diagnostics.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    
+    if format == "text":
+        return PlainTextResponse(profile.text())
+    return Response(
+        content=profile.pstats_bytes(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'}
+    )
+
 @router.get("/admin/stats")
-async def get_admin_stats(
+def get_admin_stats(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: AuthSnapshot = Depends(require_admin)
 ):
-    """Get admin dashboard statistics"""
-    
-    stats = {
-        "total_users": db.query(User).count(),
-        "active_users": db.query(User).filter(User.is_active == True).count(),
-        "total_shelters": db.query(User).filter(User.user_type == UserType.SHELTER_ADMIN).count(),
-        "pending_shelters": db.query(User).filter(
-            User.user_type == UserType.SHELTER,
-            User.shelter_status == ShelterStatus.PENDING
-        ).count(),
-        "total_dogs": db.query(Dog).count(),
-        "available_dogs": db.query(Dog).filter(Dog.status == "available").count(),
-    }
+    """Get admin dashboard statistics, read from the materialized counters"""
     
-    # User type breakdown
-    user_types = db.query(User.user_type, func.count(User.id)).group_by(User.user_type).all()
-    stats["user_types"] = {user_type.value: count for user_type, count in user_types}
+    # Plain def: the first read on an empty counter table recounts every table, in the threadpool
+    counters, updated_at = stats_service.snapshot(db)
+    breakdown = stats_service.breakdown
     
-    return stats
\ No newline at end of file
+    return {
+        "total_users": counters.get("users.total", 0),
+        "active_users": counters.get("users.active", 0),
+        "total_shelters": counters.get("shelters.approved", 0),
+        "pending_shelters": counters.get("shelters.pending", 0),
+        "total_dogs": counters.get("dogs.total", 0),
+        "available_dogs": counters.get("dogs.status.available", 0),
+        "user_types": breakdown(counters, "users.type."),
+        "dog_statuses": breakdown(counters, "dogs.status."),
+        "external_dogs": {
+            "total": counters.get("external_dogs.total", 0),
+            "available": counters.get("external_dogs.available", 0),
+        },
+        "applications": {
+            "total": counters.get("applications.total", 0),
+            "by_status": breakdown(counters, "applications.status."),
+        },
+        "updated_at": updated_at,
+    }
+
+@router.post("/admin/stats/reconcile")
+def reconcile_admin_stats(
+    db: Session = Depends(get_db),
+    current_user: AuthSnapshot = Depends(require_admin)
+):
+    """Recount the dashboard counters from the tables now, instead of waiting for the scheduled job"""
+    # Plain def, so FastAPI runs the GROUP BY scans in the threadpool
+    return {"corrections": stats_service.reconcile(db)}
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.database import get_db
+from app.models.user import UserType
+from app.routers.auth import get_current_user
+from app.schemas.change_log import ChangeFeed, ChangeLogEntryResponse
+from app.services.auth_cache import AuthSnapshot
+from app.services.change_log import ENTITY_NAMES, change_log
+
+router = APIRouter()
+
+@router.get("", response_model=ChangeFeed)
+async def get_changes(
+    since: int = Query(0, ge=0, description="Last seq already processed; 0 reads from the start"),
+    limit: int = Query(500, ge=1, le=5000),
+    entity: Optional[str] = Query(None, description=", ".join(ENTITY_NAMES)),
+    current_user: AuthSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Altas, cambios de estado y bajas de perros y solicitudes posteriores a `since`, en orden"""
+
+    if entity is not None and entity not in ENTITY_NAMES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"entity must be one of {', '.join(ENTITY_NAMES)}"
+        )
+
+    # Shelters follow changes to their own dogs and the applications for them
+    owner_id = None
+    if current_user.user_type in (UserType.SHELTER, UserType.SHELTER_ADMIN):
+        owner_id = current_user.id
+    elif current_user.user_type != UserType.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only shelters and administrators can read the change log"
+        )
+
+    entries, has_more = change_log.tail(db, since, limit, owner_id, entity)
+    return {
+        "changes": [ChangeLogEntryResponse.model_validate(entry) for entry in entries],
+        "next_since": entries[-1].seq if entries else since,
+        "has_more": has_more,
+    }
@@ -1,13 +1,26 @@
-from typing import List, Optional, Union
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from dataclasses import asdict
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from sqlalchemy.orm import Session, joinedload
 from app.core.database import get_db
-from app.models.dog import Dog
-from app.models.user import User, UserType
+from app.models.dog import Dog, DogStatus
+from app.models.user import UserType
 from app.models.external_shelter import ExternalDog
-from app.schemas.dog import DogCreate, DogResponse, DogUpdate
-from app.schemas.external_shelter import ExternalDogResponse
+from app.schemas.dog import DOG_RESPONSE_COLUMNS, DogChangesResponse, DogCreate, DogImportResult, DogResponse, DogTombstone, DogUpdate, PosterBatchRequest
+from app.schemas.external_shelter import EXTERNAL_DOG_RESPONSE_COLUMNS, ExternalDogResponse
+from app.services.auth_cache import AuthSnapshot
 from app.routers.auth import get_current_user
+from app.routers.search import get_near_point
+from app.routers.external_shelters import external_dog_responses
+from app.core.responses import models_response
+from app.services.geo import nearest
+from app.services.dedup import collapse_duplicates as collapse_duplicate_dogs, collapse_located
+from app.services.uploads import UploadError, process_uploaded_photo, receive_photo
+from app.services.dog_changes import dog_changes_service, utc_naive, watermark_now
+from app.services.dog_transfer import FORMATS, DogImportError, accepts_gzip, detect_format, dog_transfer_service, gzip_stream
+from app.services.posters import DEFAULT_TEMPLATE, LAYOUTS, poster_filename, poster_service
 
 router = APIRouter()
 
@@ -19,9 +32,10 @@ async def get_dogs(
     breed: Optional[str] = None,
     size: Optional[str] = None,
     location: Optional[str] = None,
+    near_point: Optional[Tuple[float, float, float]] = Depends(get_near_point),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Dog)
+    query = db.query(*DOG_RESPONSE_COLUMNS)
     
     if status:
         query = query.filter(Dog.status == status)
@@ -32,8 +46,14 @@ async def get_dogs(
     if location:
         query = query.filter(Dog.location.ilike(f"%{location}%"))
     
-    dogs = query.offset(skip).limit(limit).all()
-    return [DogResponse.from_orm(dog) for dog in dogs]
+    if near_point:
+        return models_response([
+            DogResponse.model_validate({**row._asdict(), "distance_km": round(distance, 2)})
+            for distance, row in nearest(query, Dog, near_point, skip, limit)
+        ])
+    
+    rows = query.offset(skip).limit(limit).all()
+    return models_response([DogResponse.model_validate(row._asdict()) for row in rows])
 
 @router.get("/all", response_model=List[Union[DogResponse, ExternalDogResponse]])
 async def get_all_dogs(
@@ -43,6 +63,8 @@ async def get_all_dogs(
     size: Optional[str] = None,
     location: Optional[str] = None,
     include_external: bool = True,
+    collapse_duplicates: bool = True,
+    near_point: Optional[Tuple[float, float, float]] = Depends(get_near_point),
     db: Session = Depends(get_db)
 ):
     """Get all dogs (local and external) with unified filtering"""
@@ -50,7 +72,7 @@ async def get_all_dogs(
     all_dogs = []
     
     # Get local dogs
-    local_query = db.query(Dog).filter(Dog.status == "available")
+    local_query = db.query(*DOG_RESPONSE_COLUMNS).filter(Dog.status == DogStatus.AVAILABLE)
     
     if breed:
         local_query = local_query.filter(Dog.breed.ilike(f"%{breed}%"))
@@ -59,28 +81,191 @@ async def get_all_dogs(
     if location:
         local_query = local_query.filter(Dog.location.ilike(f"%{location}%"))
     
+    external_query = db.query(*EXTERNAL_DOG_RESPONSE_COLUMNS).filter(ExternalDog.is_available == True)
+    
+    if breed:
+        external_query = external_query.filter(ExternalDog.breed.ilike(f"%{breed}%"))
+    if size:
+        external_query = external_query.filter(ExternalDog.size.ilike(f"%{size}%"))
+    if location:
+        external_query = external_query.filter(ExternalDog.location.ilike(f"%{location}%"))
+    
+    if near_point:
+        # Distance search: merge both sources by distance, then paginate
+        # Rows are only validated once the page is cut
+        located = [(distance, "local", row) for distance, row in nearest(local_query, Dog, near_point)]
+        if include_external:
+            external_located = nearest(external_query, ExternalDog, near_point)
+            if collapse_duplicates:
+                external_located = collapse_located(external_located)
+            located.extend((distance, "external", row) for distance, row in external_located)
+        located.sort(key=lambda item: item[0])
+        page = located[skip:skip + limit]
+        external = iter(external_dog_responses(db, [row for _, kind, row in page if kind == "external"]))
+        return models_response([
+            (DogResponse.model_validate(row._asdict()) if kind == "local" else next(external))
+            .model_copy(update={"distance_km": round(distance, 2)})
+            for distance, kind, row in page
+        ])
+    
+    if collapse_duplicates:
+        # Dogs cross-posted by several shelters are shown once
+        external_query = collapse_duplicate_dogs(external_query)
+    
     local_dogs = local_query.offset(skip).limit(limit).all()
-    all_dogs.extend([{"type": "local", "data": DogResponse.from_orm(dog)} for dog in local_dogs])
+    all_dogs.extend([{"type": "local", "data": DogResponse.model_validate(row._asdict())} for row in local_dogs])
     
     # Get external dogs if requested
     if include_external:
-        external_query = db.query(ExternalDog).filter(ExternalDog.is_available == True)
-        
-        if breed:
-            external_query = external_query.filter(ExternalDog.breed.ilike(f"%{breed}%"))
-        if size:
-            external_query = external_query.filter(ExternalDog.size.ilike(f"%{size}%"))
-        if location:
-            external_query = external_query.filter(ExternalDog.location.ilike(f"%{location}%"))
-        
         remaining_limit = max(0, limit - len(local_dogs))
         external_dogs = external_query.offset(0).limit(remaining_limit).all()
-        all_dogs.extend([{"type": "external", "data": ExternalDogResponse.from_orm(dog)} for dog in external_dogs])
+        all_dogs.extend([{"type": "external", "data": dog} for dog in external_dog_responses(db, external_dogs)])
     
     # Sort by creation date (newest first)
     all_dogs.sort(key=lambda x: x["data"].created_at, reverse=True)
     
-    return [dog["data"] for dog in all_dogs[:limit]]
+    return models_response([dog["data"] for dog in all_dogs[:limit]])
+
+# Most changes /dogs/changes lists before asking the client to reload
+MAX_DOG_CHANGES = 2000
+
+@router.get("/changes", response_model=DogChangesResponse)
+async def get_dog_changes(
+    since: Optional[datetime] = Query(None, description="`watermark` from the previous response; omit on first load"),
+    limit: int = Query(500, ge=1, le=MAX_DOG_CHANGES),
+    db: Session = Depends(get_db)
+):
+    """Local and external dogs created, changed or removed since the last call, to update a cached list"""
+    # Taken before reading, so changes made meanwhile are sent again next time
+    watermark = watermark_now()
+    changes = dog_changes_service.changes(db, since and utc_naive(since), limit)
+    response = DogChangesResponse(
+        dogs=[DogResponse.model_validate(row._asdict()) for row in changes.dogs],
+        external_dogs=external_dog_responses(db, changes.external_dogs),
+        removed=[DogTombstone(**entry) for entry in changes.removed],
+        watermark=watermark,
+        reset=changes.reset,
+    )
+    return ORJSONResponse(response.model_dump(mode="json"))
+
+def require_dog_manager(current_user: AuthSnapshot = Depends(get_current_user)) -> AuthSnapshot:
+    if current_user.user_type not in [UserType.SHELTER_ADMIN, UserType.ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only approved shelters and administrators can import or export dogs"
+        )
+    return current_user
+
+@router.post("/import", response_model=DogImportResult)
+async def import_dogs(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or ndjson; defaults to the Content-Type"),
+    current_user: AuthSnapshot = Depends(require_dog_manager),
+    db: Session = Depends(get_db)
+):
+    """Create many dogs from a CSV (with header) or NDJSON body, read as it arrives.
+
+    Rows are validated like POST /dogs and inserted in batches; invalid rows
+    are reported by number without stopping the import.
+    """
+    import_format = detect_format(format, request.headers.get("content-type"))
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson, or pass format=csv|ndjson"
+        )
+
+    try:
+        report = await dog_transfer_service.import_dogs(db, request.stream(), import_format, current_user.id)
+    except DogImportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return DogImportResult.model_validate(asdict(report))
+
+@router.get("/export")
+async def export_dogs(
+    request: Request,
+    format: str = Query("csv", description="csv or ndjson"),
+    dog_status: Optional[DogStatus] = Query(None, alias="status"),
+    owner_id: Optional[int] = Query(None, description="Shelter to export (admins only; shelters always get their own)"),
+    current_user: AuthSnapshot = Depends(require_dog_manager)
+):
+    """All matching dogs as CSV or NDJSON, streamed from the database in id order (gzip if accepted)"""
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of {', '.join(FORMATS)}"
+        )
+    if current_user.user_type != UserType.ADMIN:
+        owner_id = current_user.id
+
+    body = dog_transfer_service.export_dogs(format, owner_id, dog_status)
+    headers = {"Content-Disposition": f'attachment; filename="perros.{format}"', "Vary": "Accept-Encoding"}
+    if accepts_gzip(request.headers.get("accept-encoding")):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    
+    return StreamingResponse(body, media_type=FORMATS[format], headers=headers)
+
+# Most posters a single batch request may render
+MAX_POSTER_BATCH = 200
+
+def check_poster_template(template: str):
+    if template not in LAYOUTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown template, expected one of: {', '.join(LAYOUTS)}"
+        )
+
+@router.post("/adoption-posters")
+async def get_adoption_posters(
+    batch: PosterBatchRequest,
+    current_user: AuthSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """ZIP of adoption posters for several dogs, streamed as they are rendered"""
+    if current_user.user_type not in [UserType.SHELTER_ADMIN, UserType.ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only shelters and administrators can generate posters in bulk"
+        )
+    check_poster_template(batch.template)
+    if not batch.dog_ids or len(batch.dog_ids) > MAX_POSTER_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Between 1 and {MAX_POSTER_BATCH} dogs per batch"
+        )
+    
+    # Owners are loaded up front: the archive is streamed after this handler returns
+    dogs = db.query(Dog).options(joinedload(Dog.owner)).filter(Dog.id.in_(batch.dog_ids)).all()
+    if not dogs:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dogs not found"
+        )
+    
+    return StreamingResponse(
+        poster_service.zip_stream(dogs, batch.template),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="carteles-adopcion.zip"'}
+    )
+
+@router.get("/{dog_id}/adoption-poster")
+async def get_adoption_poster(
+    dog_id: int,
+    template: str = Query(DEFAULT_TEMPLATE, description="a4, square or story"),
+    db: Session = Depends(get_db)
+):
+    """Adoption poster (PNG), cached until the dog changes"""
+    check_poster_template(template)
+    dog = db.query(Dog).options(joinedload(Dog.owner)).filter(Dog.id == dog_id).first()
+    if not dog:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dog not found"
+        )
+    
+    path = await poster_service.render(dog, template)
+    return FileResponse(path, media_type="image/png", filename=poster_filename(dog))
 
 @router.get("/{dog_id}", response_model=DogResponse)
 async def get_dog(dog_id: int, db: Session = Depends(get_db)):
@@ -90,12 +275,12 @@ async def get_dog(dog_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Dog not found"
         )
-    return DogResponse.from_orm(dog)
+    return DogResponse.model_validate(dog)
 
 @router.post("/", response_model=DogResponse)
 async def create_dog(
     dog_data: DogCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # Check if user can create dogs (shelter_admin or admin)
@@ -114,13 +299,13 @@ async def create_dog(
     db.commit()
     db.refresh(db_dog)
     
-    return DogResponse.from_orm(db_dog)
+    return DogResponse.model_validate(db_dog)
 
 @router.put("/{dog_id}", response_model=DogResponse)
 async def update_dog(
     dog_id: int,
     dog_update: DogUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     dog = db.query(Dog).filter(Dog.id == dog_id).first()
@@ -145,12 +330,56 @@ async def update_dog(
     db.commit()
     db.refresh(dog)
     
-    return DogResponse.from_orm(dog)
+    return DogResponse.model_validate(dog)
+
+@router.post("/{dog_id}/photos", response_model=DogResponse)
+async def upload_dog_photo(
+    dog_id: int,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user: AuthSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Upload one photo (multipart, first file field), streamed to disk.
+
+    The body is read only after the permission checks, and the upload is
+    aborted as soon as it exceeds MAX_FILE_SIZE or isn't an allowed image.
+    """
+    dog = db.query(Dog).filter(Dog.id == dog_id).first()
+    if not dog:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dog not found"
+        )
+    
+    # Check if user owns the dog or is admin
+    if dog.owner_id != current_user.id and current_user.user_type not in [UserType.ADMIN, UserType.SHELTER_ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    try:
+        stored = await receive_photo(request)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    photos = dog.photos or []
+    if stored.url not in photos:
+        # A new list, so the JSON column sees the change
+        dog.photos = photos + [stored.url]
+        db.commit()
+        db.refresh(dog)
+    
+    # Thumbnails, WebP/AVIF variants and perceptual hash after responding
+    background_tasks.add_task(process_uploaded_photo, stored.path)
+    
+    return DogResponse.model_validate(dog)
 
 @router.delete("/{dog_id}")
 async def delete_dog(
     dog_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     dog = db.query(Dog).filter(Dog.id == dog_id).first()
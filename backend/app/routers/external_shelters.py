@@ -1,19 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 from app.core.database import get_db
+from app.services.auth_cache import AuthSnapshot
 from app.routers.auth import get_current_user
-from app.models.user import User, UserType
+from app.routers.search import get_near_point
+from app.services.geo import nearest
+from app.services.dedup import collapse_duplicates as collapse_duplicate_dogs, collapse_located
+from app.services.dog_changes import utc_naive, watermark_now
+from app.services.dog_transfer import FORMATS, accepts_gzip, dog_transfer_service, gzip_stream
+from app.services.photo_hash import DEFAULT_MAX_DISTANCE, MAX_DISTANCE_LIMIT, suspected_duplicates
+from app.services.stats import stats_service
+from app.services.change_log import change_log
+from app.models.user import UserType
 from app.models.external_shelter import ExternalShelter, ExternalDog, ExternalShelterStatus
 from app.schemas.external_shelter import (
     ExternalShelterCreate, ExternalShelterUpdate, ExternalShelterResponse,
-    ExternalDogResponse, SyncResult
+    ExternalDogResponse, SyncResult, SuspectedDuplicate, EXTERNAL_DOG_RESPONSE_COLUMNS
 )
+from app.core.responses import models_response
 
 router = APIRouter()
 
-def require_admin(current_user: User = Depends(get_current_user)):
+def external_dog_responses(db: Session, rows) -> List[ExternalDogResponse]:
+    """Validar filas de EXTERNAL_DOG_RESPONSE_COLUMNS, cargando sus perreras en una sola consulta"""
+    shelter_ids = {row.external_shelter_id for row in rows}
+    shelters = {}
+    if shelter_ids:
+        shelters = {
+            shelter.id: ExternalShelterResponse.model_validate(shelter)
+            for shelter in db.query(ExternalShelter).filter(ExternalShelter.id.in_(shelter_ids))
+        }
+    return [
+        ExternalDogResponse.model_validate({**row._asdict(), "external_shelter": shelters.get(row.external_shelter_id)})
+        for row in rows
+    ]
+
+def require_admin(current_user: AuthSnapshot = Depends(get_current_user)):
     """Dependency to require admin access"""
     if current_user.user_type != UserType.ADMIN:
         raise HTTPException(
@@ -26,7 +51,7 @@ def require_admin(current_user: User = Depends(get_current_user)):
 async def create_external_shelter(
     shelter_data: ExternalShelterCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: AuthSnapshot = Depends(require_admin)
 ):
     """Crear una nueva perrera externa - solo administradores"""
     
@@ -46,12 +71,12 @@ async def create_external_shelter(
     db.commit()
     db.refresh(db_shelter)
     
-    return ExternalShelterResponse.from_orm(db_shelter)
+    return ExternalShelterResponse.model_validate(db_shelter)
 
 @router.get("/external-shelters", response_model=List[ExternalShelterResponse])
 async def get_external_shelters(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: AuthSnapshot = Depends(require_admin),
     status_filter: Optional[ExternalShelterStatus] = None
 ):
     """Obtener todas las perreras externas - solo administradores"""
@@ -62,13 +87,13 @@ async def get_external_shelters(
         query = query.filter(ExternalShelter.status == status_filter)
     
     shelters = query.all()
-    return [ExternalShelterResponse.from_orm(shelter) for shelter in shelters]
+    return [ExternalShelterResponse.model_validate(shelter) for shelter in shelters]
 
 @router.get("/external-shelters/{shelter_id}", response_model=ExternalShelterResponse)
 async def get_external_shelter(
     shelter_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: AuthSnapshot = Depends(require_admin)
 ):
     """Obtener una perrera externa específica - solo administradores"""
     
@@ -79,14 +104,14 @@ async def get_external_shelter(
             detail="External shelter not found"
         )
     
-    return ExternalShelterResponse.from_orm(shelter)
+    return ExternalShelterResponse.model_validate(shelter)
 
 @router.put("/external-shelters/{shelter_id}", response_model=ExternalShelterResponse)
 async def update_external_shelter(
     shelter_id: int,
     shelter_data: ExternalShelterUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: AuthSnapshot = Depends(require_admin)
 ):
     """Actualizar una perrera externa - solo administradores"""
     
@@ -104,13 +129,13 @@ async def update_external_shelter(
     db.commit()
     db.refresh(shelter)
     
-    return ExternalShelterResponse.from_orm(shelter)
+    return ExternalShelterResponse.model_validate(shelter)
 
 @router.delete("/external-shelters/{shelter_id}")
 async def delete_external_shelter(
     shelter_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: AuthSnapshot = Depends(require_admin)
 ):
     """Eliminar una perrera externa - solo administradores"""
     
@@ -121,8 +146,11 @@ async def delete_external_shelter(
             detail="External shelter not found"
         )
     
-    # Also delete all associated dogs
-    db.query(ExternalDog).filter(ExternalDog.external_shelter_id == shelter_id).delete()
+    # Also delete all associated dogs; the bulk delete skips flush events, so update the stats and change log first
+    dogs = db.query(ExternalDog).filter(ExternalDog.external_shelter_id == shelter_id)
+    stats_service.forget(db, dogs)
+    change_log.forget(db, dogs)
+    dogs.delete()
     db.delete(shelter)
     db.commit()
     
@@ -143,37 +171,95 @@ async def get_external_shelter_dogs(
             detail="External shelter not found"
         )
     
-    query = db.query(ExternalDog).filter(ExternalDog.external_shelter_id == shelter_id)
+    query = db.query(*EXTERNAL_DOG_RESPONSE_COLUMNS).filter(ExternalDog.external_shelter_id == shelter_id)
     
     if available_only:
         query = query.filter(ExternalDog.is_available == True)
     
-    dogs = query.all()
-    return [ExternalDogResponse.from_orm(dog) for dog in dogs]
+    return models_response(external_dog_responses(db, query.all()))
 
 @router.get("/external-dogs", response_model=List[ExternalDogResponse])
 async def get_all_external_dogs(
     db: Session = Depends(get_db),
     available_only: bool = True,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    collapse_duplicates: bool = True,
+    near_point: Optional[Tuple[float, float, float]] = Depends(get_near_point)
 ):
     """Obtener todos los perros de perreras externas - público"""
     
-    query = db.query(ExternalDog)
+    query = db.query(*EXTERNAL_DOG_RESPONSE_COLUMNS)
     
     if available_only:
         query = query.filter(ExternalDog.is_available == True)
     
-    dogs = query.offset(offset).limit(limit).all()
-    return [ExternalDogResponse.from_orm(dog) for dog in dogs]
+    if near_point:
+        located = nearest(query, ExternalDog, near_point)
+        if collapse_duplicates:
+            # Perros publicados por varias perreras se muestran una sola vez
+            located = collapse_located(located)
+        located = located[offset:offset + limit]
+        dogs = external_dog_responses(db, [row for _, row in located])
+        return models_response([
+            dog.model_copy(update={"distance_km": round(distance, 2)})
+            for (distance, _), dog in zip(located, dogs)
+        ])
+    
+    if collapse_duplicates:
+        query = collapse_duplicate_dogs(query)
+    rows = query.offset(offset).limit(limit).all()
+    return models_response(external_dog_responses(db, rows))
+
+@router.get("/external-dogs/export")
+async def export_external_dogs(
+    request: Request,
+    format: str = Query("ndjson", description="ndjson or csv"),
+    updated_since: Optional[datetime] = Query(None, description="Only dogs created, changed or deleted since then, available or not"),
+    current_user: AuthSnapshot = Depends(get_current_user)
+):
+    """Catálogo completo de perros externos con su perrera, en streaming (gzip si el cliente lo acepta).
+
+    La cabecera X-Export-Watermark es el `updated_since` de la siguiente exportación incremental.
+    """
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of {', '.join(FORMATS)}"
+        )
+    # Taken before reading, so changes made while exporting are sent again next time
+    watermark = watermark_now()
+    body = dog_transfer_service.export_external_dogs(format, updated_since and utc_naive(updated_since))
+    headers = {
+        "Content-Disposition": f'attachment; filename="perros-externos.{format}"',
+        "X-Export-Watermark": watermark.isoformat(),
+        "Vary": "Accept-Encoding",
+    }
+    if accepts_gzip(request.headers.get("accept-encoding")):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(body, media_type=FORMATS[format], headers=headers)
+
+@router.get("/external-dogs/suspected-duplicates", response_model=List[SuspectedDuplicate])
+def get_suspected_duplicates(
+    max_distance: int = Query(DEFAULT_MAX_DISTANCE, ge=0, le=MAX_DISTANCE_LIMIT),
+    limit: int = Query(100, ge=1, le=1000),
+    include_clustered: bool = False,
+    db: Session = Depends(get_db),
+    current_user: AuthSnapshot = Depends(require_admin)
+):
+    """Perros distintos con la misma foto o una casi idéntica (hash perceptual) - solo administradores"""
+    
+    # Síncrona a propósito: FastAPI la ejecuta en el threadpool y el escaneo no bloquea el event loop
+    return suspected_duplicates(db, max_distance, limit, include_clustered)
 
 @router.post("/external-shelters/{shelter_id}/sync", response_model=SyncResult)
 async def sync_external_shelter(
     shelter_id: int,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: AuthSnapshot = Depends(require_admin)
 ):
     """Sincronizar una perrera externa manualmente - solo administradores"""
     
@@ -201,7 +287,7 @@ async def sync_external_shelter(
 async def sync_all_external_shelters(
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: AuthSnapshot = Depends(require_admin)
 ):
     """Sincronizar todas las perreras externas - solo administradores"""
     
@@ -1,24 +1,46 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session, selectinload
 from app.core.database import get_db
-from app.models.foster_application import FosterApplication
+from app.models.foster_application import ApplicationStatus, FosterApplication
 from app.models.dog import Dog
-from app.models.user import User
+from app.models.user import User, UserType
+from app.models.external_shelter import ExternalDog
 from app.schemas.foster_application import (
     FosterApplicationCreate, 
     FosterApplicationResponse, 
-    FosterApplicationUpdate
+    FosterApplicationUpdate,
+    FosterApplicationReview,
+    BulkStatusUpdate,
+    BulkStatusResult,
+    FOSTER_APPLICATION_REVIEW_COLUMNS
 )
+from app.core.responses import models_response
+from app.schemas.dog import DogRecommendation, DogResponse
+from app.schemas.external_shelter import ExternalDogResponse
+from app.services.auth_cache import AuthSnapshot
 from app.routers.auth import get_current_user
+from app.services.matching import matching_service, FosterProfile, LOCAL, EXTERNAL
 
 router = APIRouter()
 
+REVIEWERS = (UserType.ADMIN, UserType.SHELTER, UserType.SHELTER_ADMIN)
+AUTO_REJECT_NOTE = "Rechazada automáticamente: se aprobó otra solicitud para este perro"
+
+def require_reviewer(current_user: AuthSnapshot = Depends(get_current_user)) -> AuthSnapshot:
+    """Dependency for shelters reviewing applications to their dogs, and admins"""
+    if current_user.user_type not in REVIEWERS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
+
 @router.post("/apply/{dog_id}", response_model=FosterApplicationResponse)
 async def apply_for_foster(
     dog_id: int,
     application_data: FosterApplicationCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # Check if dog exists
@@ -55,24 +77,184 @@ async def apply_for_foster(
     db.commit()
     db.refresh(db_application)
     
-    return FosterApplicationResponse.from_orm(db_application)
+    return FosterApplicationResponse.model_validate(db_application)
 
 @router.get("/my-applications", response_model=List[FosterApplicationResponse])
 async def get_my_applications(
-    current_user: User = Depends(get_current_user),
+    current_user: AuthSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     applications = db.query(FosterApplication).filter(
         FosterApplication.user_id == current_user.id
     ).all()
     
-    return [FosterApplicationResponse.from_orm(app) for app in applications]
+    return [FosterApplicationResponse.model_validate(app) for app in applications]
+
+@router.get("/recommendations", response_model=List[DogRecommendation])
+async def get_recommendations(
+    has_kids: Optional[bool] = Query(None, description="Override: foster has children"),
+    has_dogs: Optional[bool] = Query(None, description="Override: foster has other dogs"),
+    has_cats: Optional[bool] = Query(None, description="Override: foster has cats"),
+    has_yard: Optional[bool] = Query(None, description="Override: foster has a yard or garden"),
+    include_external: bool = True,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: AuthSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Dogs most compatible with the current user's living situation"""
+    
+    # Start from the latest application's living situation, then apply overrides
+    latest_application = db.query(FosterApplication.living_situation).filter(
+        FosterApplication.user_id == current_user.id,
+        FosterApplication.living_situation.isnot(None)
+    ).order_by(FosterApplication.created_at.desc()).first()
+    
+    profile = FosterProfile.from_text(latest_application[0] if latest_application else None)
+    overrides = {"has_kids": has_kids, "has_dogs": has_dogs, "has_cats": has_cats, "has_yard": has_yard}
+    for field, value in overrides.items():
+        if value is not None:
+            setattr(profile, field, value)
+    
+    matching_service.ensure_built(db)
+    matches = matching_service.top_matches(profile, limit, include_external)
+    
+    # Hydrate only the winners, one query per table
+    local_ids = [dog_id for kind, dog_id, _ in matches if kind == LOCAL]
+    external_ids = [dog_id for kind, dog_id, _ in matches if kind == EXTERNAL]
+    local_dogs = {dog.id: dog for dog in db.query(Dog).filter(Dog.id.in_(local_ids)).all()} if local_ids else {}
+    external_dogs = {
+        dog.id: dog for dog in db.query(ExternalDog)
+        .options(selectinload(ExternalDog.external_shelter))
+        .filter(ExternalDog.id.in_(external_ids)).all()
+    } if external_ids else {}
+    
+    recommendations = []
+    for kind, dog_id, score in matches:
+        if kind == LOCAL and dog_id in local_dogs:
+            recommendations.append(DogRecommendation(
+                type="local", score=score, dog=DogResponse.model_validate(local_dogs[dog_id])
+            ))
+        elif kind == EXTERNAL and dog_id in external_dogs:
+            recommendations.append(DogRecommendation(
+                type="external", score=score, dog=ExternalDogResponse.model_validate(external_dogs[dog_id])
+            ))
+    
+    return recommendations
+
+@router.get("/applications", response_model=List[FosterApplicationReview])
+async def get_shelter_applications(
+    status_filter: Optional[ApplicationStatus] = Query(None, alias="status"),
+    dog_id: Optional[int] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: AuthSnapshot = Depends(require_reviewer),
+    db: Session = Depends(get_db)
+):
+    """Applications for the current shelter's dogs (every dog for admins), newest first"""
+    
+    query = db.query(*FOSTER_APPLICATION_REVIEW_COLUMNS).join(
+        Dog, FosterApplication.dog_id == Dog.id
+    ).join(User, FosterApplication.user_id == User.id)
+    
+    if current_user.user_type != UserType.ADMIN:
+        query = query.filter(Dog.owner_id == current_user.id)
+    if status_filter:
+        query = query.filter(FosterApplication.status == status_filter)
+    if dog_id is not None:
+        query = query.filter(FosterApplication.dog_id == dog_id)
+    
+    rows = query.order_by(FosterApplication.created_at.desc(), FosterApplication.id.desc()).offset(skip).limit(limit)
+    return models_response([FosterApplicationReview.model_validate(row._asdict()) for row in rows])
+
+@router.post("/applications/review", response_model=BulkStatusResult)
+async def review_applications(
+    review: BulkStatusUpdate,
+    current_user: AuthSnapshot = Depends(require_reviewer),
+    db: Session = Depends(get_db)
+):
+    """Apply many status changes in one transaction; nothing changes if any of them is invalid"""
+    
+    ids = [update.application_id for update in review.updates]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each application can only appear once"
+        )
+    
+    rows = db.query(FosterApplication, Dog.owner_id).join(
+        Dog, FosterApplication.dog_id == Dog.id
+    ).filter(FosterApplication.id.in_(ids)).all()
+    applications = {application.id: application for application, _ in rows}
+    
+    missing = [application_id for application_id in ids if application_id not in applications]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Applications not found: {missing}"
+        )
+    if current_user.user_type != UserType.ADMIN:
+        foreign = sorted(application.id for application, owner_id in rows if owner_id != current_user.id)
+        if foreign:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Applications for dogs of another shelter: {foreign}"
+            )
+    
+    approved_dogs = [
+        applications[update.application_id].dog_id for update in review.updates
+        if update.status == ApplicationStatus.APPROVED
+    ]
+    if len(set(approved_dogs)) != len(approved_dogs):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only one application per dog can be approved"
+        )
+    if approved_dogs:
+        # An earlier batch may already have placed the dog
+        already_placed = db.query(FosterApplication.dog_id).filter(
+            FosterApplication.dog_id.in_(approved_dogs),
+            FosterApplication.status.in_([ApplicationStatus.APPROVED, ApplicationStatus.COMPLETED]),
+            ~FosterApplication.id.in_(ids)
+        ).distinct().all()
+        if already_placed:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Dogs that already have an approved application: {sorted(row.dog_id for row in already_placed)}"
+            )
+
+    for update in review.updates:
+        application = applications[update.application_id]
+        application.status = update.status
+        if update.admin_notes:
+            application.admin_notes = update.admin_notes
+    
+    auto_rejected = []
+    if review.reject_competing and approved_dogs:
+        competing = db.query(FosterApplication).filter(
+            FosterApplication.dog_id.in_(approved_dogs),
+            FosterApplication.status == ApplicationStatus.PENDING,
+            ~FosterApplication.id.in_(ids)
+        ).all()
+        for application in competing:
+            application.status = ApplicationStatus.REJECTED
+            application.admin_notes = application.admin_notes or AUTO_REJECT_NOTE
+            auto_rejected.append(application.id)
+    
+    db.commit()
+    
+    # One query reloads everything the commit expired
+    updated = {application.id: application for application in
+               db.query(FosterApplication).filter(FosterApplication.id.in_(ids))}
+    return {
+        "updated": [FosterApplicationResponse.model_validate(updated[application_id]) for application_id in ids],
+        "auto_rejected": sorted(auto_rejected),
+    }
 
 @router.put("/{application_id}/status", response_model=FosterApplicationResponse)
 async def update_application_status(
     application_id: int,
     status_update: FosterApplicationUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # Only admins and shelter owners can update application status
@@ -99,4 +281,4 @@ async def update_application_status(
     db.commit()
     db.refresh(application)
     
-    return FosterApplicationResponse.from_orm(application)
\ No newline at end of file
+    return FosterApplicationResponse.model_validate(application)
\ No newline at end of file
@@ -0,0 +1,46 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse
+from app.services.images import MEDIA_TYPES, image_pipeline
+
+router = APIRouter()
+
+# Variants are keyed by source name, width and format, and re-rendered when
+# the source changes, so browsers and proxies can keep them for a long time
+CACHE_CONTROL = "public, max-age=31536000"
+
+@router.get("/{name:path}")
+async def get_image(
+    name: str,
+    request: Request,
+    w: int = Query(640, ge=1, le=4096, description="Width in pixels, rounded up to a standard size"),
+    format: Optional[str] = Query(None, description="avif, webp or jpeg; negotiated from Accept if omitted"),
+):
+    """Resized variant of an uploaded image, rendered on first request and cached on disk"""
+    formats = image_pipeline.formats
+    if format is None:
+        accept = request.headers.get("accept", "")
+        format = next((fmt for fmt in formats if MEDIA_TYPES[fmt] in accept), "jpeg")
+    if format not in formats:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format, expected one of: {', '.join(formats)}"
+        )
+
+    try:
+        path = await image_pipeline.variant(name, w, format)
+    except OSError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Image could not be processed"
+        )
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found"
+        )
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[format],
+        headers={"Cache-Control": CACHE_CONTROL, "Vary": "Accept"},
+    )
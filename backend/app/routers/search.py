@@ -1,12 +1,31 @@
-from typing import List
-from fastapi import APIRouter, Depends, Query
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models.dog import Dog
-from app.schemas.dog import DogResponse
+from app.schemas.dog import DOG_RESPONSE_COLUMNS, DogResponse
+from app.core.responses import models_response
+from app.services.autocomplete import autocomplete_service
+from app.services.geo import nearest, parse_point
 
 router = APIRouter()
 
+def get_near_point(
+    near: Optional[str] = Query(None, description="Search around this point, as 'lat,lon'"),
+    radius_km: float = Query(25, gt=0, le=1000, description="Radius in km around `near`")
+) -> Optional[Tuple[float, float, float]]:
+    """Dependency parsing the `near`/`radius_km` distance filter"""
+    if not near:
+        return None
+    try:
+        latitude, longitude = parse_point(near)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid near parameter: {e}"
+        )
+    return latitude, longitude, radius_km
+
 @router.get("/dogs", response_model=List[DogResponse])
 async def search_dogs(
     q: str = Query(None, description="Search query"),
@@ -18,9 +37,10 @@ async def search_dogs(
     good_with_cats: bool = Query(None, description="Good with cats"),
     skip: int = 0,
     limit: int = 20,
+    near_point: Optional[Tuple[float, float, float]] = Depends(get_near_point),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Dog)
+    query = db.query(*DOG_RESPONSE_COLUMNS)
     
     # Text search
     if q:
@@ -44,23 +64,35 @@ async def search_dogs(
     if good_with_cats is not None:
         query = query.filter(Dog.good_with_cats == good_with_cats)
     
-    dogs = query.offset(skip).limit(limit).all()
-    return [DogResponse.from_orm(dog) for dog in dogs]
+    if near_point:
+        return models_response([
+            DogResponse.model_validate({**row._asdict(), "distance_km": round(distance, 2)})
+            for distance, row in nearest(query, Dog, near_point, skip, limit)
+        ])
+    
+    rows = query.offset(skip).limit(limit).all()
+    return models_response([DogResponse.model_validate(row._asdict()) for row in rows])
 
 @router.get("/breeds")
-async def get_breeds(db: Session = Depends(get_db)):
-    breeds = db.query(Dog.breed).distinct().filter(Dog.breed.isnot(None)).all()
-    return [breed[0] for breed in breeds if breed[0]]
+async def get_breeds(
+    q: str = Query(None, description="Prefix to autocomplete breeds"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum suggestions when q is given"),
+    db: Session = Depends(get_db)
+):
+    autocomplete_service.ensure_built(db)
+
+    if q:
+        return autocomplete_service.suggest("breed", q, limit)
+    return autocomplete_service.values("breed")
 
 @router.get("/locations")
 async def get_locations(
     q: str = Query(None, description="Search query for locations"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum suggestions when q is given"),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Dog.location).distinct().filter(Dog.location.isnot(None))
-    
+    autocomplete_service.ensure_built(db)
+
     if q:
-        query = query.filter(Dog.location.ilike(f"%{q}%"))
-    
-    locations = query.all()
-    return [location[0] for location in locations if location[0]]
\ No newline at end of file
+        return autocomplete_service.suggest("location", q, limit)
+    return autocomplete_service.values("location")
@@ -2,10 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
-from app.routers.auth import get_current_user
+from app.services.auth_cache import AuthSnapshot
+from app.routers.auth import get_current_user, get_current_user_row
 from app.models.user import User, UserType, ShelterStatus
 from app.schemas.user import ShelterRegistration, ShelterApplicationResponse, ShelterApproval, UserResponse
-from app.core.security import get_password_hash, create_access_token
+from app.core.security import get_password_hash_async, create_access_token
 
 router = APIRouter()
 
@@ -21,8 +22,11 @@ async def register_shelter(shelter_data: ShelterRegistration, db: Session = Depe
             detail="Email already registered"
         )
     
+    # Close the connection while bcrypt runs
+    db.close()
+    
     # Create new shelter user with pending status
-    hashed_password = get_password_hash(shelter_data.password)
+    hashed_password = await get_password_hash_async(shelter_data.password)
     db_user = User(
         email=shelter_data.email,
         name=shelter_data.name,
@@ -51,7 +55,7 @@ async def register_shelter(shelter_data: ShelterRegistration, db: Session = Depe
 
 @router.get("/shelters/pending", response_model=List[ShelterApplicationResponse])
 async def get_pending_shelters(
-    current_user: User = Depends(get_current_user),
+    current_user: AuthSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Obtener perreras pendientes de aprobación - solo administradores"""
@@ -67,12 +71,12 @@ async def get_pending_shelters(
         User.shelter_status == ShelterStatus.PENDING
     ).all()
     
-    return [ShelterApplicationResponse.from_orm(shelter) for shelter in pending_shelters]
+    return [ShelterApplicationResponse.model_validate(shelter) for shelter in pending_shelters]
 
 @router.post("/shelters/approve", response_model=dict)
 async def approve_shelter(
     approval_data: ShelterApproval,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Aprobar o rechazar una perrera - solo administradores"""
@@ -125,11 +129,11 @@ async def get_approved_shelters(db: Session = Depends(get_db)):
         User.is_active == True
     ).all()
     
-    return [UserResponse.from_orm(shelter) for shelter in approved_shelters]
+    return [UserResponse.model_validate(shelter) for shelter in approved_shelters]
 
 @router.get("/shelters/my-status", response_model=dict)
 async def get_my_shelter_status(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_row)
 ):
     """Obtener el estado de la solicitud de perrera del usuario actual"""
     
@@ -0,0 +1,25 @@
+from datetime import date
+from typing import List, Optional
+from pydantic import BaseModel
+
+class AnalyticsPoint(BaseModel):
+    start: date  # First day of the bucket
+    value: Optional[float] = None  # Events in the bucket, or a rate; None if a rate has no events to divide
+    mean: Optional[float] = None  # Average of `mean_of` per event
+
+class AnalyticsSeries(BaseModel):
+    metric: str
+    mean_of: Optional[str] = None  # "days" (time to adoption or decision), "dogs_found", or None
+    points: List[AnalyticsPoint]
+
+class AnalyticsResponse(BaseModel):
+    start: date
+    end: date
+    bucket: str
+    owner_id: Optional[int] = None  # None: every shelter together
+    series: List[AnalyticsSeries]
+
+class RollupRebuildResult(BaseModel):
+    start: date
+    end: date
+    rows_written: int
@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+class ChangeLogEntryResponse(BaseModel):
+    seq: int
+    entity: str
+    entity_id: int
+    owner_id: Optional[int] = None
+    action: str
+    old_status: Optional[str] = None
+    new_status: Optional[str] = None
+    changed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ChangeFeed(BaseModel):
+    changes: List[ChangeLogEntryResponse]
+    next_since: int  # Pass as `since` to continue after the last entry returned
+    has_more: bool
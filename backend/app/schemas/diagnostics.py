@@ -0,0 +1,16 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+class DiagnosticsUpdate(BaseModel):
+    slow_query_log: Optional[bool] = None
+    slow_query_ms: Optional[int] = Field(None, ge=0)
+    profile_sample_rate: Optional[int] = Field(None, ge=0, description="Profile 1 in N requests; 0 disables sampling")
+    profile_header: Optional[bool] = None
+
+class DiagnosticsState(BaseModel):
+    slow_query_log: bool
+    slow_query_ms: int
+    profile_sample_rate: int
+    profile_header: bool
+    slow_queries_captured: int
+    profiles_captured: int
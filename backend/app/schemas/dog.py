@@ -1,7 +1,10 @@
 from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel
-from app.models.dog import DogStatus, DogSize, DogGender
+from typing import Optional, List, Union
+from pydantic import BaseModel, computed_field
+from app.core.responses import response_columns
+from app.models.dog import Dog as DogModel, DogStatus, DogSize, DogGender
+from app.schemas.external_shelter import ExternalDogResponse
+from app.schemas.image import PhotoVariants, photo_variants
 
 class DogBase(BaseModel):
     name: str
@@ -14,10 +17,10 @@ class DogBase(BaseModel):
     description: Optional[str] = None
     medical_info: Optional[str] = None
     behavior_notes: Optional[str] = None
-    good_with_kids: bool = False
-    good_with_dogs: bool = False
-    good_with_cats: bool = False
-    needs_yard: bool = False
+    good_with_kids: Optional[bool] = None  # None = not stated
+    good_with_dogs: Optional[bool] = None
+    good_with_cats: Optional[bool] = None
+    needs_yard: Optional[bool] = None
 
 class DogCreate(DogBase):
     pass
@@ -44,11 +47,54 @@ class DogResponse(DogBase):
     status: DogStatus
     owner_id: Optional[int] = None
     photos: Optional[List[str]] = []
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    distance_km: Optional[float] = None  # Only set on `near` searches
     created_at: datetime
     updated_at: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def photo_variants(self) -> List[PhotoVariants]:
+        return photo_variants(self.photos)
     
     class Config:
         from_attributes = True
 
+# Columns list endpoints query instead of loading whole Dog objects
+DOG_RESPONSE_COLUMNS = response_columns(DogModel, DogResponse)
+
+class DogRecommendation(BaseModel):
+    type: str  # "local" or "external"
+    score: float
+    dog: Union[DogResponse, ExternalDogResponse]
+
 class Dog(DogResponse):
-    pass
\ No newline at end of file
+    pass
+
+class DogTombstone(BaseModel):
+    type: str  # "local" or "external"
+    id: int
+    reason: str  # "deleted", or "unavailable" for external dogs gone from their shelter's site
+
+class DogChangesResponse(BaseModel):
+    dogs: List[DogResponse]  # Created or changed, any status
+    external_dogs: List[ExternalDogResponse]  # Created or changed, still available
+    removed: List[DogTombstone]
+    watermark: datetime  # Pass as `since` on the next request
+    reset: bool = False  # Too many changes (or no `since`): reload the full lists, then continue from `watermark`
+
+class PosterBatchRequest(BaseModel):
+    dog_ids: List[int]
+    template: str = "a4"  # "a4", "square" or "story"
+
+class DogImportRowError(BaseModel):
+    row: int  # 1-based, not counting the CSV header or blank lines
+    message: str
+
+class DogImportResult(BaseModel):
+    received: int
+    created: int
+    failed: int
+    errors: List[DogImportRowError]  # The first ones only when many rows fail
+    stopped: Optional[str] = None  # Set when the rest of the file was not read
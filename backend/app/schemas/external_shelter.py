@@ -1,7 +1,9 @@
 from datetime import datetime
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, HttpUrl
-from app.models.external_shelter import ExternalShelterType, ExternalShelterStatus
+from pydantic import AliasChoices, BaseModel, Field, HttpUrl, computed_field, model_validator
+from app.core.responses import response_columns
+from app.models.external_shelter import ExternalDog, ExternalShelterType, ExternalShelterStatus, mirrored_urls
+from app.schemas.image import PhotoVariants, photo_variants
 
 class ExternalShelterBase(BaseModel):
     name: str
@@ -42,6 +44,8 @@ class ExternalShelterResponse(ExternalShelterBase):
     last_sync: Optional[datetime]
     sync_frequency_hours: int
     last_error: Optional[str]
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     created_at: datetime
     updated_at: Optional[datetime]
     
@@ -70,16 +74,37 @@ class ExternalDogResponse(ExternalDogBase):
     id: int
     external_shelter_id: int
     external_id: str
-    photos: Optional[List[str]]
+    # Local copies replace remote URLs once mirrored (ExternalDog.photo_urls)
+    photos: Optional[List[str]] = Field(validation_alias=AliasChoices("photo_urls", "photos"))
     is_available: bool
+    cluster_id: Optional[int] = None
     last_seen: datetime
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    distance_km: Optional[float] = None  # Only set on `near` searches
     created_at: datetime
     updated_at: Optional[datetime]
     external_shelter: Optional[ExternalShelterResponse] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def use_mirrored_photos(cls, data):
+        # Column-only rows carry mirrored_photos instead of the photo_urls property
+        if isinstance(data, dict) and "mirrored_photos" in data:
+            data = {**data, "photos": mirrored_urls(data.get("photos"), data["mirrored_photos"])}
+        return data
+
+    @computed_field
+    @property
+    def photo_variants(self) -> List[PhotoVariants]:
+        return photo_variants(self.photos)
     
     class Config:
         from_attributes = True
 
+# Columns list endpoints query instead of loading whole ExternalDog objects
+EXTERNAL_DOG_RESPONSE_COLUMNS = response_columns(ExternalDog, ExternalDogResponse, ExternalDog.mirrored_photos)
+
 class SyncResult(BaseModel):
     shelter_id: int
     success: bool
@@ -87,5 +112,20 @@ class SyncResult(BaseModel):
     dogs_created: int
     dogs_updated: int
     dogs_marked_unavailable: int
+    dogs_linked_as_duplicates: int = 0
+    photos_mirrored: int = 0
     error: Optional[str] = None
     sync_time: datetime
+
+class DuplicatePhotoDog(BaseModel):
+    type: str  # "local" or "external"
+    id: int
+    name: str
+    photo: str
+    external_shelter_id: Optional[int] = None
+    cluster_id: Optional[int] = None
+
+class SuspectedDuplicate(BaseModel):
+    distance: int  # Bits differing between the photos' perceptual hashes (0 = same picture)
+    first: DuplicatePhotoDog
+    second: DuplicatePhotoDog
@@ -1,7 +1,12 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
-from app.models.foster_application import ApplicationStatus
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from app.core.responses import response_columns
+from app.models.dog import Dog, DogStatus
+from app.models.foster_application import ApplicationStatus, FosterApplication as FosterApplicationModel
+from app.models.user import User
+
+MAX_BULK_UPDATES = 500
 
 class FosterApplicationBase(BaseModel):
     message: Optional[str] = None
@@ -28,5 +33,32 @@ class FosterApplicationResponse(FosterApplicationBase):
     class Config:
         from_attributes = True
 
+class FosterApplicationReview(FosterApplicationResponse):
+    """An application as a reviewing shelter sees it, with its dog and applicant"""
+    dog_name: str
+    dog_status: Optional[DogStatus] = None
+    applicant_name: str
+    applicant_email: str
+
+# Columns of the shelter review list, one joined query instead of loading three objects per row
+FOSTER_APPLICATION_REVIEW_COLUMNS = response_columns(
+    FosterApplicationModel, FosterApplicationResponse,
+    Dog.name.label("dog_name"), Dog.status.label("dog_status"),
+    User.name.label("applicant_name"), User.email.label("applicant_email"),
+)
+
+class ApplicationStatusChange(BaseModel):
+    application_id: int
+    status: ApplicationStatus
+    admin_notes: Optional[str] = None
+
+class BulkStatusUpdate(BaseModel):
+    updates: List[ApplicationStatusChange] = Field(..., min_length=1, max_length=MAX_BULK_UPDATES)
+    reject_competing: bool = True  # Reject the dog's other pending applications when one is approved
+
+class BulkStatusResult(BaseModel):
+    updated: List[FosterApplicationResponse]
+    auto_rejected: List[int]  # Competing applications rejected because another was approved
+
 class FosterApplication(FosterApplicationResponse):
     pass
\ No newline at end of file
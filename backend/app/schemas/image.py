@@ -0,0 +1,28 @@
+from functools import lru_cache
+from typing import List, Optional
+from pydantic import BaseModel
+from app.services.images import image_pipeline
+
+class PhotoVariants(BaseModel):
+    original: str
+    thumbnail: str  # Square crop for listing cards
+    srcset: str  # WebP widths, ready for <img srcset>
+    srcset_avif: Optional[str] = None  # For <source type="image/avif"> when supported
+    srcset_jpeg: Optional[str] = None
+
+@lru_cache(maxsize=50000)
+def _variants(photo: str) -> Optional[PhotoVariants]:
+    urls = image_pipeline.variant_urls(photo)
+    return PhotoVariants(**urls) if urls else None
+
+def photo_variants(photos: Optional[List[str]]) -> List[PhotoVariants]:
+    """Variant URLs for the photos served from /uploads (remote photos are skipped).
+
+    They only depend on the URL, so they're built once per photo and shared.
+    """
+    variants = []
+    for photo in photos or []:
+        urls = _variants(photo)
+        if urls:
+            variants.append(urls)
+    return variants
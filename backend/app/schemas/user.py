@@ -47,6 +47,8 @@ class UserResponse(UserBase):
     id: int
     is_active: bool
     is_verified: bool
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     created_at: datetime
     shelter_name: Optional[str] = None
     shelter_status: Optional[ShelterStatus] = None
@@ -0,0 +1,283 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+from sqlalchemy import event, func, inspect, literal
+from sqlalchemy.orm import Query, Session
+from app.core.config import settings
+from app.models.analytics import DailyRollup
+from app.models.dog import Dog, DogStatus
+from app.models.external_shelter import ExternalDog
+from app.models.foster_application import ApplicationStatus, FosterApplication
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ("day", "week", "month")
+
+# Rollup keys pack (owner, day) into one integer: owner * DAY_SPAN + days since 1970
+DAY_SPAN = 1_000_000
+
+# Rollup row whose day marks how far incremental refreshes got
+WATERMARK = "rollup_watermark"
+
+
+@dataclass(frozen=True)
+class RolledUp:
+    """A metric recomputed from source rows.
+
+    `query(db, since, until)` selects one (event time, owner id, start time) row
+    per event in [since, until); the day's total sums event - start in days.
+    """
+    name: str
+    query: Callable[[Session, datetime, datetime], Query]
+    mean_of: Optional[str] = None
+
+
+def _dogs_listed(db: Session, since: datetime, until: datetime) -> Query:
+    return db.query(Dog.created_at, Dog.owner_id, Dog.created_at).filter(
+        Dog.created_at >= since, Dog.created_at < until
+    )
+
+
+def _dogs_adopted(db: Session, since: datetime, until: datetime) -> Query:
+    # Dogs adopted before status_changed_at existed fall back to their last edit
+    adopted_at = func.coalesce(Dog.status_changed_at, Dog.updated_at, Dog.created_at)
+    return db.query(adopted_at, Dog.owner_id, Dog.created_at).filter(
+        Dog.status == DogStatus.ADOPTED, adopted_at >= since, adopted_at < until
+    )
+
+
+def _applications_received(db: Session, since: datetime, until: datetime) -> Query:
+    return db.query(FosterApplication.created_at, Dog.owner_id, FosterApplication.created_at).join(
+        Dog, FosterApplication.dog_id == Dog.id
+    ).filter(FosterApplication.created_at >= since, FosterApplication.created_at < until)
+
+
+def _applications_decided(*statuses: ApplicationStatus):
+    def query(db: Session, since: datetime, until: datetime) -> Query:
+        decided_at = func.coalesce(
+            FosterApplication.status_changed_at, FosterApplication.updated_at, FosterApplication.created_at
+        )
+        return db.query(decided_at, Dog.owner_id, FosterApplication.created_at).join(
+            Dog, FosterApplication.dog_id == Dog.id
+        ).filter(FosterApplication.status.in_(statuses), decided_at >= since, decided_at < until)
+    return query
+
+
+def _external_dogs_listed(db: Session, since: datetime, until: datetime) -> Query:
+    return db.query(ExternalDog.created_at, literal(0), ExternalDog.created_at).filter(
+        ExternalDog.created_at >= since, ExternalDog.created_at < until
+    )
+
+
+ROLLED_UP = {
+    metric.name: metric for metric in (
+        RolledUp("dogs_listed", _dogs_listed),
+        RolledUp("dogs_adopted", _dogs_adopted, mean_of="days"),
+        RolledUp("applications_received", _applications_received),
+        RolledUp("applications_approved", _applications_decided(
+            ApplicationStatus.APPROVED, ApplicationStatus.COMPLETED), mean_of="days"),
+        RolledUp("applications_rejected", _applications_decided(ApplicationStatus.REJECTED), mean_of="days"),
+        RolledUp("external_dogs_listed", _external_dogs_listed),
+    )
+}
+
+# Counted as syncs happen; there is no history to recompute them from
+SYNC_METRICS = {"syncs_succeeded": "dogs_found", "syncs_failed": None}
+
+# Computed per bucket from other metrics
+DERIVED = {"approval_rate": ("applications_approved", "applications_rejected")}
+
+METRICS = [*ROLLED_UP, *SYNC_METRICS, *DERIVED]
+
+# Not broken down by shelter, so only administrators see them
+PLATFORM_METRICS = {"external_dogs_listed", *SYNC_METRICS}
+
+
+def _utc_naive(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def _bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _bucket_index(days: np.ndarray, first: date, bucket: str) -> np.ndarray:
+    """Bucket number of each datetime64[D] in `days`, counting from the bucket starting at `first`"""
+    if bucket == "month":
+        return (days.astype("datetime64[M]") - np.datetime64(first, "M")).astype(np.int64)
+    offsets = (days - np.datetime64(first, "D")).astype(np.int64)
+    return offsets // 7 if bucket == "week" else offsets
+
+
+class AnalyticsService:
+    """Daily rollups behind the trend charts of the shelter and admin dashboards.
+
+    Events (dogs listed and adopted, applications received and decided,
+    external dogs found) are aggregated per shelter and day into
+    daily_rollups, backfilled in chunks and then refreshed incrementally from
+    the scheduler. Range queries bucket those rows by day, week or month with
+    NumPy and never touch dogs or applications. An event that moves to another
+    day later, such as an approval reverted to a rejection, leaves its old day
+    counted until that range is rebuilt.
+    """
+
+    def rebuild(self, db: Session, start: date, end: date,
+                chunk_days: int = settings.ANALYTICS_CHUNK_DAYS) -> int:
+        """Recompute the rolled-up metrics for days start..end, one committed chunk at a time"""
+        written = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(end, chunk_start + timedelta(days=chunk_days - 1))
+            written += self._rebuild_chunk(db, chunk_start, chunk_end)
+            chunk_start = chunk_end + timedelta(days=1)
+        return written
+
+    def _rebuild_chunk(self, db: Session, start: date, end: date) -> int:
+        since, until = datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min)
+        rows = []
+        for metric in ROLLED_UP.values():
+            rows.extend(self._aggregate(metric.name, metric.query(db, since, until).all()))
+
+        db.query(DailyRollup).filter(
+            DailyRollup.metric.in_(ROLLED_UP), DailyRollup.day >= start, DailyRollup.day <= end
+        ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(DailyRollup, rows)
+        db.commit()
+        return len(rows)
+
+    def _aggregate(self, metric: str, events: Sequence) -> List[Dict]:
+        """Daily rollup rows from (event time, owner id, start time) tuples"""
+        if not events:
+            return []
+        at = np.array([_utc_naive(row[0]) for row in events], dtype="datetime64[us]")
+        started = np.array([_utc_naive(row[2]) for row in events], dtype="datetime64[us]")
+        owners = np.array([row[1] or 0 for row in events], dtype=np.int64)
+        days = at.astype("datetime64[D]").astype(np.int64)
+
+        keys, inverse = np.unique(owners * DAY_SPAN + days, return_inverse=True)
+        counts = np.bincount(inverse)
+        totals = np.bincount(inverse, weights=(at - started).astype("timedelta64[s]").astype(np.float64) / 86400)
+        return [
+            {
+                "metric": metric,
+                "owner_id": int(key // DAY_SPAN),
+                "day": date(1970, 1, 1) + timedelta(days=int(key % DAY_SPAN)),
+                "count": int(count),
+                "total": round(float(total), 4),
+            }
+            for key, count, total in zip(keys, counts, totals)
+        ]
+
+    def refresh(self, db: Session) -> int:
+        """Rebuild from the day before the last refresh through today; the first run backfills everything"""
+        today = datetime.utcnow().date()
+        watermark = db.query(DailyRollup.day).filter(DailyRollup.metric == WATERMARK).scalar()
+        if watermark is not None:
+            start = min(watermark, today) - timedelta(days=1)
+        else:
+            start = self._first_day(db) or today
+            logger.info(f"Backfilling analytics rollups from {start}")
+
+        written = self.rebuild(db, start, today)
+        db.query(DailyRollup).filter(DailyRollup.metric == WATERMARK).delete(synchronize_session=False)
+        db.add(DailyRollup(metric=WATERMARK, owner_id=0, day=today))
+        db.commit()
+        return written
+
+    def _first_day(self, db: Session) -> Optional[date]:
+        firsts = [
+            db.query(func.min(column)).scalar()
+            for column in (Dog.created_at, FosterApplication.created_at, ExternalDog.created_at)
+        ]
+        firsts = [_utc_naive(first) for first in firsts if first is not None]
+        return min(firsts).date() if firsts else None
+
+    def record_sync(self, db: Session, succeeded: bool, dogs_found: int):
+        """Count one external shelter sync in today's rollup; committed together with the sync"""
+        metric = "syncs_succeeded" if succeeded else "syncs_failed"
+        today = datetime.utcnow().date()
+        updated = db.query(DailyRollup).filter(
+            DailyRollup.metric == metric, DailyRollup.owner_id == 0, DailyRollup.day == today
+        ).update(
+            {DailyRollup.count: DailyRollup.count + 1, DailyRollup.total: DailyRollup.total + dogs_found},
+            synchronize_session=False
+        )
+        if not updated:
+            db.add(DailyRollup(metric=metric, owner_id=0, day=today, count=1, total=dogs_found))
+
+    def series(self, db: Session, metrics: Sequence[str], start: date, end: date,
+               bucket: str = "week", owner_id: Optional[int] = None) -> List[Dict]:
+        """One point per bucket between start and end for each metric, zeros included"""
+        stored = {name for metric in metrics for name in DERIVED.get(metric, (metric,))}
+        query = db.query(DailyRollup.metric, DailyRollup.day, DailyRollup.count, DailyRollup.total).filter(
+            DailyRollup.metric.in_(stored), DailyRollup.day >= start, DailyRollup.day <= end
+        )
+        if owner_id is not None:
+            query = query.filter(DailyRollup.owner_id == owner_id)
+        rows = query.all()
+
+        first = _bucket_start(start, bucket)
+        buckets = int(_bucket_index(np.array([end], dtype="datetime64[D]"), first, bucket)[0]) + 1
+        if bucket == "month":
+            starts = np.datetime64(first, "M") + np.arange(buckets)
+        else:
+            starts = np.datetime64(first, "D") + np.arange(buckets) * (7 if bucket == "week" else 1)
+        starts = starts.astype("datetime64[D]").astype(object)
+
+        names = np.array([row.metric for row in rows], dtype=object)
+        index = _bucket_index(np.array([row.day for row in rows], dtype="datetime64[D]"), first, bucket)
+        counts = np.array([row.count for row in rows], dtype=np.float64)
+        totals = np.array([row.total for row in rows], dtype=np.float64)
+
+        def summed(metric: str, values: np.ndarray) -> np.ndarray:
+            mask = names == metric
+            return np.bincount(index[mask], weights=values[mask], minlength=buckets)
+
+        result = []
+        for metric in metrics:
+            if metric in DERIVED:
+                approved, rejected = (summed(name, counts) for name in DERIVED[metric])
+                decided = approved + rejected
+                values = [float(a / d) if d else None for a, d in zip(approved, decided)]
+                means = [None] * buckets
+                mean_of = None
+            else:
+                metric_counts, metric_totals = summed(metric, counts), summed(metric, totals)
+                mean_of = ROLLED_UP[metric].mean_of if metric in ROLLED_UP else SYNC_METRICS[metric]
+                values = [float(count) for count in metric_counts]
+                means = [
+                    round(float(total / count), 2) if mean_of and count else None
+                    for count, total in zip(metric_counts, metric_totals)
+                ]
+            result.append({
+                "metric": metric,
+                "mean_of": mean_of,
+                "points": [
+                    {"start": bucket_start, "value": value, "mean": mean}
+                    for bucket_start, value, mean in zip(starts, values, means)
+                ],
+            })
+        return result
+
+
+# Global analytics instance
+analytics_service = AnalyticsService()
+
+
+def _stamp_status_changes(session: Session, flush_context, instances):
+    now = datetime.utcnow()
+    for obj in session.new:
+        if isinstance(obj, (Dog, FosterApplication)) and obj.status_changed_at is None:
+            obj.status_changed_at = now
+    for obj in session.dirty:
+        if isinstance(obj, (Dog, FosterApplication)) and inspect(obj).attrs.status.history.has_changes():
+            obj.status_changed_at = now
+
+
+event.listen(Session, "before_flush", _stamp_status_changes)
@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Iterable, Optional
+from jose import jwt
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.user import ShelterStatus, User, UserType
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire after a TTL; the least recently used go first when full"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+@dataclass(frozen=True)
+class AuthSnapshot:
+    """The user fields authorization checks need, cached instead of loading the row"""
+    id: int
+    user_type: UserType
+    is_active: bool
+    shelter_status: Optional[ShelterStatus]
+
+    @classmethod
+    def from_user(cls, user) -> "AuthSnapshot":
+        return cls(id=user.id, user_type=user.user_type, is_active=user.is_active, shelter_status=user.shelter_status)
+
+
+class AuthCache:
+    """Verified JWT claims and user authorization snapshots, per worker process.
+
+    Snapshots are dropped as soon as a commit in this process changes or
+    deletes the user; the TTL bounds how long a change made by another worker
+    can go unnoticed.
+    """
+
+    def __init__(
+        self,
+        token_cache_size: int = settings.AUTH_TOKEN_CACHE_SIZE,
+        token_ttl: float = settings.AUTH_TOKEN_CACHE_TTL,
+        user_cache_size: int = settings.AUTH_USER_CACHE_SIZE,
+        user_ttl: float = settings.AUTH_USER_CACHE_TTL,
+    ):
+        self.tokens = TTLCache(token_cache_size, token_ttl)
+        self.users = TTLCache(user_cache_size, user_ttl)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def claims(self, token: str) -> dict:
+        """Decoded claims of a token, verifying the signature only on a cache miss.
+
+        Raises JWTError like jwt.decode. Entries never outlive the token's own
+        expiry.
+        """
+        payload = self.tokens.get(token)
+        if payload is not None:
+            return payload
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        expires = payload.get("exp")
+        self.tokens.set(token, payload, ttl=expires - time.time() if expires else None)
+        return payload
+
+    def snapshot(self, db: Session, user_id: int) -> Optional[AuthSnapshot]:
+        """Authorization snapshot of a user, None if the user doesn't exist"""
+        snapshot = self.users.get(user_id)
+        if snapshot is not None:
+            return snapshot
+
+        generation = self._generation
+        row = db.query(User.id, User.user_type, User.is_active, User.shelter_status).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        snapshot = AuthSnapshot.from_user(row)
+        with self._lock:
+            # A commit that invalidated users while we were reading may have
+            # made this row stale already, so it's only cached if none did
+            if generation == self._generation:
+                self.users.set(user_id, snapshot)
+        return snapshot
+
+    def invalidate(self, user_ids: Iterable[int]):
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self.users.pop(user_id)
+
+    def clear(self):
+        self.tokens.clear()
+        with self._lock:
+            self._generation += 1
+            self.users.clear()
+
+
+def _collect_users(session: Session, flush_context):
+    changed = session.info.setdefault("auth_changed_users", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            changed.add(obj.id)
+
+
+def _invalidate_users(session: Session):
+    changed = session.info.pop("auth_changed_users", None)
+    if changed:
+        auth_cache.invalidate(changed)
+
+
+def _discard_users(session: Session, transaction):
+    if transaction.parent is None:
+        session.info.pop("auth_changed_users", None)
+
+
+event.listen(Session, "after_flush", _collect_users)
+event.listen(Session, "after_commit", _invalidate_users)
+event.listen(Session, "after_transaction_end", _discard_users)
+
+# Global auth cache instance
+auth_cache = AuthCache()
@@ -0,0 +1,271 @@
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from app.models.dog import Dog
+from app.models.external_shelter import ExternalDog
+import heapq
+import threading
+import unicodedata
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields indexed for autocomplete, shared by Dog and ExternalDog
+INDEXED_FIELDS = ("breed", "location")
+INDEXED_MODELS = (Dog, ExternalDog)
+
+# Prefixes matching more than HEAVY_PREFIX_SIZE entries keep a materialized
+# top-HEAVY_PREFIX_TOP list that is updated in place on writes, so short
+# prefixes ("m", "ma") never rescan thousands of entries
+HEAVY_PREFIX_SIZE = 64
+HEAVY_PREFIX_TOP = 20
+
+
+def normalize(value: str) -> str:
+    """Lowercase, strip accents and collapse whitespace ("Málaga " -> "malaga")"""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+class PrefixIndex:
+    """Frequency-weighted prefix index over a set of strings.
+
+    Every word start of a normalized value is kept in a sorted array, so a
+    prefix lookup is a bisect plus a scan of the matching slice. Prefixes
+    whose slice is large keep their top values materialized instead.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[str, str]] = []  # (word suffix, normalized value)
+        self._counts: Counter = Counter()  # normalized value -> frequency
+        self._spellings: Dict[str, Counter] = defaultdict(Counter)  # normalized -> originals
+        self._heavy: Dict[str, List[str]] = {}  # prefix -> top normalized values
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    @staticmethod
+    def _suffixes(normalized: str) -> List[str]:
+        words = normalized.split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    def load(self, pairs: Iterable[Tuple[str, int]]):
+        """Bulk-load (value, count) pairs with a single sort"""
+        for value, count in pairs:
+            self._count(value, count)
+
+        self._keys = sorted(
+            (suffix, normalized) for normalized in self._counts for suffix in self._suffixes(normalized)
+        )
+        self._heavy = {}
+        for length in (1, 2, 3):
+            self._materialize(length)
+
+    def _materialize(self, length: int):
+        """Materialize every prefix of the given length that matches a large slice"""
+        start = 0
+        while start < len(self._keys):
+            prefix = self._keys[start][0][:length]
+            if len(prefix) < length:
+                start += 1
+                continue
+            end = bisect_left(self._keys, (prefix + "\uffff",), start)
+            if end - start > HEAVY_PREFIX_SIZE:
+                self._heavy[prefix] = self._rank(start, end, HEAVY_PREFIX_TOP)
+            start = end
+
+    def _count(self, value: Optional[str], count: int) -> Optional[str]:
+        if not value or not count:
+            return None
+        normalized = normalize(value)
+        if not normalized:
+            return None
+
+        spellings = self._spellings[normalized]
+        spellings[value.strip()] += count
+        if spellings[value.strip()] <= 0:
+            del spellings[value.strip()]
+
+        self._counts[normalized] += count
+        if self._counts[normalized] <= 0:
+            del self._counts[normalized]
+            del self._spellings[normalized]
+        return normalized
+
+    def add(self, value: Optional[str], count: int = 1):
+        """Add `count` occurrences of `value` (negative counts remove them)"""
+        previous = self._counts[normalize(value)] if value else 0
+        normalized = self._count(value, count)
+        if normalized is None:
+            return
+        current = self._counts.get(normalized, 0)
+
+        for suffix in self._suffixes(normalized):
+            if current <= 0:
+                index = bisect_left(self._keys, (suffix, normalized))
+                if index < len(self._keys) and self._keys[index] == (suffix, normalized):
+                    del self._keys[index]
+            elif previous <= 0:
+                insort(self._keys, (suffix, normalized))
+
+            for end in range(1, len(suffix) + 1):
+                top = self._heavy.get(suffix[:end])
+                if top is not None:
+                    self._update_top(suffix[:end], top, normalized, count)
+
+    def _update_top(self, prefix: str, top: List[str], normalized: str, count: int):
+        counts = self._counts
+        if normalized in top:
+            if count < 0 and len(top) == HEAVY_PREFIX_TOP:
+                # Something outside the list may now outrank it: recompute on next read
+                del self._heavy[prefix]
+                return
+            if normalized not in counts:
+                top.remove(normalized)
+        elif count > 0 and (len(top) < HEAVY_PREFIX_TOP or counts[normalized] >= counts[top[-1]]):
+            top.append(normalized)
+        else:
+            return
+        top.sort(key=lambda value: (-counts[value], value))
+        del top[HEAVY_PREFIX_TOP:]
+
+    def _display(self, normalized: str) -> str:
+        spellings = self._spellings.get(normalized)
+        if not spellings:
+            return normalized
+        return spellings.most_common(1)[0][0]
+
+    def suggest(self, query: str, limit: int = 10) -> List[str]:
+        """Return up to `limit` values with a word starting with `query`, most frequent first"""
+        prefix = normalize(query or "")
+        if not prefix:
+            return self.top(limit)
+
+        top = self._heavy.get(prefix)
+        if top is None or limit > len(top) == HEAVY_PREFIX_TOP:
+            start = bisect_left(self._keys, (prefix,))
+            end = bisect_left(self._keys, (prefix + "\uffff",), start)
+            if end - start > HEAVY_PREFIX_SIZE and limit <= HEAVY_PREFIX_TOP:
+                top = self._heavy[prefix] = self._rank(start, end, HEAVY_PREFIX_TOP)
+            else:
+                top = self._rank(start, end, limit)
+
+        return [self._display(normalized) for normalized in top[:limit]]
+
+    def _rank(self, start: int, end: int, limit: int) -> List[str]:
+        matches = {normalized for _, normalized in self._keys[start:end]}
+        counts = self._counts
+        return heapq.nsmallest(limit, matches, key=lambda normalized: (-counts[normalized], normalized))
+
+    def top(self, limit: int = 10) -> List[str]:
+        """Most frequent values overall"""
+        return [self._display(normalized) for normalized, _ in self._counts.most_common(limit)]
+
+    def values(self) -> List[str]:
+        """All distinct values, in alphabetical (normalized) order"""
+        return [self._display(normalized) for normalized in sorted(self._counts)]
+
+
+class AutocompleteService:
+    """Keeps one PrefixIndex per indexed field, in sync with the dog tables"""
+
+    def __init__(self):
+        self.indexes: Dict[str, PrefixIndex] = {field: PrefixIndex() for field in INDEXED_FIELDS}
+        self.is_built = False
+        self._lock = threading.RLock()
+
+    def ensure_built(self, db: Session):
+        """Build the indexes from the database on first use"""
+        if self.is_built:
+            return
+        with self._lock:
+            if not self.is_built:
+                self.rebuild(db)
+
+    def rebuild(self, db: Session):
+        """Rebuild every index from scratch with one GROUP BY per table and field"""
+        with self._lock:
+            indexes = {}
+            for field in INDEXED_FIELDS:
+                rows = []
+                for model in INDEXED_MODELS:
+                    column = getattr(model, field)
+                    rows += db.query(column, func.count()).filter(column.isnot(None)).group_by(column).all()
+                indexes[field] = PrefixIndex()
+                indexes[field].load(rows)
+
+            self.indexes = indexes
+            self.is_built = True
+            logger.info(
+                "Autocomplete indexes built: "
+                + ", ".join(f"{field}={len(index)}" for field, index in indexes.items())
+            )
+
+    def suggest(self, field: str, query: str, limit: int = 10) -> List[str]:
+        with self._lock:
+            return self.indexes[field].suggest(query, limit)
+
+    def values(self, field: str) -> List[str]:
+        with self._lock:
+            return self.indexes[field].values()
+
+    def apply(self, deltas: List[Tuple[str, str, int]]):
+        """Apply (field, value, count) deltas collected from committed flushes"""
+        if not self.is_built or not deltas:
+            return
+        with self._lock:
+            for field, value, count in deltas:
+                self.indexes[field].add(value, count)
+
+
+def _collect_deltas(session: Session, flush_context, instances):
+    """Record value changes of indexed fields; applied only once the transaction commits"""
+    deltas = session.info.setdefault("autocomplete_deltas", [])
+
+    for obj in session.new:
+        if isinstance(obj, INDEXED_MODELS):
+            for field in INDEXED_FIELDS:
+                deltas.append((field, getattr(obj, field), 1))
+
+    for obj in session.deleted:
+        if isinstance(obj, INDEXED_MODELS):
+            for field in INDEXED_FIELDS:
+                history = _history(obj, field)
+                old = history.deleted[0] if history.deleted else getattr(obj, field)
+                deltas.append((field, old, -1))
+
+    for obj in session.dirty:
+        if isinstance(obj, INDEXED_MODELS):
+            for field in INDEXED_FIELDS:
+                history = _history(obj, field)
+                for old in history.deleted:
+                    deltas.append((field, old, -1))
+                for new in history.added:
+                    deltas.append((field, new, 1))
+
+
+def _history(obj, field: str):
+    return inspect(obj).attrs[field].history
+
+
+def _apply_deltas(session: Session):
+    deltas = session.info.pop("autocomplete_deltas", None)
+    if deltas:
+        autocomplete_service.apply(deltas)
+
+
+def _discard_deltas(session: Session, transaction):
+    # Runs after after_commit, so only uncommitted (rolled back or closed) deltas remain
+    if transaction.parent is None:
+        session.info.pop("autocomplete_deltas", None)
+
+
+event.listen(Session, "before_flush", _collect_deltas)
+event.listen(Session, "after_commit", _apply_deltas)
+event.listen(Session, "after_transaction_end", _discard_deltas)
+
+# Global autocomplete instance
+autocomplete_service = AutocompleteService()
@@ -1,10 +1,17 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
+from app.core.metrics import scraper_stage_duration, scraper_syncs
 from app.models.external_shelter import ExternalShelter, ExternalDog
 from app.schemas.external_shelter import SyncResult
+from app.services.analytics import analytics_service
+from app.services.dedup import dedup_service
+from app.services.photo_mirror import photo_mirror
 from datetime import datetime
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -18,59 +25,64 @@ class BaseScraper(ABC):
         self.dogs_created = 0
         self.dogs_updated = 0
         self.dogs_marked_unavailable = 0
+        self.dogs_linked_as_duplicates = 0
+        self.photos_mirrored = 0
         
     @abstractmethod
     async def fetch_dogs(self) -> List[Dict[str, Any]]:
         """Fetch dogs from the external source"""
         pass
     
+    @contextmanager
+    def _stage(self, stage: str):
+        """Time one sync stage for the scraper_stage_duration_seconds metric"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            scraper_stage_duration.observe(time.perf_counter() - started, stage=stage, **self._metric_labels())
+    
+    def _metric_labels(self) -> Dict[str, str]:
+        return {"shelter": self.shelter.id, "integration": getattr(self.shelter.integration_type, "value", "")}
+    
     async def sync(self) -> SyncResult:
         """Main sync method"""
         try:
             logger.info(f"Starting sync for shelter {self.shelter.name}")
             
-            # Fetch dogs from external source
-            external_dogs_data = await self.fetch_dogs()
+            # Fetch dogs from external source (download and extraction happen together)
+            with self._stage("fetch"):
+                external_dogs_data = await self.fetch_dogs()
             self.dogs_found = len(external_dogs_data)
             
-            # Track current external IDs to mark missing dogs as unavailable
-            current_external_ids = set()
+            with self._stage("process"):
+                synced_dogs, current_external_ids = self._process_dogs(external_dogs_data)
             
-            # Process each dog
-            for dog_data in external_dogs_data:
-                external_id = dog_data.get('external_id')
-                if not external_id:
-                    continue
-                    
-                current_external_ids.add(external_id)
-                
-                # Check if dog already exists
-                existing_dog = self.db.query(ExternalDog).filter(
-                    ExternalDog.external_shelter_id == self.shelter.id,
-                    ExternalDog.external_id == external_id
-                ).first()
-                
-                if existing_dog:
-                    # Update existing dog
-                    self._update_dog(existing_dog, dog_data)
-                    self.dogs_updated += 1
-                else:
-                    # Create new dog
-                    self._create_dog(dog_data)
-                    self.dogs_created += 1
-            
-            # Mark dogs as unavailable if they're no longer in the source
-            self._mark_unavailable_dogs(current_external_ids)
+                # Mark dogs as unavailable if they're no longer in the source
+                self._mark_unavailable_dogs(current_external_ids)
+            
+                # Link dogs cross-posted by other shelters into duplicate clusters
+                self.db.flush()
+                self.dogs_linked_as_duplicates = dedup_service.deduplicate(self.db, synced_dogs)
             
             # Update shelter sync status
             self.shelter.last_sync = datetime.utcnow()
             self.shelter.last_error = None
+            analytics_service.record_sync(self.db, succeeded=True, dogs_found=self.dogs_found)
             
-            self.db.commit()
+            with self._stage("commit"):
+                self.db.commit()
+            
+            # Download new photos after committing, so no transaction stays open meanwhile
+            with self._stage("mirror"):
+                await self._mirror_photos(synced_dogs)
             
             logger.info(f"Sync completed for shelter {self.shelter.name}: "
                        f"{self.dogs_found} found, {self.dogs_created} created, "
-                       f"{self.dogs_updated} updated, {self.dogs_marked_unavailable} marked unavailable")
+                       f"{self.dogs_updated} updated, {self.dogs_marked_unavailable} marked unavailable, "
+                       f"{self.dogs_linked_as_duplicates} linked as duplicates, "
+                       f"{self.photos_mirrored} photos mirrored")
+            scraper_syncs.inc(result="success", **self._metric_labels())
             
             return SyncResult(
                 shelter_id=self.shelter.id,
@@ -79,15 +91,19 @@ class BaseScraper(ABC):
                 dogs_created=self.dogs_created,
                 dogs_updated=self.dogs_updated,
                 dogs_marked_unavailable=self.dogs_marked_unavailable,
+                dogs_linked_as_duplicates=self.dogs_linked_as_duplicates,
+                photos_mirrored=self.photos_mirrored,
                 sync_time=datetime.utcnow()
             )
             
         except Exception as e:
             logger.error(f"Sync failed for shelter {self.shelter.name}: {str(e)}")
+            scraper_syncs.inc(result="error", **self._metric_labels())
             
             # Update shelter error status
             self.shelter.last_error = str(e)
             self.shelter.status = "error"
+            analytics_service.record_sync(self.db, succeeded=False, dogs_found=0)
             self.db.commit()
             
             return SyncResult(
@@ -101,7 +117,48 @@ class BaseScraper(ABC):
                 sync_time=datetime.utcnow()
             )
     
-    def _create_dog(self, dog_data: Dict[str, Any]):
+    def _process_dogs(self, external_dogs_data: List[Dict[str, Any]]):
+        """Create or update a row per fetched dog; returns the synced dogs and the IDs seen"""
+        
+        # Track current external IDs to mark missing dogs as unavailable
+        current_external_ids = set()
+        synced_dogs = []
+        
+        # Process each dog
+        for dog_data in external_dogs_data:
+            external_id = dog_data.get('external_id')
+            if not external_id:
+                continue
+                
+            current_external_ids.add(external_id)
+            
+            # Check if dog already exists
+            existing_dog = self.db.query(ExternalDog).filter(
+                ExternalDog.external_shelter_id == self.shelter.id,
+                ExternalDog.external_id == external_id
+            ).first()
+            
+            if existing_dog:
+                # Update existing dog
+                self._update_dog(existing_dog, dog_data)
+                synced_dogs.append(existing_dog)
+                self.dogs_updated += 1
+            else:
+                # Create new dog
+                synced_dogs.append(self._create_dog(dog_data))
+                self.dogs_created += 1
+        
+        return synced_dogs, current_external_ids
+    
+    async def _mirror_photos(self, dogs: List[ExternalDog]):
+        """Mirror remote photos locally; failures keep the remote URLs and don't fail the sync"""
+        try:
+            self.photos_mirrored = await photo_mirror.mirror_dogs(self.db, dogs)
+        except Exception as e:
+            logger.warning(f"Photo mirroring failed for shelter {self.shelter.name}: {str(e)}")
+            self.db.rollback()
+    
+    def _create_dog(self, dog_data: Dict[str, Any]) -> ExternalDog:
         """Create a new external dog"""
         dog = ExternalDog(
             external_shelter_id=self.shelter.id,
@@ -123,6 +180,7 @@ class BaseScraper(ABC):
         )
         
         self.db.add(dog)
+        return dog
     
     def _update_dog(self, existing_dog: ExternalDog, dog_data: Dict[str, Any]):
         """Update an existing external dog"""
@@ -140,6 +198,11 @@ class BaseScraper(ABC):
         existing_dog.photos = dog_data.get('photos', existing_dog.photos)
         existing_dog.is_available = True
         existing_dog.last_seen = datetime.utcnow()
+        
+        state = inspect(existing_dog)
+        if not any(state.attrs[key].history.has_changes() for key in state.mapper.column_attrs.keys() if key != "last_seen"):
+            # Only seen again: keep updated_at (SET updated_at = updated_at skips onupdate) so incremental exports skip it
+            existing_dog.updated_at = ExternalDog.updated_at
     
     def _mark_unavailable_dogs(self, current_external_ids: set):
         """Mark dogs as unavailable if they're no longer in the source"""
@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, event, inspect, literal, select
+from sqlalchemy.orm import Query, Session
+from app.models.change_log import ChangeLogEntry
+from app.models.dog import Dog
+from app.models.external_shelter import ExternalDog
+from app.models.foster_application import FosterApplication
+import logging
+
+logger = logging.getLogger(__name__)
+
+ENTITIES = {Dog: "dog", FosterApplication: "foster_application"}
+
+# Only logged when deleted in bulk, through forget()
+BULK_DELETED = {ExternalDog: "external_dog"}
+
+ENTITY_NAMES = (*ENTITIES.values(), *BULK_DELETED.values())
+
+
+def _status(obj) -> Optional[str]:
+    value = obj.status
+    if value is None:
+        # A row pending insert only gets its default status in the INSERT itself
+        default = type(obj).__table__.c.status.default
+        value = default.arg if default is not None else None
+    return getattr(value, "value", value)
+
+
+class ChangeLog:
+    """Appends an entry to change_log whenever a dog or foster application is
+    created, changes status or is deleted.
+
+    Entries are inserted by the flush that makes the change, on the same
+    connection, so they commit or roll back with it. `seq` only grows, which
+    lets consumers (caches, notifications, search indexes) tail the log with
+    `since` instead of rescanning tables. Writers are serialized by SQLite, so
+    entries become visible in seq order.
+    """
+
+    def _after_flush(self, session: Session, flush_context):
+        dogs: List[Dict] = []
+        applications: List[Dict] = []
+
+        def add(obj, action: str, old_status: Optional[str], new_status: Optional[str]):
+            entry = {
+                "entity": ENTITIES[type(obj)],
+                "entity_id": obj.id,
+                "action": action,
+                "old_status": old_status,
+                "new_status": new_status,
+            }
+            if isinstance(obj, Dog):
+                dogs.append({**entry, "owner_id": obj.owner_id})
+            else:
+                applications.append({**entry, "dog_id": obj.dog_id})
+
+        for obj in session.new:
+            if type(obj) in ENTITIES:
+                add(obj, "created", None, _status(obj))
+        for obj in session.dirty:
+            if type(obj) in ENTITIES and obj not in session.deleted:
+                history = inspect(obj).attrs.status.history
+                old_status = getattr(history.deleted[0], "value", history.deleted[0]) if history.deleted else None
+                new_status = _status(obj)
+                if history.has_changes() and old_status != new_status:
+                    add(obj, "status_changed", old_status, new_status)
+        for obj in session.deleted:
+            if type(obj) in ENTITIES:
+                history = inspect(obj).attrs.status.history
+                old_status = getattr(history.deleted[0], "value", history.deleted[0]) if history.deleted else _status(obj)
+                add(obj, "deleted", old_status, None)
+
+        connection = session.connection()
+        table = ChangeLogEntry.__table__
+        if dogs:
+            connection.execute(table.insert(), dogs)
+        if applications:
+            owner = select(Dog.owner_id).where(Dog.id == bindparam("dog_id")).scalar_subquery()
+            connection.execute(table.insert().values(owner_id=owner), applications)
+
+    def forget(self, db: Session, query: Query):
+        """Log the rows of `query` as deleted, before deleting them with a bulk query.delete()"""
+        model = query.column_descriptions[0]["entity"]
+        rows = query.with_entities(literal(BULK_DELETED[model]), model.id, literal("deleted"))
+        db.execute(ChangeLogEntry.__table__.insert().from_select(["entity", "entity_id", "action"], rows.statement))
+
+    def tail(self, db: Session, since: int = 0, limit: int = 500, owner_id: Optional[int] = None,
+             entity: Optional[str] = None) -> Tuple[List[ChangeLogEntry], bool]:
+        """Entries after `since` in seq order, and whether more follow"""
+        query = db.query(ChangeLogEntry).filter(ChangeLogEntry.seq > since)
+        if owner_id is not None:
+            query = query.filter(ChangeLogEntry.owner_id == owner_id)
+        if entity is not None:
+            query = query.filter(ChangeLogEntry.entity == entity)
+        entries = query.order_by(ChangeLogEntry.seq).limit(limit + 1).all()
+        return entries[:limit], len(entries) > limit
+
+
+# Global change log instance
+change_log = ChangeLog()
+
+event.listen(Session, "after_flush", change_log._after_flush)
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+# Load the previous status when it's overwritten on an expired object, so the entry can record it
+for _model in ENTITIES:
+    event.listen(_model.status, "set", _keep_old_value, active_history=True, retval=True)
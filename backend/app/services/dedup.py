@@ -0,0 +1,265 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Query, Session
+from app.models.external_shelter import ExternalDog
+from app.services.autocomplete import normalize
+import numpy as np
+import threading
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 128 hash functions split into 16 bands of 8 rows: pairs with Jaccard
+# similarity above ~(1/16)^(1/8) = 0.71 collide in at least one band
+NUM_PERMUTATIONS = 128
+NUM_BANDS = 16
+SHINGLE_SIZE = 4
+
+# Estimated Jaccard similarity required to link two candidates
+SIMILARITY_THRESHOLD = 0.6
+
+# Fields that make up a dog's text fingerprint
+FINGERPRINT_FIELDS = ("name", "breed", "description")
+
+
+def fingerprint_text(dog) -> str:
+    return " | ".join(normalize(getattr(dog, field) or "") for field in FINGERPRINT_FIELDS)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Character shingles of the normalized text"""
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures using multiply-shift hashing over CRC32 shingle hashes"""
+
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(0, 2 ** 64, num_permutations, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 64, num_permutations, dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        tokens = shingles(text)
+        if not tokens:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint64, count=len(tokens)
+        )
+        # Multiply-shift: (a * h + b) mod 2**64 with odd 64-bit a, keeping the high 32 bits
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) >> np.uint64(32)
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(first == second))
+
+
+def same_dog_name(first: str, second: str) -> bool:
+    """Littermates share templated descriptions, so names must agree too"""
+    return bool(first) and bool(second) and (first == second or first in second or second in first)
+
+
+class LSHIndex:
+    """Banded locality-sensitive hashing index over MinHash signatures"""
+
+    def __init__(self, num_bands: int = NUM_BANDS):
+        self.num_bands = num_bands
+        self.buckets: List[Dict[bytes, Set[int]]] = [defaultdict(set) for _ in range(num_bands)]
+        self.signatures: Dict[int, np.ndarray] = {}
+        self.names: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _bands(self, signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band, chunk in enumerate(np.split(signature, self.num_bands)):
+            yield band, chunk.tobytes()
+
+    def add(self, key: int, signature: np.ndarray, name: str = ""):
+        self.remove(key)
+        self.signatures[key] = signature
+        self.names[key] = name
+        for band, bucket in self._bands(signature):
+            self.buckets[band][bucket].add(key)
+
+    def remove(self, key: int):
+        signature = self.signatures.pop(key, None)
+        self.names.pop(key, None)
+        if signature is None:
+            return
+        for band, bucket in self._bands(signature):
+            members = self.buckets[band].get(bucket)
+            if members:
+                members.discard(key)
+                if not members:
+                    del self.buckets[band][bucket]
+
+    def candidates(self, signature: np.ndarray) -> Set[int]:
+        found = set()
+        for band, bucket in self._bands(signature):
+            found |= self.buckets[band].get(bucket, set())
+        return found
+
+    def query(
+        self, signature: np.ndarray, name: str = "", threshold: float = SIMILARITY_THRESHOLD
+    ) -> List[Tuple[int, float]]:
+        """Verified near-duplicates of a signature, most similar first"""
+        matches = []
+        for key in self.candidates(signature):
+            score = similarity(signature, self.signatures[key])
+            if score >= threshold and same_dog_name(name, self.names[key]):
+                matches.append((key, score))
+        matches.sort(key=lambda item: -item[1])
+        return matches
+
+
+class DedupService:
+    """Links near-duplicate external dogs into clusters (ExternalDog.cluster_id)"""
+
+    def __init__(self):
+        self.hasher = MinHasher()
+        self.index = LSHIndex()
+        self.is_built = False
+        self._lock = threading.RLock()
+
+    def ensure_built(self, db: Session):
+        """Load stored signatures into the LSH index on first use"""
+        if self.is_built:
+            return
+        with self._lock:
+            if self.is_built:
+                return
+            rows = db.query(ExternalDog.id, ExternalDog.name, ExternalDog.minhash).filter(
+                ExternalDog.minhash.isnot(None)
+            )
+            for row in rows.yield_per(5000):
+                self.index.add(row.id, np.frombuffer(row.minhash, dtype=np.uint32), normalize(row.name or ""))
+            self.is_built = True
+            logger.info(f"Dedup LSH index built with {len(self.index)} signatures")
+
+    def deduplicate(self, db: Session, dogs: List[ExternalDog]) -> int:
+        """Sign dogs and merge the ones whose text changed into duplicate clusters.
+
+        Dogs must be flushed (have ids). New signatures are staged on the
+        session and only reach the shared index once it commits. Returns the
+        number of dogs that were newly linked to an existing cluster or dog.
+        """
+        self.ensure_built(db)
+        staged = db.info.setdefault("dedup_staged", {}).setdefault(self, LSHIndex())
+        linked = 0
+
+        with self._lock:
+            for dog in dogs:
+                signature = self.hasher.signature(fingerprint_text(dog))
+                if signature is None:
+                    continue
+                if dog.minhash == signature.tobytes() and dog.id in self.index.signatures:
+                    continue  # Text unchanged since it was last linked
+                dog.minhash = signature.tobytes()
+                name = normalize(dog.name or "")
+
+                # Dogs signed earlier in this transaction are matched on their staged signature
+                matches = [
+                    key for key, _ in self.index.query(signature, name)
+                    if key != dog.id and key not in staged.signatures
+                ]
+                matches += [key for key, _ in staged.query(signature, name) if key != dog.id]
+                staged.add(dog.id, signature, name)
+
+                if matches:
+                    if self._merge(db, dog, matches):
+                        linked += 1
+                elif dog.cluster_id:
+                    self._unlink(db, dog)
+
+        return linked
+
+    def apply(self, staged: LSHIndex):
+        """Add signatures staged by a committed transaction to the shared index"""
+        if not self.is_built:
+            return
+        with self._lock:
+            for key, signature in staged.signatures.items():
+                self.index.add(key, signature, staged.names[key])
+
+    def _merge(self, db: Session, dog: ExternalDog, matches: List[int]) -> bool:
+        """Give the dog and every matched dog's cluster a single cluster id"""
+        db.flush()  # Earlier merges in this batch must be visible to the queries below
+        matched = db.query(ExternalDog).filter(ExternalDog.id.in_(matches)).all()
+        if not matched:
+            return False
+
+        cluster_ids = {other.cluster_id or other.id for other in matched}
+        if dog.cluster_id:
+            cluster_ids.add(dog.cluster_id)
+        target = min(cluster_ids | {dog.id})
+
+        members = db.query(ExternalDog).filter(ExternalDog.cluster_id.in_(cluster_ids)).all()
+        for member in set(members) | set(matched) | {dog}:
+            member.cluster_id = target
+        return True
+
+    def _unlink(self, db: Session, dog: ExternalDog):
+        """Take a dog whose text no longer matches anything out of its cluster"""
+        cluster_id = dog.cluster_id
+        dog.cluster_id = None
+        db.flush()
+        rest = db.query(ExternalDog).filter(ExternalDog.cluster_id == cluster_id).all()
+        if len(rest) == 1:
+            rest[0].cluster_id = None
+        elif rest and cluster_id == dog.id:
+            # The cluster was keyed by this dog's id
+            target = min(member.id for member in rest)
+            for member in rest:
+                member.cluster_id = target
+
+
+def collapse_duplicates(query: Query) -> Query:
+    """Keep one dog per duplicate cluster (the lowest id) among the rows `query` selects.
+
+    Apply it after every other filter: copies of a dog often differ in breed
+    or location, so the representative must be chosen among the matches.
+    """
+    ranked = query.with_entities(
+        ExternalDog.id,
+        func.row_number().over(
+            partition_by=func.coalesce(ExternalDog.cluster_id, ExternalDog.id),
+            order_by=ExternalDog.id,
+        ).label("cluster_rank"),
+    ).order_by(None).subquery()
+    return query.filter(ExternalDog.id.in_(select(ranked.c.id).where(ranked.c.cluster_rank == 1)))
+
+
+def collapse_located(located: List[Tuple[float, object]]) -> List[Tuple[float, object]]:
+    """collapse_duplicates for `near` results, which are only exact once distances are checked"""
+    representatives = {}
+    for distance, row in located:
+        cluster = row.cluster_id or row.id
+        if cluster not in representatives or row.id < representatives[cluster][1].id:
+            representatives[cluster] = (distance, row)
+    kept = {id(row) for _, row in representatives.values()}
+    return [(distance, row) for distance, row in located if id(row) in kept]
+
+
+def _apply_staged(session: Session):
+    for service, staged in session.info.pop("dedup_staged", {}).items():
+        service.apply(staged)
+
+
+def _discard_staged(session: Session, transaction):
+    # Runs after after_commit, so only uncommitted (rolled back or closed) signatures remain
+    if transaction.parent is None:
+        session.info.pop("dedup_staged", None)
+
+
+event.listen(Session, "after_commit", _apply_staged)
+event.listen(Session, "after_transaction_end", _discard_staged)
+
+# Global dedup instance
+dedup_service = DedupService()
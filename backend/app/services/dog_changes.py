@@ -0,0 +1,106 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import String, and_, literal, or_
+from sqlalchemy.orm import Session
+from app.models.change_log import ChangeLogEntry
+from app.models.dog import Dog
+from app.models.external_shelter import ExternalDog
+from app.schemas.dog import DOG_RESPONSE_COLUMNS
+from app.schemas.external_shelter import EXTERNAL_DOG_RESPONSE_COLUMNS
+
+
+def watermark_now() -> datetime:
+    """Watermark for changes read from now on (naive UTC, like the stored timestamps).
+
+    Timestamps are stored with second precision, so it's a second early: a
+    change made in the same second as the read is sent again next time
+    instead of being missed.
+    """
+    return datetime.utcnow().replace(microsecond=0) - timedelta(seconds=1)
+
+
+def utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def at_or_after(column, since: datetime):
+    """`column >= since`, compared the way SQLite stores the timestamps.
+
+    func.now() stores 'YYYY-MM-DD HH:MM:SS' while a bound datetime renders
+    with '.ffffff', so a plain comparison would leave out rows stamped in the
+    same second as `since`. Binding the second as text keeps the column's
+    index usable.
+    """
+    return column >= literal(since.strftime("%Y-%m-%d %H:%M:%S"), String)
+
+
+def changed_since(model, since: datetime):
+    """Filter for rows created or updated at or after `since`.
+
+    Either side of the OR can use its index; coalesce(updated_at, created_at)
+    could use neither.
+    """
+    return or_(
+        at_or_after(model.updated_at, since),
+        and_(model.updated_at.is_(None), at_or_after(model.created_at, since)),
+    )
+
+
+@dataclass
+class DogChanges:
+    dogs: List = field(default_factory=list)  # DOG_RESPONSE_COLUMNS rows
+    external_dogs: List = field(default_factory=list)  # EXTERNAL_DOG_RESPONSE_COLUMNS rows
+    removed: List[dict] = field(default_factory=list)  # {"type", "id", "reason"}
+    reset: bool = False
+
+
+class DogChangesService:
+    """Local and external dogs that changed since a watermark, for clients keeping a cached list.
+
+    Local dogs in any status are upserts, since clients filter by status.
+    External dogs still available are upserts and the ones marked
+    unavailable by a sync are removals. Deletions come from the change log.
+    When more than `limit` things changed, or there's no watermark yet, the
+    answer is a reset: reload the full lists and keep the new watermark.
+    """
+
+    def changes(self, db: Session, since: Optional[datetime], limit: int) -> DogChanges:
+        if since is None:
+            return DogChanges(reset=True)
+
+        # One row over the limit on each query is enough to tell it was exceeded
+        dogs = db.query(*DOG_RESPONSE_COLUMNS).filter(changed_since(Dog, since)).order_by(Dog.id).limit(limit + 1).all()
+        external = db.query(*EXTERNAL_DOG_RESPONSE_COLUMNS).filter(
+            changed_since(ExternalDog, since)
+        ).order_by(ExternalDog.id).limit(limit + 1).all()
+        deleted = db.query(ChangeLogEntry.entity, ChangeLogEntry.entity_id).filter(
+            at_or_after(ChangeLogEntry.changed_at, since),
+            ChangeLogEntry.action == "deleted",
+            ChangeLogEntry.entity.in_(("dog", "external_dog")),
+        ).order_by(ChangeLogEntry.seq).limit(limit + 1).all()
+        if len(dogs) + len(external) + len(deleted) > limit:
+            return DogChanges(reset=True)
+
+        result = DogChanges(dogs=dogs)
+        current = {("local", row.id) for row in dogs}
+        for row in external:
+            current.add(("external", row.id))
+            if row.is_available:
+                result.external_dogs.append(row)
+            else:
+                result.removed.append({"type": "external", "id": row.id, "reason": "unavailable"})
+
+        # A row that exists now wins over an earlier deletion of its id (SQLite may reuse the highest id)
+        for entity, entity_id in deleted:
+            key = ("local" if entity == "dog" else "external", entity_id)
+            if key not in current:
+                current.add(key)
+                result.removed.append({"type": key[0], "id": entity_id, "reason": "deleted"})
+        return result
+
+
+# Global dog changes service instance
+dog_changes_service = DogChangesService()
@@ -0,0 +1,395 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.change_log import ChangeLogEntry
+from app.models.dog import Dog, DogStatus
+from app.models.external_shelter import ExternalDog, ExternalShelter, mirrored_urls
+from app.services.dog_changes import at_or_after, changed_since
+from app.schemas.dog import DogCreate
+import asyncio
+import codecs
+import csv
+import enum
+import io
+import json
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# Columns written by exports; imports read the DogCreate ones and ignore the rest
+EXPORT_FIELDS = [
+    "id", *DogCreate.model_fields, "status", "photos", "latitude", "longitude", "created_at", "updated_at",
+]
+
+# External catalog exports: dog columns, then the shelter's (flattened as shelter_<name> in CSV)
+EXTERNAL_EXPORT_FIELDS = [
+    "id", "external_shelter_id", "external_id", "name", "breed", "age", "size", "gender", "weight",
+    "description", "medical_info", "behavior_notes", "location", "latitude", "longitude", "original_url",
+    "photos", "is_available", "cluster_id", "last_seen", "created_at", "updated_at",
+]
+EXTERNAL_SHELTER_EXPORT_FIELDS = ["id", "name", "website_url", "location", "contact_email", "contact_phone"]
+
+# Longest CSV record or NDJSON line accepted, so an unclosed quote can't buffer the whole body
+MAX_RECORD_CHARS = 64 * 1024
+
+# Row errors listed in an import report; later ones are only counted
+MAX_REPORTED_ERRORS = 1000
+
+# Exports hand Starlette chunks of about this size
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_FETCH_ROWS = 1000
+GZIP_LEVEL = 6
+
+
+class DogImportError(Exception):
+    """Body that can't be read as the declared format"""
+
+
+@dataclass
+class ImportReport:
+    received: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: List[Dict] = field(default_factory=list)  # {"row": n, "message": ...}, first MAX_REPORTED_ERRORS
+    stopped: Optional[str] = None  # Why the import ended before the end of the body
+
+    def fail(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "message": message})
+
+
+def detect_format(format: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Explicit `format`, or the one matching the request's Content-Type"""
+    if format:
+        return format if format in FORMATS else None
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in ("application/x-ndjson", "application/jsonl", "application/ndjson"):
+        return "ndjson"
+    if media_type in ("text/csv", "application/csv"):
+        return "csv"
+    return None
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}" for item in error.errors()
+    )
+
+
+async def _lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a UTF-8 body (BOM allowed) into lines as chunks arrive"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    try:
+        async for chunk in stream:
+            lines = (pending + decoder.decode(chunk)).split("\n")
+            pending = lines.pop()
+            if len(pending) > MAX_RECORD_CHARS:
+                raise DogImportError(f"Line longer than {MAX_RECORD_CHARS} characters")
+            for line in lines:
+                yield line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise DogImportError("Body is not valid UTF-8")
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def _csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Union[Dict, str]]]:
+    """(row number, values) per CSV record, or (row number, error).
+
+    The first record is the header. A record continues on the next line while
+    it has an odd number of quotes, i.e. a quoted field holds a newline. Empty
+    cells are left out so the DogCreate defaults apply.
+    """
+    header: Optional[List[str]] = None
+    record: Optional[str] = None
+    quotes = 0
+    number = 0
+
+    async for line in lines:
+        record = line if record is None else f"{record}\n{line}"
+        quotes += line.count('"')
+        if quotes % 2:
+            if len(record) > MAX_RECORD_CHARS:
+                raise DogImportError(f"Record longer than {MAX_RECORD_CHARS} characters (unclosed quote?)")
+            continue
+
+        fields = next(csv.reader([record]), [])
+        record, quotes = None, 0
+        if header is None:
+            header = [name.strip() for name in fields]
+            if "name" not in header:
+                raise DogImportError("CSV header must include a name column")
+            continue
+        if not any(value.strip() for value in fields):
+            continue
+
+        number += 1
+        if len(fields) > len(header):
+            yield number, f"{len(fields)} fields but the header has {len(header)}"
+            continue
+        yield number, {name: value.strip() for name, value in zip(header, fields) if value.strip()}
+
+    if record is not None:
+        raise DogImportError("Body ends inside a quoted field")
+    if header is None:
+        raise DogImportError("Empty CSV body")
+
+
+async def _ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Union[Dict, str]]]:
+    """(row number, object) per non-blank line, or (row number, error)"""
+    number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            yield number, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(value, dict):
+            yield number, "Expected a JSON object"
+            continue
+        yield number, value
+
+
+def _keyset_pages(query, key) -> Iterator:
+    """Rows of `query` in `key` order, read EXPORT_FETCH_ROWS at a time after the last key seen.
+
+    Each page is fetched completely before its rows are handed out, so no
+    statement stays open (holding SQLite's shared lock and blocking writers)
+    while a slow client drains the response, and every page starts with an
+    index seek instead of skipping an OFFSET.
+    """
+    last = None
+    while True:
+        page = query if last is None else query.filter(key > last)
+        rows = page.order_by(key).limit(EXPORT_FETCH_ROWS).all()
+        yield from rows
+        if len(rows) < EXPORT_FETCH_ROWS:
+            return
+        last = getattr(rows[-1], key.key)
+
+
+def _json_value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _csv_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return " ".join(str(item) for item in value)
+    return value
+
+
+def serialize_records(records: Iterable[Dict], format: str, fields: List[str]) -> Iterator[bytes]:
+    """JSON-ready dicts as CSV (header from `fields`) or NDJSON, in chunks of about EXPORT_CHUNK_BYTES"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n") if format == "csv" else None
+    if writer:
+        writer.writerow(fields)
+    for record in records:
+        if writer:
+            writer.writerow([_csv_value(record.get(name)) for name in fields])
+        else:
+            buffer.write(json.dumps(record, ensure_ascii=False))
+            buffer.write("\n")
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_stream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Compress a streamed body on the fly (Content-Encoding: gzip)"""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip"""
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip() == "gzip":
+            quality = params.replace(" ", "").removeprefix("q=")
+            try:
+                return not quality or float(quality) > 0
+            except ValueError:
+                return True
+    return False
+
+
+class DogTransferService:
+    """Bulk import and export of dogs as CSV or NDJSON.
+
+    Imports read the request body as it arrives, validate each row against
+    DogCreate and insert every DOG_IMPORT_BATCH_SIZE valid rows in their own
+    transaction, so a bad row is reported instead of aborting the file and
+    memory doesn't grow with its size. Exports stream local dogs or the
+    external catalog in id order, page by page.
+    """
+
+    async def import_dogs(
+        self,
+        db: Session,
+        stream: AsyncIterator[bytes],
+        format: str,
+        owner_id: int,
+        batch_size: Optional[int] = None,
+        max_rows: Optional[int] = None,
+    ) -> ImportReport:
+        """Raises DogImportError if the body can't be read before any row is"""
+        batch_size = batch_size or settings.DOG_IMPORT_BATCH_SIZE
+        max_rows = max_rows or settings.DOG_IMPORT_MAX_ROWS
+        report = ImportReport()
+        batch: List[Tuple[int, DogCreate]] = []
+        loop = asyncio.get_running_loop()
+        rows = _csv_rows(_lines(stream)) if format == "csv" else _ndjson_rows(_lines(stream))
+
+        try:
+            async for number, row in rows:
+                if report.received >= max_rows:
+                    report.stopped = f"More than {max_rows} rows; the rest were not read"
+                    break
+                report.received += 1
+                if isinstance(row, str):
+                    report.fail(number, row)
+                    continue
+                try:
+                    batch.append((number, DogCreate.model_validate(row)))
+                except ValidationError as e:
+                    report.fail(number, _describe(e))
+                    continue
+                if len(batch) >= batch_size:
+                    # Inserts run off the event loop; the session is only used by one thread at a time
+                    await loop.run_in_executor(None, self._insert, db, batch, owner_id, report)
+                    batch = []
+        except DogImportError as e:
+            if not report.received:
+                raise
+            report.stopped = str(e)
+
+        if batch:
+            await loop.run_in_executor(None, self._insert, db, batch, owner_id, report)
+        logger.info(
+            f"Dog import for user {owner_id}: {report.created} created, {report.failed} failed"
+            + (f", stopped: {report.stopped}" if report.stopped else "")
+        )
+        return report
+
+    def _insert(self, db: Session, batch: List[Tuple[int, DogCreate]], owner_id: int, report: ImportReport):
+        try:
+            db.add_all([Dog(**dog.model_dump(), owner_id=owner_id) for _, dog in batch])
+            db.commit()
+            report.created += len(batch)
+        except SQLAlchemyError:
+            db.rollback()
+            logger.exception(f"Dog import batch of {len(batch)} rows failed")
+            for number, _ in batch:
+                report.fail(number, "Could not be saved")
+        finally:
+            # Committed dogs aren't needed again; don't let the identity map hold a whole file
+            db.expunge_all()
+
+    def export_dogs(self, format: str, owner_id: Optional[int] = None,
+                    status: Optional[DogStatus] = None) -> Iterator[bytes]:
+        """Dogs as CSV (with header) or NDJSON, in chunks.
+
+        Opens its own session: the response body is produced after the
+        request's session has been handed back.
+        """
+        db = SessionLocal()
+        try:
+            query = db.query(*[getattr(Dog, name) for name in EXPORT_FIELDS])
+            if owner_id is not None:
+                query = query.filter(Dog.owner_id == owner_id)
+            if status is not None:
+                query = query.filter(Dog.status == status)
+            records = (
+                {name: _json_value(value) for name, value in zip(EXPORT_FIELDS, row)}
+                for row in _keyset_pages(query, Dog.id)
+            )
+            yield from serialize_records(records, format, EXPORT_FIELDS)
+        finally:
+            db.close()
+
+    def export_external_dogs(self, format: str, updated_since: Optional[datetime] = None) -> Iterator[bytes]:
+        """External dogs with their shelter as CSV (flat shelter_* columns) or NDJSON (nested `shelter`).
+
+        Without `updated_since`, every available dog. With it, every dog
+        created or changed since then, including those no longer available,
+        followed by {"id", "deleted": true} records for dogs deleted since
+        then (from the change log), so partners can drop both.
+        """
+        db = SessionLocal()
+        try:
+            shelters = {
+                shelter.id: {name: getattr(shelter, name) for name in EXTERNAL_SHELTER_EXPORT_FIELDS}
+                for shelter in db.query(*[getattr(ExternalShelter, name) for name in EXTERNAL_SHELTER_EXPORT_FIELDS])
+            }
+            query = db.query(
+                *[getattr(ExternalDog, name) for name in EXTERNAL_EXPORT_FIELDS], ExternalDog.mirrored_photos
+            )
+            if updated_since is None:
+                query = query.filter(ExternalDog.is_available == True)
+            else:
+                query = query.filter(changed_since(ExternalDog, updated_since))
+
+            def records():
+                for row in _keyset_pages(query, ExternalDog.id):
+                    record = {name: _json_value(getattr(row, name)) for name in EXTERNAL_EXPORT_FIELDS}
+                    record["photos"] = mirrored_urls(row.photos, row.mirrored_photos)
+                    shelter = shelters.get(row.external_shelter_id) or {}
+                    if format == "csv":
+                        record.update({f"shelter_{name}": value for name, value in shelter.items() if name != "id"})
+                    else:
+                        record["shelter"] = shelter or None
+                    if updated_since is not None:
+                        record["deleted"] = False
+                    yield record
+                if updated_since is None:
+                    return
+                # A dog that exists now wins over an earlier deletion of its id (SQLite may reuse the highest id)
+                deleted = db.query(ChangeLogEntry.entity_id).filter(
+                    ChangeLogEntry.entity == "external_dog",
+                    ChangeLogEntry.action == "deleted",
+                    at_or_after(ChangeLogEntry.changed_at, updated_since),
+                    ChangeLogEntry.entity_id.notin_(db.query(ExternalDog.id)),
+                ).distinct()
+                for row in _keyset_pages(deleted, ChangeLogEntry.entity_id):
+                    yield {"id": row.entity_id, "is_available": False, "deleted": True}
+
+            fields = EXTERNAL_EXPORT_FIELDS + [
+                f"shelter_{name}" for name in EXTERNAL_SHELTER_EXPORT_FIELDS if name != "id"
+            ]
+            if updated_since is not None:
+                fields.append("deleted")
+            yield from serialize_records(records(), format, fields)
+        finally:
+            db.close()
+
+
+# Global dog transfer service instance
+dog_transfer_service = DogTransferService()
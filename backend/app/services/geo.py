@@ -0,0 +1,235 @@
+from math import asin, cos, radians, sin, sqrt
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, event, inspect, or_
+from sqlalchemy.orm import Query, Session
+from app.services.autocomplete import normalize
+import csv
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = Path(__file__).resolve().parent.parent / "data" / "municipios_es.csv"
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Precision stored on rows (~150 m cells); searches use shorter prefixes
+GEOHASH_PRECISION = 7
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+KM_PER_DEGREE = 111.32
+
+# Province names people write that differ from the gazetteer spelling
+PROVINCE_ALIASES = {
+    "vizcaya": "bizkaia",
+    "biscay": "bizkaia",
+    "guipuzcoa": "gipuzkoa",
+    "araba": "alava",
+    "baleares": "illes balears",
+    "islas baleares": "illes balears",
+    "mallorca": "illes balears",
+    "menorca": "illes balears",
+    "tenerife": "santa cruz de tenerife",
+    "gran canaria": "las palmas",
+    "rioja": "la rioja",
+    "castello": "castellon",
+    "asturies": "asturias",
+    "navarre": "navarra",
+    "nafarroa": "navarra",
+}
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a point as a base32 geohash"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    bits = []
+    even = True
+    while len(bits) < precision * 5:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            bits.append(longitude >= mid)
+            lon_range[0 if longitude >= mid else 1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            bits.append(latitude >= mid)
+            lat_range[0 if latitude >= mid else 1] = mid
+        even = not even
+
+    chars = []
+    for i in range(0, len(bits), 5):
+        value = 0
+        for bit in bits[i:i + 5]:
+            value = (value << 1) | bit
+        chars.append(GEOHASH_ALPHABET[value])
+    return "".join(chars)
+
+
+def geohash_cell_degrees(precision: int) -> Tuple[float, float]:
+    """(longitude, latitude) span in degrees of a geohash cell"""
+    bits = precision * 5
+    return 360.0 / 2 ** ((bits + 1) // 2), 180.0 / 2 ** (bits // 2)
+
+
+def covering_cells(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    """Geohash prefixes whose union covers the circle around a point.
+
+    Picks the finest precision whose cells are at least `radius_km` on each
+    side, then returns the cell containing the point plus its eight neighbours.
+    """
+    shrink = max(cos(radians(min(abs(latitude) + radius_km / KM_PER_DEGREE, 89.9))), 0.01)
+    precision = 1
+    for candidate in range(1, GEOHASH_PRECISION + 1):
+        dlon, dlat = geohash_cell_degrees(candidate)
+        if dlon * KM_PER_DEGREE * shrink >= radius_km and dlat * KM_PER_DEGREE >= radius_km:
+            precision = candidate
+
+    dlon, dlat = geohash_cell_degrees(precision)
+    cells = set()
+    for step_lat in (-1, 0, 1):
+        for step_lon in (-1, 0, 1):
+            lat = min(max(latitude + step_lat * dlat, -89.999999), 89.999999)
+            lon = (longitude + step_lon * dlon + 180) % 360 - 180
+            cells.add(geohash_encode(lat, lon, precision))
+    return sorted(cells)
+
+
+def parse_point(value: str) -> Tuple[float, float]:
+    """Parse a "lat,lon" string, raising ValueError if malformed or out of range"""
+    try:
+        latitude, longitude = (float(part) for part in value.split(","))
+    except (AttributeError, ValueError):
+        raise ValueError("Expected 'lat,lon'")
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise ValueError("Coordinates out of range")
+    return latitude, longitude
+
+
+class Gazetteer:
+    """Offline lookup of Spanish municipalities to coordinates"""
+
+    def __init__(self, path: Path = GAZETTEER_PATH):
+        self.path = path
+        self._places: Optional[Dict[str, Tuple[float, float]]] = None
+        self._provinces: Dict[str, Tuple[float, float]] = {}
+
+    def _load(self):
+        places = {}
+        provinces = {}
+        with open(self.path, encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                point = (float(row["latitude"]), float(row["longitude"]))
+                names = [row["name"]] + [alias for alias in (row.get("aliases") or "").split("|") if alias]
+                for name in names:
+                    places.setdefault(normalize(name), point)
+                if row.get("is_capital") == "1":
+                    provinces[normalize(row["province"])] = point
+
+        for alias, province in PROVINCE_ALIASES.items():
+            if province in provinces:
+                provinces.setdefault(alias, provinces[province])
+
+        self._provinces = provinces
+        self._places = places
+        logger.info(f"Gazetteer loaded: {len(places)} place names, {len(provinces)} provinces")
+
+    def geocode(self, location: Optional[str]) -> Optional[Tuple[float, float]]:
+        """Resolve free-text like "Calle Mayor 1, 28013 Madrid (España)" to (lat, lon).
+
+        Tries each comma/parenthesis-separated part, then word windows inside
+        each part from longest to shortest; falls back to the province capital.
+        """
+        if not location:
+            return None
+        if self._places is None:
+            self._load()
+
+        parts = [normalize(re.sub(r"\d+", " ", part)) for part in re.split(r"[,;()/\n]", location)]
+        parts = [part for part in parts if part]
+
+        for lookup in (self._places, self._provinces):
+            for part in parts:
+                if part in lookup:
+                    return lookup[part]
+            for part in parts:
+                words = part.split(" ")
+                for size in range(min(len(words), 6), 0, -1):
+                    for start in range(len(words) - size + 1):
+                        candidate = " ".join(words[start:start + size])
+                        if candidate in lookup:
+                            return lookup[candidate]
+        return None
+
+
+def near_filter(query: Query, model, latitude: float, longitude: float, radius_km: float) -> Query:
+    """Restrict a query to rows whose geohash falls in cells covering the search circle"""
+    cells = covering_cells(latitude, longitude, radius_km)
+    return query.filter(
+        or_(*[and_(model.geohash >= cell, model.geohash < cell + "{") for cell in cells])
+    )
+
+
+def sort_by_distance(
+    rows: Iterable, latitude: float, longitude: float, radius_km: float
+) -> List[Tuple[float, object]]:
+    """Exact distance filter on geohash candidates, nearest first"""
+    located = []
+    for row in rows:
+        if row.latitude is None or row.longitude is None:
+            continue
+        distance = haversine_km(latitude, longitude, row.latitude, row.longitude)
+        if distance <= radius_km:
+            located.append((distance, row))
+    located.sort(key=lambda item: item[0])
+    return located
+
+
+def nearest(
+    query: Query, model, near: Tuple[float, float, float], skip: int = 0, limit: Optional[int] = None
+) -> List[Tuple[float, object]]:
+    """Rows of `query` within `near` = (lat, lon, radius_km), nearest first, paginated"""
+    latitude, longitude, radius_km = near
+    candidates = near_filter(query, model, latitude, longitude, radius_km).all()
+    located = sort_by_distance(candidates, latitude, longitude, radius_km)
+    return located[skip:skip + limit if limit is not None else None]
+
+
+def apply_geocoding(obj) -> bool:
+    """Fill latitude/longitude/geohash from obj.location; returns True if found"""
+    point = gazetteer.geocode(obj.location)
+    if point is None:
+        obj.latitude = obj.longitude = obj.geohash = None
+        return False
+    obj.latitude, obj.longitude = point
+    obj.geohash = geohash_encode(*point)
+    return True
+
+
+def _geocoded_models() -> Sequence[type]:
+    from app.models import Dog, ExternalDog, ExternalShelter, User
+
+    return (Dog, ExternalDog, ExternalShelter, User)
+
+
+def _geocode_before_flush(session: Session, flush_context, instances):
+    models = _geocoded_models()
+    for obj in session.new:
+        if isinstance(obj, models):
+            apply_geocoding(obj)
+    for obj in session.dirty:
+        if isinstance(obj, models) and inspect(obj).attrs.location.history.has_changes():
+            apply_geocoding(obj)
+
+
+event.listen(Session, "before_flush", _geocode_before_flush)
+
+# Global gazetteer instance
+gazetteer = Gazetteer()
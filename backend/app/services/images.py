@@ -0,0 +1,191 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+from PIL import Image, ImageOps
+from app.core.config import settings
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_URL = "/uploads/"
+IMAGES_URL = "/images/"
+
+# Widths offered in srcset; requested widths snap up to one of these so the
+# on-demand endpoint can't be used to fill the disk cache with arbitrary sizes
+VARIANT_WIDTHS = (320, 640, 1024, 1600)
+THUMBNAIL_WIDTH = 200  # Square crop used on listing cards
+
+# Output formats, best first. AVIF needs an encoder registered with Pillow
+# (e.g. pillow-avif-plugin) and is skipped when it's not available
+FORMATS = {"avif": ("AVIF", 50), "webp": ("WEBP", 80), "jpeg": ("JPEG", 85)}
+MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+# Leading bytes of the image types we accept, mapped to their file extension
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+SIGNATURE_LENGTH = 12
+
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+
+def detect_image_type(head: bytes) -> Optional[str]:
+    """Extension for the image type identified by the first bytes of a file, None if unknown"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def available_formats() -> List[str]:
+    Image.init()
+    return [fmt for fmt, (pillow_format, _) in FORMATS.items() if pillow_format in Image.SAVE]
+
+
+def snap_width(width: int) -> int:
+    """Smallest standard width >= width (the thumbnail width stays as is)"""
+    if width == THUMBNAIL_WIDTH:
+        return width
+    for candidate in VARIANT_WIDTHS:
+        if candidate >= width:
+            return candidate
+    return VARIANT_WIDTHS[-1]
+
+
+def render_variant(source: str, target: str, width: int, fmt: str) -> str:
+    """Resize `source` into `target`. Runs in a worker process.
+
+    The thumbnail width produces a square centre crop; other widths keep the
+    aspect ratio and never upscale. Written to a temp file and renamed, so
+    readers never see a partial image.
+    """
+    pillow_format, quality = FORMATS[fmt]
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if width == THUMBNAIL_WIDTH:
+            image = ImageOps.fit(image, (width, width), Image.LANCZOS)
+        elif image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA")
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial = f"{target}.{os.getpid()}.tmp"
+        image.save(partial, pillow_format, quality=quality)
+    os.replace(partial, target)
+    return target
+
+
+class ImagePipeline:
+    """Generates and caches resized variants of images under the uploads directory"""
+
+    def __init__(self, upload_dir: str = settings.UPLOAD_DIR, workers: int = settings.IMAGE_WORKERS):
+        self.upload_dir = Path(upload_dir)
+        self.cache_dir = self.upload_dir / "cache"
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[Tuple[str, int, str], asyncio.Future] = {}
+        self._formats: Optional[List[str]] = None
+
+    @property
+    def formats(self) -> List[str]:
+        if self._formats is None:
+            self._formats = available_formats()
+        return self._formats
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def source_path(self, name: str) -> Optional[Path]:
+        """Path of an uploaded image, or None if it doesn't exist or escapes the uploads directory"""
+        root = self.upload_dir.resolve()
+        path = (root / name).resolve()
+        if root not in path.parents or path.is_relative_to(self.cache_dir.resolve()) or not path.is_file():
+            return None
+        return path
+
+    def cache_path(self, name: str, width: int, fmt: str) -> Path:
+        return self.cache_dir / f"{name}.{width}.{fmt}"
+
+    async def variant(self, name: str, width: int, fmt: str) -> Optional[Path]:
+        """Cached variant of an uploaded image, rendered in the process pool on first request"""
+        source = self.source_path(name)
+        if source is None:
+            return None
+        width = snap_width(width)
+        target = self.cache_path(name, width, fmt)
+        if target.is_file() and target.stat().st_mtime >= source.stat().st_mtime:
+            return target
+
+        # Concurrent requests for the same variant share one render
+        key = (name, width, fmt)
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.pool, render_variant, str(source), str(target), width, fmt)
+            self._pending[key] = future
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+        await asyncio.shield(future)
+        return target
+
+    async def process(self, name: str) -> int:
+        """Pre-render the thumbnail and every srcset variant of a newly stored image.
+
+        Returns the number of variants generated; failures are logged, since
+        the on-demand endpoint can still render them later.
+        """
+        jobs = [
+            self.variant(name, width, fmt)
+            for width in (THUMBNAIL_WIDTH,) + VARIANT_WIDTHS
+            for fmt in self.formats
+        ]
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            logger.warning(f"Could not render {len(failures)} variants of {name}: {failures[0]}")
+        return len(results) - len(failures)
+
+    def variant_urls(self, photo_url: str) -> Optional[dict]:
+        """srcset-ready URLs for a photo served from /uploads, None for remote photos"""
+        if not photo_url or not photo_url.startswith(UPLOADS_URL):
+            return None
+        name = quote(photo_url[len(UPLOADS_URL):])
+        url = lambda width, fmt: f"{IMAGES_URL}{name}?w={width}&format={fmt}"
+
+        srcsets = {
+            fmt: ", ".join(f"{url(width, fmt)} {width}w" for width in VARIANT_WIDTHS)
+            for fmt in self.formats
+        }
+        best = self.formats[0]
+        return {
+            "original": photo_url,
+            "thumbnail": url(THUMBNAIL_WIDTH, best),
+            "srcset": srcsets.get("webp") or srcsets[best],
+            "srcset_avif": srcsets.get("avif"),
+            "srcset_jpeg": srcsets.get("jpeg"),
+        }
+
+
+# Global image pipeline instance
+image_pipeline = ImagePipeline()
@@ -0,0 +1,266 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models.dog import Dog, DogStatus
+from app.models.external_shelter import ExternalDog
+import numpy as np
+import re
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Row kinds in the feature matrix
+LOCAL = 0
+EXTERNAL = 1
+
+# Feature byte layout: low nibble = trait value, high nibble = trait is known
+KIDS, DOGS, CATS, YARD = 0, 1, 2, 3
+TRAITS = (KIDS, DOGS, CATS, YARD)
+KNOWN_SHIFT = 4
+
+# Score contributions per trait
+MATCH_BONUS = 3.0  # Known good with something the foster has
+UNKNOWN_BONUS = 0.5  # Not stated either way
+CONFLICT_PENALTY = -100.0  # Known incompatibility, never recommended
+YARD_BONUS = 1.0  # Dog needs a yard and the foster has one
+
+# Keywords for free-text traits (descriptions and living situations, ES/EN)
+TRAIT_KEYWORDS = {
+    KIDS: r"niñ[oa]s?|hij[oa]s?|beb[eé]s?|kids?|child(?:ren)?",
+    DOGS: r"perr[oa]s?|dogs?|canes",
+    CATS: r"gat[oa]s?|cats?|felinos?",
+    YARD: r"jard[ií]n|patio|parcela|terreno|yard|garden|finca",
+}
+NEGATIONS = r"\b(?:no|not|sin|nunca|never|without|mal|bad)\b"
+
+# Negations only reach the keywords after them in the same clause:
+# "bien con perros, no con gatos", "no tengo jardín pero sí dos perros"
+CLAUSE_BREAKS = r"[.;:!?,\n]|\b(?:pero|aunque|sino|but|although|though|whereas)\b"
+
+
+def mentions(text: Optional[str], trait: int) -> Optional[bool]:
+    """True/False if a clause of `text` states the trait (negated before the keyword), None if silent"""
+    if not text:
+        return None
+    keyword = re.compile(rf"\b(?:{TRAIT_KEYWORDS[trait]})\b", re.IGNORECASE)
+    for clause in re.split(CLAUSE_BREAKS, text, flags=re.IGNORECASE):
+        found = keyword.search(clause)
+        if found:
+            return not re.search(NEGATIONS, clause[:found.start()], re.IGNORECASE)
+    return None
+
+
+def pack_features(values: Dict[int, Optional[bool]]) -> int:
+    """Pack {trait: True/False/None} into one feature byte"""
+    byte = 0
+    for trait, value in values.items():
+        if value is not None:
+            byte |= 1 << (trait + KNOWN_SHIFT)
+            if value:
+                byte |= 1 << trait
+    return byte
+
+
+def local_features(dog) -> int:
+    return pack_features({
+        # NULL (never filled in) stays unknown instead of counting as a known "no"
+        KIDS: dog.good_with_kids,
+        DOGS: dog.good_with_dogs,
+        CATS: dog.good_with_cats,
+        YARD: dog.needs_yard,
+    })
+
+
+def external_features(dog) -> int:
+    text = " . ".join(part for part in (dog.behavior_notes, dog.description) if part)
+    return pack_features({trait: mentions(text, trait) for trait in TRAITS})
+
+
+@dataclass
+class FosterProfile:
+    has_kids: bool = False
+    has_dogs: bool = False
+    has_cats: bool = False
+    has_yard: bool = False
+
+    @classmethod
+    def from_text(cls, living_situation: Optional[str]) -> "FosterProfile":
+        """Best-effort profile from a FosterApplication.living_situation"""
+        return cls(
+            has_kids=bool(mentions(living_situation, KIDS)),
+            has_dogs=bool(mentions(living_situation, DOGS)),
+            has_cats=bool(mentions(living_situation, CATS)),
+            has_yard=bool(mentions(living_situation, YARD)),
+        )
+
+    def score_table(self) -> np.ndarray:
+        """Score of every possible feature byte for this profile (256 entries)"""
+        codes = np.arange(256, dtype=np.uint16)
+        value = lambda trait: (codes >> trait) & 1 == 1
+        known = lambda trait: (codes >> (trait + KNOWN_SHIFT)) & 1 == 1
+
+        scores = np.zeros(256, dtype=np.float32)
+        for trait, present in ((KIDS, self.has_kids), (DOGS, self.has_dogs), (CATS, self.has_cats)):
+            if not present:
+                continue
+            scores += np.where(known(trait), np.where(value(trait), MATCH_BONUS, CONFLICT_PENALTY), UNKNOWN_BONUS)
+
+        needs_yard = known(YARD) & value(YARD)
+        scores += np.where(needs_yard, YARD_BONUS if self.has_yard else CONFLICT_PENALTY, 0.0)
+        return scores
+
+
+class MatchingService:
+    """In-memory feature matrix of available dogs, scored with vectorized lookups"""
+
+    def __init__(self):
+        self.is_built = False
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self, capacity: int = 1024):
+        self.features = np.zeros(capacity, dtype=np.uint8)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.kinds = np.zeros(capacity, dtype=np.uint8)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.rows: Dict[Tuple[int, int], int] = {}  # (kind, id) -> row
+        self.free_rows: List[int] = []
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def ensure_built(self, db: Session):
+        """Build the feature matrix from the database on first use"""
+        if self.is_built:
+            return
+        with self._lock:
+            if not self.is_built:
+                self.rebuild(db)
+
+    def rebuild(self, db: Session):
+        """Load every available dog with column-only queries"""
+        with self._lock:
+            self._reset()
+            local = db.query(
+                Dog.id, Dog.good_with_kids, Dog.good_with_dogs, Dog.good_with_cats, Dog.needs_yard
+            ).filter(Dog.status == DogStatus.AVAILABLE)
+            for row in local.yield_per(5000):
+                self.upsert(LOCAL, row.id, local_features(row))
+
+            external = db.query(
+                ExternalDog.id, ExternalDog.description, ExternalDog.behavior_notes
+            ).filter(ExternalDog.is_available == True)
+            for row in external.yield_per(5000):
+                self.upsert(EXTERNAL, row.id, external_features(row))
+
+            self.is_built = True
+            logger.info(f"Matching feature matrix built with {len(self)} dogs")
+
+    def _grow(self):
+        capacity = len(self.features) * 2
+        for name in ("features", "active", "kinds", "ids"):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def upsert(self, kind: int, dog_id: int, features: int):
+        with self._lock:
+            row = self.rows.get((kind, dog_id))
+            if row is None:
+                if self.free_rows:
+                    row = self.free_rows.pop()
+                else:
+                    if self.size == len(self.features):
+                        self._grow()
+                    row = self.size
+                    self.size += 1
+                self.rows[(kind, dog_id)] = row
+                self.kinds[row] = kind
+                self.ids[row] = dog_id
+            self.features[row] = features
+            self.active[row] = True
+
+    def remove(self, kind: int, dog_id: int):
+        with self._lock:
+            row = self.rows.pop((kind, dog_id), None)
+            if row is not None:
+                self.active[row] = False
+                self.free_rows.append(row)
+
+    def top_matches(
+        self, profile: FosterProfile, limit: int = 20, include_external: bool = True
+    ) -> List[Tuple[int, int, float]]:
+        """Best (kind, id, score) rows for a profile, excluding incompatible dogs"""
+        with self._lock:
+            n = self.size
+            scores = profile.score_table()[self.features[:n]]
+            eligible = self.active[:n] & (scores >= 0)
+            if not include_external:
+                eligible &= self.kinds[:n] == LOCAL
+            candidates = np.flatnonzero(eligible)
+            if len(candidates) > limit:
+                best = np.argpartition(-scores[candidates], limit - 1)[:limit]
+                candidates = candidates[best]
+            order = np.lexsort((candidates, -scores[candidates]))
+            candidates = candidates[order]
+            return [
+                (int(self.kinds[row]), int(self.ids[row]), float(scores[row]))
+                for row in candidates
+            ]
+
+    def apply(self, changes: List[Tuple[int, int, Optional[int]]]):
+        """Apply (kind, id, features or None to remove) changes from committed flushes"""
+        if not self.is_built or not changes:
+            return
+        with self._lock:
+            for kind, dog_id, features in changes:
+                if features is None:
+                    self.remove(kind, dog_id)
+                else:
+                    self.upsert(kind, dog_id, features)
+
+
+def _dog_change(obj, deleted: bool = False) -> Optional[Tuple[int, int, Optional[int]]]:
+    if isinstance(obj, Dog):
+        available = obj.status in (None, DogStatus.AVAILABLE) and not deleted
+        return LOCAL, obj.id, local_features(obj) if available else None
+    if isinstance(obj, ExternalDog):
+        available = obj.is_available is not False and not deleted
+        return EXTERNAL, obj.id, external_features(obj) if available else None
+    return None
+
+
+def _collect_changes(session: Session, flush_context):
+    """Runs after the flush so new rows have ids; applied once the transaction commits"""
+    changes = session.info.setdefault("matching_changes", [])
+    for obj in list(session.new) + list(session.dirty):
+        change = _dog_change(obj)
+        if change:
+            changes.append(change)
+    for obj in session.deleted:
+        change = _dog_change(obj, deleted=True)
+        if change:
+            changes.append(change)
+
+
+def _apply_changes(session: Session):
+    changes = session.info.pop("matching_changes", None)
+    if changes:
+        matching_service.apply(changes)
+
+
+def _discard_changes(session: Session, transaction):
+    if transaction.parent is None:
+        session.info.pop("matching_changes", None)
+
+
+event.listen(Session, "after_flush", _collect_changes)
+event.listen(Session, "after_commit", _apply_changes)
+event.listen(Session, "after_transaction_end", _discard_changes)
+
+# Global matching instance
+matching_service = MatchingService()
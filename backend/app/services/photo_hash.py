@@ -0,0 +1,339 @@
+from itertools import chain, combinations
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from PIL import Image
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models.dog import Dog
+from app.models.external_shelter import ExternalDog
+from app.models.photo import PhotoHash
+from app.services.images import UPLOADS_URL, image_pipeline
+import asyncio
+import numpy as np
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 64-bit hashes split into 4 chunks of 16 bits for multi-index hashing: two
+# hashes within distance d agree on some chunk to within d // 4 bits
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+# Hamming distance up to which two photos are reported as the same picture:
+# resized/recompressed copies stay within ~2 bits and small crops within ~8,
+# while unrelated photos differ in ~32 (see benchmarks/bench_phash.py)
+DEFAULT_MAX_DISTANCE = 8
+MAX_DISTANCE_LIMIT = 11  # Keeps chunk probes to radius 2 (137 per chunk)
+
+# Rows added since the chunk tables were sorted are scanned linearly until
+# there are more than this many (or 10% of the index), then merged
+PENDING_LIMIT = 4096
+
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+# Orthonormal DCT-II matrix for 32x32 images
+_n = np.arange(32)
+DCT_MATRIX = np.sqrt(2 / 32) * np.cos(np.pi * (2 * _n[None, :] + 1) * _n[:, None] / 64)
+DCT_MATRIX[0] /= np.sqrt(2)
+
+
+def phash(image: Image.Image) -> int:
+    """64-bit perceptual hash: signs of the low-frequency DCT terms against their median"""
+    gray = image.convert("L").resize((32, 32), Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.float64)
+    low = (DCT_MATRIX @ pixels @ DCT_MATRIX.T)[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def compute_phash(path: str) -> int:
+    """pHash of an image file. Runs in a worker process"""
+    with Image.open(path) as image:
+        return phash(image)
+
+
+def to_signed(value: int) -> int:
+    """Store unsigned 64-bit hashes in SQLite's signed INTEGER"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def hamming(first: np.ndarray, second) -> np.ndarray:
+    """Bit distance between each of `first` and `second` (uint64)"""
+    xor = np.bitwise_xor(first, np.uint64(second))
+    return POPCOUNT[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _flip_masks(radius: int) -> np.ndarray:
+    """Every CHUNK_BITS-bit mask with at most `radius` bits set"""
+    masks = [0]
+    for bits in range(1, radius + 1):
+        masks += [sum(1 << bit for bit in combo) for combo in combinations(range(CHUNK_BITS), bits)]
+    return np.array(masks, dtype=np.uint16)
+
+
+FLIP_MASKS = [_flip_masks(radius) for radius in range(MAX_DISTANCE_LIMIT // CHUNKS + 1)]
+
+
+class HammingIndex:
+    """Multi-index hashing over 64-bit hashes for sub-linear near-duplicate lookup.
+
+    Each 16-bit chunk has a sorted table of (chunk value, row). A query
+    probes every chunk value within d // 4 bits of its own chunks with
+    searchsorted and verifies the candidates' full distance with a popcount.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.hashes = np.zeros(capacity, dtype=np.uint64)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.keys: List[Optional[str]] = []
+        self.rows: Dict[str, int] = {}
+        self.size = 0
+        self._tables: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._indexed = 0  # Rows covered by the chunk tables
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, key: str, value: int):
+        row = self.rows.get(key)
+        if row is not None:
+            if self.hashes[row] == np.uint64(value):
+                return
+            self.remove(key)
+        if self.size == len(self.hashes):
+            for name in ("hashes", "active"):
+                array = getattr(self, name)
+                grown = np.zeros(len(array) * 2, dtype=array.dtype)
+                grown[:len(array)] = array
+                setattr(self, name, grown)
+        row = self.size
+        self.size += 1
+        self.hashes[row] = np.uint64(value)
+        self.active[row] = True
+        self.keys.append(key)
+        self.rows[key] = row
+
+    def load(self, items: List[Tuple[str, int]]):
+        """Bulk-load (key, hash) pairs and sort the chunk tables once"""
+        for key, value in items:
+            self.add(key, value)
+        self._build()
+
+    def remove(self, key: str):
+        row = self.rows.pop(key, None)
+        if row is not None:
+            self.active[row] = False
+            self.keys[row] = None
+
+    def _build(self):
+        hashes = self.hashes[:self.size]
+        tables = []
+        for chunk in range(CHUNKS):
+            values = ((hashes >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(CHUNK_MASK)).astype(np.uint16)
+            order = np.argsort(values, kind="stable")
+            tables.append((values[order], order))
+        self._tables = tables
+        self._indexed = self.size
+
+    def query(self, value: int, max_distance: int = DEFAULT_MAX_DISTANCE) -> List[Tuple[str, int]]:
+        """(key, distance) of every hash within `max_distance` bits, nearest first"""
+        if not 0 <= max_distance <= MAX_DISTANCE_LIMIT:
+            raise ValueError(f"max_distance must be between 0 and {MAX_DISTANCE_LIMIT}")
+        if self.size - self._indexed > max(PENDING_LIMIT, self._indexed // 10):
+            self._build()
+
+        masks = FLIP_MASKS[max_distance // CHUNKS]
+        found = [np.arange(self._indexed, self.size)]
+        for chunk, (values, order) in enumerate(self._tables):
+            probes = np.unique(np.uint16((value >> (chunk * CHUNK_BITS)) & CHUNK_MASK) ^ masks)
+            starts = np.searchsorted(values, probes, side="left")
+            lengths = np.searchsorted(values, probes, side="right") - starts
+            # Concatenated order[start:end] slices without a Python loop
+            total = int(lengths.sum())
+            if total:
+                offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+                found.append(order[offsets + np.arange(total)])
+
+        rows = np.unique(np.concatenate(found))
+        rows = rows[self.active[rows]]
+        distances = hamming(self.hashes[rows], value)
+        close = distances <= max_distance
+        matches = [(self.keys[row], int(distance)) for row, distance in zip(rows[close], distances[close])]
+        matches.sort(key=lambda item: (item[1], item[0]))
+        return matches
+
+    def items(self):
+        for row in range(self.size):
+            if self.active[row]:
+                yield self.keys[row], int(self.hashes[row])
+
+
+class PhotoHashService:
+    """Perceptual hashes of stored photos (mirrored and uploaded), indexed for near-duplicate search"""
+
+    def __init__(self):
+        self.index = HammingIndex()
+        self.is_built = False
+        self._lock = threading.RLock()
+
+    def ensure_built(self, db: Session):
+        """Load stored hashes into the index on first use"""
+        if self.is_built:
+            return
+        with self._lock:
+            if self.is_built:
+                return
+            rows = db.query(PhotoHash.path, PhotoHash.phash)
+            self.index.load([(row.path, to_unsigned(row.phash)) for row in rows.yield_per(10000)])
+            self.is_built = True
+            logger.info(f"Photo hash index built with {len(self.index)} hashes")
+
+    async def hash_photo(self, db: Session, path: str) -> Optional[int]:
+        """Hash a photo stored under the uploads directory (relative `path`) and index it.
+
+        Hashing runs in the image process pool. The row is added to the
+        session and the index is updated once the caller commits.
+        """
+        self.ensure_built(db)
+        existing = db.query(PhotoHash).filter(PhotoHash.path == path).first()
+        if existing:
+            return to_unsigned(existing.phash)
+
+        source = Path(image_pipeline.upload_dir) / path
+        loop = asyncio.get_running_loop()
+        try:
+            value = await loop.run_in_executor(image_pipeline.pool, compute_phash, str(source))
+        except OSError as e:
+            logger.warning(f"Could not hash photo {path}: {str(e)}")
+            return None
+
+        db.add(PhotoHash(path=path, phash=to_signed(value)))
+        db.info.setdefault("photo_hash_changes", []).append((path, value))
+        return value
+
+    def forget(self, db: Session, paths: List[str]):
+        """Drop hashes of deleted photos; the index follows once the caller commits"""
+        if not paths:
+            return
+        db.query(PhotoHash).filter(PhotoHash.path.in_(paths)).delete(synchronize_session=False)
+        db.info.setdefault("photo_hash_changes", []).extend((path, None) for path in paths)
+
+    def apply(self, changes: List[Tuple[str, Optional[int]]]):
+        """Apply (path, hash) changes of a committed transaction; a None hash removes the path"""
+        if not self.is_built:
+            return
+        with self._lock:
+            for path, value in changes:
+                if value is None:
+                    self.index.remove(path)
+                else:
+                    self.index.add(path, value)
+
+    def similar(self, value: int, max_distance: int = DEFAULT_MAX_DISTANCE) -> List[Tuple[str, int]]:
+        with self._lock:
+            return self.index.query(value, max_distance)
+
+    def near_duplicate_pairs(self, max_distance: int = DEFAULT_MAX_DISTANCE) -> Iterator[Tuple[str, str, int]]:
+        """Pairs of distinct photos within `max_distance`, lazily in index order.
+
+        The lock is only held per lookup, so a long scan doesn't stall uploads
+        and syncs; callers stop iterating once they have enough pairs.
+        """
+        with self._lock:
+            items = list(self.index.items())
+        for path, value in items:
+            with self._lock:
+                matches = self.index.query(value, max_distance)
+            for other, distance in matches:
+                if other > path:
+                    yield path, other, distance
+
+
+def _photo_owners(db: Session) -> Dict[str, List[dict]]:
+    """Stored photo path -> dogs showing it"""
+    owners: Dict[str, List[dict]] = {}
+
+    def own(url, dog: dict):
+        if isinstance(url, str) and url.startswith(UPLOADS_URL):
+            owners.setdefault(url[len(UPLOADS_URL):], []).append({**dog, "photo": url})
+
+    external = db.query(
+        ExternalDog.id, ExternalDog.name, ExternalDog.external_shelter_id,
+        ExternalDog.cluster_id, ExternalDog.mirrored_photos
+    ).filter(ExternalDog.is_available == True)
+    for row in external:
+        dog = {"type": "external", "id": row.id, "name": row.name,
+               "external_shelter_id": row.external_shelter_id, "cluster_id": row.cluster_id}
+        for url in (row.mirrored_photos or {}).values():
+            own(url, dog)
+
+    for row in db.query(Dog.id, Dog.name, Dog.photos):
+        dog = {"type": "local", "id": row.id, "name": row.name}
+        for url in row.photos or []:
+            own(url, dog)
+    return owners
+
+
+def suspected_duplicates(
+    db: Session, max_distance: int = DEFAULT_MAX_DISTANCE, limit: int = 100, include_clustered: bool = False
+) -> List[dict]:
+    """Up to `limit` pairs of different dogs showing the same or a near-identical photo.
+
+    The scan stops once `limit` pairs are found, so the closest-first order
+    is within the returned pairs. Dogs already linked into one duplicate
+    cluster by text similarity are skipped unless `include_clustered`.
+    """
+    photo_hash_service.ensure_built(db)
+    owners = _photo_owners(db)
+
+    # Identical files are shared through content addressing, so they are
+    # distance-0 pairs among the dogs of a single path
+    shared = ((path, path, 0) for path, dogs in owners.items() if len(dogs) > 1)
+    photo_pairs = chain(shared, photo_hash_service.near_duplicate_pairs(max_distance))
+
+    results = []
+    seen = set()
+    for first_path, second_path, distance in photo_pairs:
+        for first in owners.get(first_path, []):
+            for second in owners.get(second_path, []):
+                dogs = tuple(sorted(((first["type"], first["id"]), (second["type"], second["id"]))))
+                if dogs[0] == dogs[1] or dogs in seen:
+                    continue
+                if not include_clustered and first.get("cluster_id") and first.get("cluster_id") == second.get("cluster_id"):
+                    continue
+                seen.add(dogs)
+                results.append({"distance": distance, "first": first, "second": second})
+                if len(results) >= limit:
+                    return _closest_first(results)
+    return _closest_first(results)
+
+
+def _closest_first(results: List[dict]) -> List[dict]:
+    results.sort(key=lambda result: result["distance"])
+    return results
+
+
+def _apply_changes(session: Session):
+    changes = session.info.pop("photo_hash_changes", None)
+    if changes:
+        photo_hash_service.apply(changes)
+
+
+def _discard_changes(session: Session, transaction):
+    # Runs after after_commit, so only uncommitted (rolled back or closed) changes remain
+    if transaction.parent is None:
+        session.info.pop("photo_hash_changes", None)
+
+
+event.listen(Session, "after_commit", _apply_changes)
+event.listen(Session, "after_transaction_end", _discard_changes)
+
+# Global photo hash instance
+photo_hash_service = PhotoHashService()
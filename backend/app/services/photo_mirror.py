@@ -0,0 +1,208 @@
+from datetime import datetime, timedelta
+from hashlib import sha256
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.external_shelter import ExternalDog, MirroredPhoto
+from app.services.images import SIGNATURE_LENGTH, UPLOADS_URL, detect_image_type, image_pipeline
+from app.services.photo_hash import photo_hash_service
+import aiohttp
+import asyncio
+import os
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIRROR_DIR = "mirror"  # Inside the uploads directory
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=60, sock_read=20)
+CHUNK_SIZE = 64 * 1024
+
+# Files on disk without a database row are only removed once this old, so a
+# download that finished but hasn't been committed yet is never collected
+ORPHAN_GRACE_SECONDS = 3600
+
+CONTENT_TYPES = {".jpg": "image/jpeg", ".png": "image/png", ".gif": "image/gif", ".webp": "image/webp"}
+
+
+def is_remote(url: str) -> bool:
+    return isinstance(url, str) and url.startswith(("http://", "https://"))
+
+
+class PhotoMirror:
+    """Downloads external dog photos into content-addressed local storage.
+
+    Each photo is stored once as uploads/mirror/<aa>/<sha256><ext>, so the
+    same image posted by several dogs or shelters shares a single file.
+    """
+
+    def __init__(
+        self,
+        upload_dir: str = settings.UPLOAD_DIR,
+        concurrency: int = settings.PHOTO_MIRROR_CONCURRENCY,
+        max_bytes: int = settings.MAX_FILE_SIZE,
+    ):
+        self.upload_dir = Path(upload_dir)
+        self.concurrency = concurrency
+        self.max_bytes = max_bytes
+
+    def local_url(self, path: str) -> str:
+        return UPLOADS_URL + path
+
+    async def mirror_dogs(self, db: Session, dogs: List[ExternalDog]) -> int:
+        """Mirror the remote photos of `dogs` and point their mirrored_photos at the copies.
+
+        Photos already mirrored for any dog are reused without downloading.
+        Returns the number of photos downloaded.
+        """
+        wanted = {
+            url for dog in dogs for url in dog.photos or []
+            if is_remote(url) and url not in (dog.mirrored_photos or {})
+        }
+        known: Dict[str, str] = {}
+        if wanted:
+            rows = db.query(MirroredPhoto.source_url, MirroredPhoto.path).filter(
+                MirroredPhoto.source_url.in_(wanted)
+            )
+            known = {row.source_url: row.path for row in rows}
+
+        missing = sorted(wanted - set(known))
+        downloaded = []
+        if missing:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            async with aiohttp.ClientSession(timeout=DOWNLOAD_TIMEOUT) as session:
+                results = await asyncio.gather(*(self._download(session, semaphore, url) for url in missing))
+            for url, stored in zip(missing, results):
+                if stored:
+                    db.add(MirroredPhoto(source_url=url, **stored))
+                    known[url] = stored["path"]
+                    downloaded.append(stored["path"])
+
+        for dog in dogs:
+            mirrored = dict(dog.mirrored_photos or {})
+            mirrored.update({url: self.local_url(known[url]) for url in dog.photos or [] if url in known})
+            mirrored = {url: local for url, local in mirrored.items() if url in (dog.photos or [])}
+            if mirrored != (dog.mirrored_photos or {}):
+                dog.mirrored_photos = mirrored
+        db.commit()
+
+        # Thumbnails, srcset variants and perceptual hashes for the new files
+        for path in dict.fromkeys(downloaded):
+            await image_pipeline.process(path)
+            await photo_hash_service.hash_photo(db, path)
+        db.commit()
+        return len(downloaded)
+
+    async def _download(
+        self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str
+    ) -> Optional[dict]:
+        """Stream one photo to disk while hashing it; None if it isn't a valid image"""
+        temp = self.upload_dir / MIRROR_DIR / f".{uuid.uuid4().hex}.part"
+        async with semaphore:
+            try:
+                async with session.get(url) as response:
+                    if response.status != 200:
+                        logger.warning(f"Photo {url} returned HTTP {response.status}")
+                        return None
+                    if response.content_length and response.content_length > self.max_bytes:
+                        logger.warning(f"Photo {url} is larger than {self.max_bytes} bytes")
+                        return None
+
+                    temp.parent.mkdir(parents=True, exist_ok=True)
+                    digest = sha256()
+                    size = 0
+                    head = b""
+                    with open(temp, "wb") as handle:
+                        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                            size += len(chunk)
+                            if size > self.max_bytes:
+                                logger.warning(f"Photo {url} is larger than {self.max_bytes} bytes")
+                                return None
+                            if len(head) < SIGNATURE_LENGTH:
+                                head += chunk[:SIGNATURE_LENGTH - len(head)]
+                                if len(head) == SIGNATURE_LENGTH and not detect_image_type(head):
+                                    logger.warning(f"Photo {url} is not a supported image")
+                                    return None
+                            digest.update(chunk)
+                            handle.write(chunk)
+
+                    extension = detect_image_type(head)
+                    if extension is None:
+                        logger.warning(f"Photo {url} is not a supported image")
+                        return None
+
+                    digest = digest.hexdigest()
+                    path = f"{MIRROR_DIR}/{digest[:2]}/{digest}{extension}"
+                    target = self.upload_dir / path
+                    if not target.exists():
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(temp, target)
+                    return {
+                        "sha256": digest,
+                        "path": path,
+                        "content_type": CONTENT_TYPES[extension],
+                        "size_bytes": size,
+                    }
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                logger.warning(f"Could not mirror photo {url}: {str(e)}")
+                return None
+            finally:
+                if temp.exists():
+                    temp.unlink()
+
+    def collect_garbage(self, db: Session, retention_days: int = settings.PHOTO_MIRROR_RETENTION_DAYS) -> int:
+        """Delete mirrored photos no dog references anymore, with their cached variants.
+
+        Dogs that have been unavailable for longer than `retention_days` stop
+        referencing their copies first. Returns the number of files deleted.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        expired = db.query(ExternalDog).filter(
+            ExternalDog.is_available == False,
+            ExternalDog.last_seen < cutoff,
+        )
+        for dog in expired:
+            if dog.mirrored_photos:
+                dog.mirrored_photos = None
+        db.flush()
+
+        referenced: Set[str] = set()
+        for (mirrored,) in db.query(ExternalDog.mirrored_photos):
+            referenced.update(local[len(UPLOADS_URL):] for local in (mirrored or {}).values())
+
+        kept_paths = set()
+        dropped_paths = set()
+        for row in db.query(MirroredPhoto):
+            if row.path in referenced:
+                kept_paths.add(row.path)
+            else:
+                dropped_paths.add(row.path)
+                db.delete(row)
+        db.commit()
+
+        deleted_paths = []
+        now = time.time()
+        mirror_dir = self.upload_dir / MIRROR_DIR
+        for path in mirror_dir.glob("*/*"):
+            relative = path.relative_to(self.upload_dir).as_posix()
+            if relative in kept_paths:
+                continue
+            if relative not in dropped_paths and now - path.stat().st_mtime < ORPHAN_GRACE_SECONDS:
+                continue  # May belong to a download that hasn't been committed yet
+            path.unlink()
+            for variant in image_pipeline.cache_dir.glob(f"{relative}.*"):
+                variant.unlink()
+            deleted_paths.append(relative)
+
+        photo_hash_service.forget(db, deleted_paths)
+        db.commit()
+
+        logger.info(f"Photo mirror garbage collection deleted {len(deleted_paths)} files")
+        return len(deleted_paths)
+
+
+# Global photo mirror instance
+photo_mirror = PhotoMirror()
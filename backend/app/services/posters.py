@@ -0,0 +1,313 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+from app.core.config import settings
+from app.models.dog import Dog
+from app.services.images import UPLOADS_URL, image_pipeline
+import asyncio
+import os
+import zipfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes so cached posters are re-rendered
+POSTER_VERSION = 1
+
+PRIMARY = (237, 122, 71)  # #ed7a47, the frontend's primary colour
+DARK = (51, 51, 51)
+LIGHT = (255, 250, 245)
+WHITE = (255, 255, 255)
+
+SIZES = {"small": "Pequeño", "medium": "Mediano", "large": "Grande", "extra_large": "Muy grande"}
+GENDERS = {"male": "Macho", "female": "Hembra"}
+
+
+@dataclass(frozen=True)
+class PosterLayout:
+    size: Tuple[int, int]
+    header: int  # Height of the "¡Adóptame!" band
+    photo: Tuple[int, int, int, int]  # Box the photo is cropped into
+    title_size: int
+    name_size: int
+    text_size: int
+    margin: int
+
+
+LAYOUTS = {
+    "a4": PosterLayout((1240, 1754), 230, (90, 280, 1150, 1080), 120, 110, 40, 90),  # 150 dpi print
+    "square": PosterLayout((1080, 1080), 150, (60, 170, 1020, 660), 84, 76, 30, 60),  # Social feeds
+    "story": PosterLayout((1080, 1920), 240, (60, 300, 1020, 1200), 110, 100, 40, 60),  # Vertical stories
+}
+DEFAULT_TEMPLATE = "a4"
+
+
+@dataclass
+class PosterTemplate:
+    layout: PosterLayout
+    background: Image.Image
+    fonts: Dict[str, ImageFont.FreeTypeFont]
+
+
+# Per-process template cache, filled by load_templates when a worker starts
+_templates: Dict[str, PosterTemplate] = {}
+
+
+def _font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError:
+        return ImageFont.load_default(size=size)
+
+
+def _background(layout: PosterLayout) -> Image.Image:
+    width, height = layout.size
+    image = Image.new("RGB", layout.size, LIGHT)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, width, layout.header), fill=PRIMARY)
+    draw.rectangle((0, height - layout.margin // 2, width, height), fill=PRIMARY)
+    # Paw prints in the header corners, clear of the title
+    step = layout.header // 2
+    for x in (layout.margin // 2, width - layout.margin // 2 - step // 3):
+        y = layout.header - step // 3
+        pad = step // 8
+        draw.ellipse((x, y - step // 4, x + step // 3, y), fill=(245, 160, 120))
+        for dx in (-pad * 2, 0, pad * 2):
+            draw.ellipse((x + step // 6 + dx - pad, y - step // 2 - pad, x + step // 6 + dx + pad, y - step // 2 + pad),
+                         fill=(245, 160, 120))
+    x0, y0, x1, y1 = layout.photo
+    draw.rounded_rectangle((x0 - 12, y0 - 12, x1 + 12, y1 + 12), radius=24, fill=WHITE)
+    return image
+
+
+def load_templates():
+    """Load fonts and pre-draw every template background. Runs once per worker process"""
+    for name, layout in LAYOUTS.items():
+        if name in _templates:
+            continue
+        _templates[name] = PosterTemplate(
+            layout=layout,
+            background=_background(layout),
+            fonts={
+                "title": _font(settings.POSTER_FONT_BOLD, layout.title_size),
+                "name": _font(settings.POSTER_FONT_BOLD, layout.name_size),
+                "text": _font(settings.POSTER_FONT, layout.text_size),
+                "bold": _font(settings.POSTER_FONT_BOLD, layout.text_size),
+            },
+        )
+
+
+def _wrap(draw: ImageDraw.ImageDraw, text: str, font, width: int, max_lines: int) -> List[str]:
+    if max_lines <= 0:
+        return []
+    lines: List[str] = []
+    for word in text.split():
+        if lines and draw.textlength(f"{lines[-1]} {word}", font=font) <= width:
+            lines[-1] = f"{lines[-1]} {word}"
+        else:
+            lines.append(word)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] = lines[-1].rstrip(".,;") + "…"
+    return lines
+
+
+def render_poster(template: str, content: dict, photo: Optional[str], target: str) -> str:
+    """Compose a poster and write it to `target` (PNG). Runs in a worker process"""
+    load_templates()
+    poster = _templates[template]
+    layout = poster.layout
+    fonts = poster.fonts
+    width, height = layout.size
+    image = poster.background.copy()
+    draw = ImageDraw.Draw(image)
+
+    draw.text((width // 2, layout.header // 2), "¡ADÓPTAME!", font=fonts["title"], fill=WHITE, anchor="mm")
+
+    x0, y0, x1, y1 = layout.photo
+    if photo:
+        try:
+            with Image.open(photo) as source:
+                picture = ImageOps.fit(ImageOps.exif_transpose(source).convert("RGB"), (x1 - x0, y1 - y0), Image.LANCZOS)
+            mask = Image.new("L", picture.size, 0)
+            ImageDraw.Draw(mask).rounded_rectangle((0, 0, *picture.size), radius=18, fill=255)
+            image.paste(picture, (x0, y0), mask)
+        except OSError:
+            photo = None
+    if not photo:
+        draw.rounded_rectangle(layout.photo, radius=18, fill=(250, 225, 210))
+        draw.text(((x0 + x1) // 2, (y0 + y1) // 2), "Sin foto", font=fonts["bold"],
+                  fill=PRIMARY, anchor="mm")
+
+    y = y1 + layout.margin // 2
+    draw.text((width // 2, y), content["name"], font=fonts["name"], fill=DARK, anchor="mt")
+    y += layout.name_size + layout.margin // 3
+
+    line_height = int(layout.text_size * 1.35)
+    text_width = width - 2 * layout.margin
+    for key, font, color in (("traits", "bold", PRIMARY), ("compatibility", "text", DARK), ("location", "text", DARK)):
+        if content.get(key):
+            draw.text((width // 2, y), content[key], font=fonts[font], fill=color, anchor="mt")
+            y += line_height
+
+    footer = height - layout.margin // 2 - line_height - layout.margin // 4
+    if content.get("description"):
+        y += line_height // 2
+        max_lines = (footer - y) // line_height - 1
+        for line in _wrap(draw, content["description"], fonts["text"], text_width, max_lines):
+            draw.text((width // 2, y), line, font=fonts["text"], fill=DARK, anchor="mt")
+            y += line_height
+
+    if content.get("contact"):
+        draw.text((width // 2, footer), content["contact"], font=fonts["bold"], fill=DARK, anchor="mt")
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    partial = f"{target}.{os.getpid()}.tmp"
+    image.save(partial, "PNG", optimize=False)
+    os.replace(partial, target)
+    return target
+
+
+def _age_text(months: Optional[int]) -> Optional[str]:
+    if not months:
+        return None
+    if months < 12:
+        return f"{months} {'mes' if months == 1 else 'meses'}"
+    years = months // 12
+    return f"{years} {'año' if years == 1 else 'años'}"
+
+
+def poster_content(dog: Dog) -> dict:
+    """Text shown on a dog's poster"""
+    traits = [
+        dog.breed,
+        _age_text(dog.age),
+        SIZES.get(dog.size.value) if dog.size else None,
+        GENDERS.get(dog.gender.value) if dog.gender else None,
+    ]
+    compatible = [label for flag, label in (
+        (dog.good_with_kids, "niños"), (dog.good_with_dogs, "perros"), (dog.good_with_cats, "gatos")
+    ) if flag]
+
+    owner = dog.owner
+    contact = None
+    if owner:
+        contact = " · ".join(part for part in (owner.shelter_name or owner.name, owner.phone or owner.email) if part)
+
+    return {
+        "name": dog.name,
+        "traits": " · ".join(trait for trait in traits if trait),
+        "compatibility": f"Se lleva bien con {', '.join(compatible)}" if compatible else None,
+        "location": dog.location,
+        "description": dog.description,
+        "contact": contact,
+    }
+
+
+def _first_photo(dog: Dog) -> Optional[str]:
+    for url in dog.photos or []:
+        if isinstance(url, str) and url.startswith(UPLOADS_URL):
+            path = image_pipeline.source_path(url[len(UPLOADS_URL):])
+            if path:
+                return str(path)
+    return None
+
+
+class PosterService:
+    """Renders adoption posters in a worker pool and caches them on disk"""
+
+    def __init__(self, upload_dir: str = settings.UPLOAD_DIR, workers: int = settings.POSTER_WORKERS):
+        self.cache_dir = Path(upload_dir) / "cache" / "posters"
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def start(self):
+        """Start the workers so templates and fonts are loaded before the first request"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=load_templates)
+            for _ in range(self.workers):
+                self._pool.submit(load_templates)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def cache_path(self, dog: Dog, template: str) -> Path:
+        stamp = dog.updated_at or dog.created_at
+        version = int(stamp.timestamp()) if stamp else 0
+        return self.cache_dir / f"{dog.id}-{template}-{version}-v{POSTER_VERSION}.png"
+
+    async def render(self, dog: Dog, template: str = DEFAULT_TEMPLATE) -> Path:
+        """Cached poster for the dog's current version, rendered in the pool on a miss"""
+        target = self.cache_path(dog, template)
+        if target.is_file():
+            return target
+
+        key = target.name
+        future = self._pending.get(key)
+        if future is None:
+            self.start()
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._pool, render_poster, template, poster_content(dog), _first_photo(dog), str(target)
+            )
+            self._pending[key] = future
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+        await asyncio.shield(future)
+
+        # Posters of earlier versions of this dog are stale now
+        for stale in self.cache_dir.glob(f"{dog.id}-{template}-*.png"):
+            if stale != target:
+                stale.unlink(missing_ok=True)
+        return target
+
+    async def zip_stream(self, dogs: List[Dog], template: str = DEFAULT_TEMPLATE) -> AsyncIterator[bytes]:
+        """ZIP archive of the dogs' posters, streamed as each poster finishes rendering"""
+        sink = _ZipSink()
+        names = set()
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            jobs = [asyncio.ensure_future(self._render_named(dog, template)) for dog in dogs]
+            for job in asyncio.as_completed(jobs):
+                dog, path = await job
+                name = poster_filename(dog)
+                if name in names:
+                    name = f"{dog.id}-{name}"
+                names.add(name)
+                archive.write(path, name)  # PNGs are already compressed
+                yield sink.take()
+        yield sink.take()
+
+    async def _render_named(self, dog: Dog, template: str):
+        return dog, await self.render(dog, template)
+
+
+def poster_filename(dog: Dog) -> str:
+    safe = "".join(char if char.isalnum() else "-" for char in dog.name).strip("-") or str(dog.id)
+    return f"adoptame-{safe}.png"
+
+
+class _ZipSink:
+    """Write-only, non-seekable file object collecting zipfile output for streaming"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# Global poster instance
+poster_service = PosterService()
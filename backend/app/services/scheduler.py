@@ -1,8 +1,14 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.database import get_db
 from app.services.sync_service import sync_all_shelters_task
+from app.services.photo_mirror import photo_mirror
+from app.services.stats import stats_service
+from app.services.analytics import analytics_service
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -34,6 +40,33 @@ class SchedulerService:
                 replace_existing=True
             )
             
+            # Remove mirrored photos no dog references anymore
+            self.scheduler.add_job(
+                self._photo_gc_job,
+                CronTrigger(hour=4, minute=0),
+                id="photo_mirror_gc",
+                name="Mirrored Photo Garbage Collection",
+                replace_existing=True
+            )
+            
+            # Correct drift in the admin dashboard counters
+            self.scheduler.add_job(
+                self._stats_reconcile_job,
+                IntervalTrigger(minutes=settings.STATS_RECONCILE_MINUTES),
+                id="stats_reconcile",
+                name="Admin Stats Reconciliation",
+                replace_existing=True
+            )
+            
+            # Roll new activity into the analytics aggregates
+            self.scheduler.add_job(
+                self._analytics_rollup_job,
+                IntervalTrigger(minutes=settings.ANALYTICS_ROLLUP_MINUTES),
+                id="analytics_rollup",
+                name="Analytics Rollup Refresh",
+                replace_existing=True
+            )
+            
             self.scheduler.start()
             logger.info("Scheduler started successfully")
             
@@ -89,6 +122,46 @@ class SchedulerService:
         finally:
             db.close()
     
+    async def _photo_gc_job(self):
+        """Garbage-collect mirrored photos of dogs that are gone"""
+        db = next(get_db())
+        try:
+            deleted = photo_mirror.collect_garbage(db)
+            logger.info(f"Photo garbage collection completed: {deleted} files deleted")
+        except Exception as e:
+            logger.error(f"Photo garbage collection job failed: {str(e)}")
+        finally:
+            db.close()
+    
+    async def _stats_reconcile_job(self):
+        """Recount the admin dashboard counters from the tables"""
+        await asyncio.to_thread(self._reconcile_stats)
+    
+    def _reconcile_stats(self):
+        db = next(get_db())
+        try:
+            corrections = stats_service.reconcile(db)
+            logger.info(f"Stats reconciliation completed: {len(corrections)} counters corrected")
+        except Exception as e:
+            logger.error(f"Stats reconciliation job failed: {str(e)}")
+        finally:
+            db.close()
+    
+    async def _analytics_rollup_job(self):
+        """Refresh the daily analytics rollups; the first run backfills them"""
+        # The backfill commits chunk after chunk, so it runs in a worker thread
+        await asyncio.to_thread(self._refresh_analytics)
+    
+    def _refresh_analytics(self):
+        db = next(get_db())
+        try:
+            written = analytics_service.refresh(db)
+            logger.info(f"Analytics rollup refresh completed: {written} rows written")
+        except Exception as e:
+            logger.error(f"Analytics rollup job failed: {str(e)}")
+        finally:
+            db.close()
+    
     def add_custom_job(self, func, trigger, job_id: str, name: str):
         """Add a custom job to the scheduler"""
         try:
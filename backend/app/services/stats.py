@@ -0,0 +1,199 @@
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, event, func, inspect
+from sqlalchemy.orm import Query, Session
+from app.models.dog import Dog, DogStatus
+from app.models.external_shelter import ExternalDog
+from app.models.foster_application import ApplicationStatus, FosterApplication
+from app.models.stats import StatCounter
+from app.models.user import ShelterStatus, User, UserType
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Tracked:
+    """A model whose rows are counted: `keys` maps a row's `columns` values to the counters it adds 1 to"""
+    model: type
+    columns: Tuple[str, ...]
+    keys: Callable[[Dict], List[str]]
+
+
+def _user_keys(row: Dict) -> List[str]:
+    keys = ["users.total"]
+    if row["is_active"]:
+        keys.append("users.active")
+    if row["user_type"] is not None:
+        keys.append(f"users.type.{row['user_type'].value}")
+    if row["user_type"] == UserType.SHELTER_ADMIN:
+        keys.append("shelters.approved")
+    elif row["user_type"] == UserType.SHELTER and row["shelter_status"] == ShelterStatus.PENDING:
+        keys.append("shelters.pending")
+    return keys
+
+
+def _dog_keys(row: Dict) -> List[str]:
+    return ["dogs.total"] + ([f"dogs.status.{row['status'].value}"] if row["status"] is not None else [])
+
+
+def _external_dog_keys(row: Dict) -> List[str]:
+    return ["external_dogs.total"] + (["external_dogs.available"] if row["is_available"] else [])
+
+
+def _application_keys(row: Dict) -> List[str]:
+    return ["applications.total"] + ([f"applications.status.{row['status'].value}"] if row["status"] is not None else [])
+
+
+TRACKED = {
+    tracked.model: tracked for tracked in (
+        Tracked(User, ("is_active", "user_type", "shelter_status"), _user_keys),
+        Tracked(Dog, ("status",), _dog_keys),
+        Tracked(ExternalDog, ("is_available",), _external_dog_keys),
+        Tracked(FosterApplication, ("status",), _application_keys),
+    )
+}
+
+COUNTERS = (
+    ["users.total", "users.active", "shelters.approved", "shelters.pending"]
+    + [f"users.type.{user_type.value}" for user_type in UserType]
+    + ["dogs.total"] + [f"dogs.status.{dog_status.value}" for dog_status in DogStatus]
+    + ["external_dogs.total", "external_dogs.available"]
+    + ["applications.total"] + [f"applications.status.{app_status.value}" for app_status in ApplicationStatus]
+)
+
+
+def _column_default(model: type, name: str):
+    """Python-side default of a column, which an object pending insert may not have set yet"""
+    default = model.__table__.c[name].default
+    return default.arg if default is not None and default.is_scalar else None
+
+
+def _current(obj, tracked: Tracked) -> Dict:
+    row = {}
+    for name in tracked.columns:
+        value = getattr(obj, name)
+        row[name] = _column_default(tracked.model, name) if value is None else value
+    return row
+
+
+def _previous(obj, tracked: Tracked) -> Dict:
+    """Column values as last flushed, from attribute history"""
+    row = _current(obj, tracked)
+    attrs = inspect(obj).attrs
+    for name in tracked.columns:
+        history = attrs[name].history
+        if history.deleted:
+            row[name] = history.deleted[0]
+    return row
+
+
+class StatsService:
+    """Admin dashboard counters kept in the stat_counters table.
+
+    Every flush that inserts, updates or deletes a tracked row adjusts the
+    affected counters in the same transaction, so reading the dashboard is one
+    small SELECT instead of a COUNT(*) per figure. Bulk statements and changes
+    made outside the ORM aren't seen; `reconcile` recounts from the tables and
+    runs periodically from the scheduler to correct that drift.
+    """
+
+    def _apply(self, connection, deltas: Counter):
+        changes = [{"counter": key, "delta": delta} for key, delta in deltas.items() if delta]
+        if not changes:
+            return
+        table = StatCounter.__table__
+        # Counters missing until the first reconcile are skipped, not started from zero
+        connection.execute(
+            table.update()
+            .where(table.c.name == bindparam("counter"))
+            .values(value=table.c.value + bindparam("delta"), updated_at=func.now()),
+            changes,
+        )
+
+    def _after_flush(self, session: Session, flush_context):
+        deltas = Counter()
+        for obj in session.new:
+            tracked = TRACKED.get(type(obj))
+            if tracked:
+                deltas.update(tracked.keys(_current(obj, tracked)))
+        for obj in session.deleted:
+            tracked = TRACKED.get(type(obj))
+            if tracked:
+                deltas.subtract(tracked.keys(_previous(obj, tracked)))
+        for obj in session.dirty:
+            tracked = TRACKED.get(type(obj))
+            if tracked and obj not in session.deleted:
+                deltas.update(tracked.keys(_current(obj, tracked)))
+                deltas.subtract(tracked.keys(_previous(obj, tracked)))
+        self._apply(session.connection(), deltas)
+
+    def _grouped_counts(self, query: Query, tracked: Tracked) -> Counter:
+        columns = [getattr(tracked.model, name) for name in tracked.columns]
+        counts = Counter()
+        for *values, count in query.with_entities(*columns, func.count()).group_by(*columns):
+            for key in tracked.keys(dict(zip(tracked.columns, values))):
+                counts[key] += count
+        return counts
+
+    def forget(self, db: Session, query: Query):
+        """Take the rows of `query` off the counters, before deleting them with a bulk query.delete()"""
+        tracked = TRACKED[query.column_descriptions[0]["entity"]]
+        deltas = Counter()
+        deltas.subtract(self._grouped_counts(query, tracked))
+        self._apply(db.connection(), deltas)
+
+    def reconcile(self, db: Session) -> Dict[str, int]:
+        """Recount every counter from its table and fix the ones that drifted; returns {counter: correction}"""
+        actual = Counter({key: 0 for key in COUNTERS})
+        for tracked in TRACKED.values():
+            actual.update(self._grouped_counts(db.query(tracked.model), tracked))
+
+        stored = dict(db.query(StatCounter.name, StatCounter.value))
+        corrections = {key: value - stored.get(key, 0) for key, value in actual.items() if stored.get(key) != value}
+        for key in corrections:
+            if key in stored:
+                db.query(StatCounter).filter(StatCounter.name == key).update(
+                    {StatCounter.value: actual[key], StatCounter.updated_at: func.now()}, synchronize_session=False
+                )
+            else:
+                db.add(StatCounter(name=key, value=actual[key]))
+        db.commit()
+
+        if stored and corrections:
+            logger.warning(f"Stats counters drifted, corrected: {corrections}")
+        return corrections
+
+    def snapshot(self, db: Session) -> Tuple[Dict[str, int], Optional[datetime]]:
+        """All counters and when one last changed; the first call on an empty table counts everything"""
+        rows = db.query(StatCounter.name, StatCounter.value, StatCounter.updated_at).all()
+        if not rows:
+            self.reconcile(db)
+            rows = db.query(StatCounter.name, StatCounter.value, StatCounter.updated_at).all()
+        counters = {row.name: row.value for row in rows}
+        updated_at = max((row.updated_at for row in rows if row.updated_at), default=None)
+        return counters, updated_at
+
+    @staticmethod
+    def breakdown(counters: Dict[str, int], prefix: str) -> Dict[str, int]:
+        """{"pending": 3, ...} from the counters named `prefix` + value"""
+        return {key[len(prefix):]: value for key, value in counters.items() if key.startswith(prefix)}
+
+
+# Global stats instance
+stats_service = StatsService()
+
+event.listen(Session, "after_flush", stats_service._after_flush)
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+# Setting an expired attribute doesn't load its old value unless asked to,
+# and without it an update can't tell which counter to decrement
+for _tracked in TRACKED.values():
+    for _name in _tracked.columns:
+        event.listen(getattr(_tracked.model, _name), "set", _keep_old_value, active_history=True, retval=True)
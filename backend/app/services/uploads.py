@@ -0,0 +1,207 @@
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+from typing import List, Optional
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import Request
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.images import SIGNATURE_LENGTH, UPLOADS_URL, detect_image_type, image_pipeline
+from app.services.photo_hash import photo_hash_service
+import os
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+PHOTOS_DIR = "photos"  # Inside the uploads directory
+
+# Multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 16 * 1024
+
+# Extensions that identify the same image type as the detected one
+EQUIVALENT_EXTENSIONS = {".jpg": (".jpg", ".jpeg"), ".png": (".png",), ".gif": (".gif",), ".webp": (".webp",)}
+
+
+class UploadError(Exception):
+    """Rejected upload; `status_code` is the HTTP status to answer with"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class StoredUpload:
+    path: str  # Relative to the uploads directory
+    size_bytes: int
+    sha256: str
+
+    @property
+    def url(self) -> str:
+        return UPLOADS_URL + self.path
+
+
+class _PhotoPartWriter:
+    """Multipart callbacks writing the first file part to disk as it arrives"""
+
+    def __init__(self, temp: Path, max_bytes: int, allowed_extensions: List[str]):
+        self.temp = temp
+        self.max_bytes = max_bytes
+        self.allowed_extensions = [extension.lower() for extension in allowed_extensions]
+        self.handle = None
+        self.digest = sha256()
+        self.size = 0
+        self.head = b""
+        self.extension: Optional[str] = None
+        self.done = False
+        self._header_field = b""
+        self._header_value = b""
+        self._headers = {}
+        self._in_file = False
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": lambda data, start, end: self._append_header_field(data[start:end]),
+            "on_header_value": lambda data, start, end: self._append_header_value(data[start:end]),
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+
+    def _append_header_field(self, data: bytes):
+        self._header_field += data
+
+    def _append_header_value(self, data: bytes):
+        self._header_value += data
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        self._in_file = filename is not None and not self.done
+        if not self._in_file:
+            return
+        extension = os.path.splitext(filename.decode("utf-8", "replace"))[1].lower()
+        if extension not in self.allowed_extensions:
+            raise UploadError(f"File type not allowed, expected one of: {', '.join(self.allowed_extensions)}")
+        self.handle = open(self.temp, "wb")
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._in_file:
+            return
+        chunk = data[start:end]
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadError(f"File larger than {self.max_bytes} bytes", status_code=413)
+        if len(self.head) < SIGNATURE_LENGTH:
+            self.head += chunk[:SIGNATURE_LENGTH - len(self.head)]
+            if len(self.head) == SIGNATURE_LENGTH:
+                self._check_type()
+        self.digest.update(chunk)
+        self.handle.write(chunk)
+
+    def on_part_end(self):
+        if self._in_file:
+            self._check_type()
+            self.handle.close()
+            self.handle = None
+            self.done = True
+        self._in_file = False
+
+    def _check_type(self):
+        if self.extension:
+            return
+        extension = detect_image_type(self.head)
+        allowed = extension and any(
+            equivalent in self.allowed_extensions for equivalent in EQUIVALENT_EXTENSIONS[extension]
+        )
+        if not allowed:
+            raise UploadError("File content is not an allowed image type")
+        self.extension = extension
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+
+async def receive_photo(
+    request: Request,
+    upload_dir: str = settings.UPLOAD_DIR,
+    max_bytes: int = settings.MAX_FILE_SIZE,
+    allowed_extensions: List[str] = settings.ALLOWED_EXTENSIONS,
+) -> StoredUpload:
+    """Stream the first file of a multipart request to content-addressed storage.
+
+    Chunks go straight to a temp file as they arrive, so the upload is never
+    held in memory. Requests whose Content-Length is already too large are
+    rejected before reading; otherwise the stream is abandoned as soon as the
+    file crosses `max_bytes` or its first bytes aren't an allowed image type.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadError("Expected a multipart/form-data request")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise UploadError(f"File larger than {max_bytes} bytes", status_code=413)
+
+    root = Path(upload_dir)
+    temp = root / PHOTOS_DIR / f".{uuid.uuid4().hex}.part"
+    temp.parent.mkdir(parents=True, exist_ok=True)
+    writer = _PhotoPartWriter(temp, max_bytes, allowed_extensions)
+    parser = MultipartParser(boundary, writer.callbacks())
+
+    try:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes + MULTIPART_OVERHEAD:
+                raise UploadError(f"File larger than {max_bytes} bytes", status_code=413)
+            parser.write(chunk)
+            if writer.done:
+                break
+        parser.finalize()
+        writer.close()
+
+        if not writer.done:
+            raise UploadError("No file found in the request")
+
+        digest = writer.digest.hexdigest()
+        path = f"{PHOTOS_DIR}/{digest[:2]}/{digest}{writer.extension}"
+        target = root / path
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp, target)
+        return StoredUpload(path=path, size_bytes=writer.size, sha256=digest)
+    finally:
+        writer.close()
+        if temp.exists():
+            temp.unlink()
+
+
+async def process_uploaded_photo(path: str):
+    """Background step after an upload: variants and perceptual hash"""
+    await image_pipeline.process(path)
+    db = SessionLocal()
+    try:
+        await photo_hash_service.hash_photo(db, path)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Processing uploaded photo {path} failed: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
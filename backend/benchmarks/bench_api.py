@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+API load test: scripted user scenarios against a seeded dataset.
+
+Virtual users loop over weighted scenarios for a fixed time:
+  browse  list dogs page by page and open one
+  search  free-text dog search and breed autocomplete
+  filter  size/location, compatibility, distance and combined local+external lists
+  login   POST /auth/login (bcrypt)
+  apply   foster application by a logged-in user
+Reports throughput and p50/p95/p99 latency per endpoint. Each virtual user
+draws from its own seeded RNG, so a run replays the same request mix.
+
+By default the app runs in-process (httpx ASGI transport) on a fresh
+throwaway database seeded with benchmarks.dataset. With --url it targets a
+running server instead; export the server's DATABASE_URL so the dataset is
+seeded there, or read back if already seeded:
+    DATABASE_URL=sqlite:///./bench.db uvicorn app.main:app &
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.bench_api --url http://127.0.0.1:8000
+
+Save a run as a baseline, then fail (exit 1) when a later run regresses:
+    python -m benchmarks.bench_api --save benchmarks/baseline.json
+    python -m benchmarks.bench_api --baseline benchmarks/baseline.json
+Baselines only compare runs on the same machine and settings.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_api [--size small] [--users 20] [--duration 20] [--scenarios browse=40,search=25]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-api-")
+THROWAWAY_DATABASE = "DATABASE_URL" not in os.environ
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORKDIR}/bench.db")
+os.environ.setdefault("UPLOAD_DIR", WORKDIR)
+
+import httpx
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.security import password_hasher
+from app.models.user import User
+from benchmarks.dataset import PASSWORD, SIZES, Dataset, describe, generate
+
+DEFAULT_SCENARIOS = {"browse": 40, "search": 25, "filter": 20, "apply": 10, "login": 5}
+SIZE_VALUES = ["small", "medium", "large", "extra_large"]
+# Tail percentiles are noise below this many samples, so they are not compared
+MIN_SAMPLES = {"p50_ms": 1, "p95_ms": 20, "p99_ms": 100}
+
+
+class Recorder:
+    """Latency samples and unexpected statuses per endpoint label"""
+
+    def __init__(self):
+        self.recording = False
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str,
+                      expect=(200,), **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if self.recording:
+            self.samples[label].append(elapsed_ms)
+            if response is None or response.status_code not in expect:
+                self.errors[label] += 1
+        return response if response is not None and response.status_code in expect else None
+
+
+@dataclass
+class VirtualUser:
+    index: int
+    rng: random.Random
+    email: str
+    token: Optional[str] = None
+    dogs_to_apply: List[int] = field(default_factory=list)
+
+
+async def login(client, dataset: Dataset, user: VirtualUser, recorder: Recorder):
+    email = user.rng.choice(dataset.foster_emails)
+    await recorder.request(client, "POST /auth/login", "POST", "/auth/login",
+                           json={"email": email, "password": PASSWORD})
+
+
+async def browse(client, dataset: Dataset, user: VirtualUser, recorder: Recorder):
+    page = user.rng.choices(range(10), weights=[1 / (n + 1) for n in range(10)])[0]
+    response = await recorder.request(client, "GET /dogs/", "GET", f"/dogs/?skip={page * 20}&limit=20")
+    dogs = response.json() if response is not None else []
+    if dogs:
+        dog = user.rng.choice(dogs)
+        await recorder.request(client, "GET /dogs/{dog_id}", "GET", f"/dogs/{dog['id']}")
+
+
+async def search(client, dataset: Dataset, user: VirtualUser, recorder: Recorder):
+    term = user.rng.choice(dataset.breeds).split()[0]
+    await recorder.request(client, "GET /search/dogs?q", "GET", "/search/dogs", params={"q": term.lower()})
+    await recorder.request(client, "GET /search/breeds?q", "GET", "/search/breeds", params={"q": term[:3].lower()})
+
+
+async def filter_dogs(client, dataset: Dataset, user: VirtualUser, recorder: Recorder):
+    rng = user.rng
+    choice = rng.randrange(4)
+    if choice == 0:
+        params = {"size": rng.choice(SIZE_VALUES), "location": rng.choice(dataset.cities)}
+        await recorder.request(client, "GET /dogs/?size&location", "GET", "/dogs/", params=params)
+    elif choice == 1:
+        params = {"good_with_kids": "true", "good_with_dogs": rng.choice(["true", "false"])}
+        await recorder.request(client, "GET /search/dogs?good_with", "GET", "/search/dogs", params=params)
+    elif choice == 2 and dataset.points:
+        latitude, longitude = rng.choice(sorted(dataset.points.values()))
+        params = {"near": f"{latitude},{longitude}", "radius_km": rng.choice([10, 25, 50])}
+        await recorder.request(client, "GET /dogs/?near", "GET", "/dogs/", params=params)
+    else:
+        params = {"breed": rng.choice(dataset.breeds)}
+        await recorder.request(client, "GET /dogs/all?breed", "GET", "/dogs/all", params=params)
+
+
+async def apply(client, dataset: Dataset, user: VirtualUser, recorder: Recorder):
+    if user.token is None:
+        response = await recorder.request(client, "POST /auth/login", "POST", "/auth/login",
+                                          json={"email": user.email, "password": PASSWORD})
+        if response is None:
+            return
+        user.token = response.json()["access_token"]
+    if not user.dogs_to_apply:
+        return
+    dog_id = user.dogs_to_apply.pop()
+    await recorder.request(
+        client, "POST /fosters/apply/{dog_id}", "POST", f"/fosters/apply/{dog_id}",
+        headers={"Authorization": f"Bearer {user.token}"},
+        json={"dog_id": dog_id, "message": "Me encantaría acogerle.", "living_situation": "Piso con terraza, sin otros animales."},
+    )
+
+
+SCENARIOS = {"browse": browse, "search": search, "filter": filter_dogs, "apply": apply, "login": login}
+
+
+async def run_user(client, dataset: Dataset, user: VirtualUser, recorder: Recorder, weights: Dict[str, int],
+                   stop: float):
+    names = list(weights)
+    while time.perf_counter() < stop:
+        scenario = user.rng.choices(names, weights=[weights[name] for name in names])[0]
+        await SCENARIOS[scenario](client, dataset, user, recorder)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(recorder: Recorder, duration: float) -> Dict[str, dict]:
+    return {
+        label: {
+            "requests": len(samples),
+            "errors": recorder.errors.get(label, 0),
+            "throughput": round(len(samples) / duration, 2),
+            "p50_ms": round(percentile(samples, 0.50), 2),
+            "p95_ms": round(percentile(samples, 0.95), 2),
+            "p99_ms": round(percentile(samples, 0.99), 2),
+        }
+        for label, samples in sorted(recorder.samples.items())
+    }
+
+
+def report(endpoints: Dict[str, dict], duration: float):
+    print(f"{'endpoint':<34} {'reqs':>7} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, row in endpoints.items():
+        print(f"{label:<34} {row['requests']:>7} {row['errors']:>6} {row['throughput']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+    total = sum(row["requests"] for row in endpoints.values())
+    print(f"{'total':<34} {total:>7} {sum(row['errors'] for row in endpoints.values()):>6} {total / duration:>8.1f}")
+
+
+def regressions(current: Dict[str, dict], baseline: Dict[str, dict], tolerance: float, slack_ms: float) -> List[str]:
+    """Endpoints slower, less productive or failing more than the baseline allows"""
+    problems = []
+    for label, before in baseline.items():
+        after = current.get(label)
+        if after is None:
+            problems.append(f"{label}: no requests in this run")
+            continue
+        for key, min_samples in MIN_SAMPLES.items():
+            if min(before["requests"], after["requests"]) < min_samples:
+                continue
+            limit = before[key] * (1 + tolerance) + slack_ms
+            if after[key] > limit:
+                problems.append(f"{label}: {key} {after[key]:.1f} > {limit:.1f} (baseline {before[key]:.1f})")
+        if after["throughput"] < before["throughput"] * (1 - tolerance):
+            problems.append(f"{label}: throughput {after['throughput']:.1f}/s < baseline {before['throughput']:.1f}/s")
+        error_rate = after["errors"] / max(after["requests"], 1)
+        if error_rate > before["errors"] / max(before["requests"], 1) + 0.01:
+            problems.append(f"{label}: error rate {error_rate:.1%}")
+    return problems
+
+
+def load_dataset(size: str, seed: int) -> Dataset:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(User).count():
+            print(f"Reusing the dataset already in {engine.url}")
+            return describe(db, SIZES[size].reserved_fosters)
+        started = time.perf_counter()
+        dataset = generate(db, SIZES[size], seed)
+        print(f"Seeded {size} dataset (seed {seed}) in {time.perf_counter() - started:.1f}s")
+        return dataset
+    finally:
+        db.close()
+
+
+async def run(args, dataset: Dataset, weights: Dict[str, int]) -> Tuple[Dict[str, dict], float]:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60,
+                                   limits=httpx.Limits(max_connections=args.users))
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    users = []
+    for index in range(args.users):
+        rng = random.Random(args.seed * 1000 + index)
+        dogs = rng.sample(dataset.available_dog_ids, min(len(dataset.available_dog_ids), 500))
+        users.append(VirtualUser(index=index, rng=rng, email=dataset.reserved_foster_emails[index], dogs_to_apply=dogs))
+
+    recorder = Recorder()
+    async with client:
+        if args.warmup:
+            stop = time.perf_counter() + args.warmup
+            await asyncio.gather(*(run_user(client, dataset, user, recorder, weights, stop) for user in users))
+        recorder.recording = True
+        started = time.perf_counter()
+        stop = started + args.duration
+        await asyncio.gather(*(run_user(client, dataset, user, recorder, weights, stop) for user in users))
+        duration = time.perf_counter() - started
+    return summarize(recorder, duration), duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=SIZES, default="small", help="Dataset size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before")
+    parser.add_argument("--scenarios", help="Weights, e.g. browse=40,search=25 (default: %s)" %
+                        ",".join(f"{name}={weight}" for name, weight in DEFAULT_SCENARIOS.items()))
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--save", help="Write results as JSON, e.g. a new baseline")
+    parser.add_argument("--baseline", help="Compare with a saved run and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--slack-ms", type=float, default=2.0, help="Allowed absolute latency increase")
+    args = parser.parse_args()
+
+    weights = dict(DEFAULT_SCENARIOS)
+    if args.scenarios:
+        weights = {name: int(weight) for name, weight in (item.split("=") for item in args.scenarios.split(","))}
+        unknown = set(weights) - set(SCENARIOS)
+        if unknown:
+            parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if args.url and THROWAWAY_DATABASE:
+        parser.error("--url needs DATABASE_URL set to the server's database")
+
+    dataset = load_dataset(args.size, args.seed)
+    if len(dataset.reserved_foster_emails) < args.users:
+        parser.error(f"Only {len(dataset.reserved_foster_emails)} fosters without applications; lower --users")
+
+    print(f"{args.users} users, {args.duration:.0f}s, scenarios {weights}, "
+          f"{'server ' + args.url if args.url else 'in-process'}")
+    endpoints, duration = asyncio.run(run(args, dataset, weights))
+    password_hasher.shutdown()
+    report(endpoints, duration)
+
+    result = {
+        "config": {"size": args.size, "seed": args.seed, "users": args.users, "duration": args.duration,
+                   "scenarios": weights, "target": args.url or "in-process",
+                   "machine": f"{platform.machine()} {os.cpu_count()} CPUs, Python {platform.python_version()}"},
+        "endpoints": endpoints,
+    }
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(result, handle, indent=2)
+        print(f"Saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        if baseline["config"]["scenarios"] != weights or baseline["config"]["size"] != args.size:
+            print("Warning: baseline was recorded with a different dataset size or scenario mix")
+        problems = regressions(endpoints, baseline["endpoints"], args.tolerance, args.slack_ms)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the autocomplete prefix index.
+
+Builds a PrefixIndex over N distinct breed/location-like values with a skewed
+frequency distribution and reports build time, per-query latency (cold and
+cached) and incremental update cost.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_autocomplete [--values 50000] [--queries 20000]
+"""
+
+import argparse
+import random
+import string
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.services.autocomplete import PrefixIndex, normalize
+
+SYLLABLES = ["ma", "la", "ga", "vi", "llo", "sa", "rá", "to", "be", "ní", "cia", "gra", "na", "dá", "es", "pa", "ño", "ri", "go"]
+PREFIXES = ["", "", "", "San ", "Villa", "La ", "El ", "Puerto ", "Santa "]
+
+
+def generate_values(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    values = {}
+    while len(values) < count:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        suffix = "" if rng.random() < 0.7 else " " + rng.choice(string.ascii_uppercase) + "".join(
+            rng.choice(SYLLABLES) for _ in range(2)
+        )
+        value = rng.choice(PREFIXES) + word.capitalize() + suffix
+        values.setdefault(normalize(value), value)
+
+    # Zipf-like weights: a few values are very common, most appear once or twice
+    shuffled = list(values.values())
+    rng.shuffle(shuffled)
+    return [(value, max(1, int(1000 / (rank + 1) ** 0.8))) for rank, value in enumerate(shuffled)]
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--values", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    values = generate_values(args.values)
+    rng = random.Random(7)
+
+    start = time.perf_counter()
+    index = PrefixIndex()
+    index.load(values)
+    build_ms = (time.perf_counter() - start) * 1000
+    distinct = len(index)
+
+    queries = []
+    for _ in range(args.queries):
+        value = rng.choice(values)[0]
+        queries.append(value[: rng.randint(1, 5)])
+
+    latencies = sorted(timed(lambda: index.suggest(query, args.limit), 1) for query in queries)
+
+    updates = [(rng.choice(values)[0], rng.choice([1, -1])) for _ in range(5000)]
+    iterator = iter(updates)
+    update = timed(lambda: index.add(*next(iterator)), len(updates))
+
+    after_updates = sorted(timed(lambda: index.suggest(query, args.limit), 1) for query in queries)
+
+    def percentile(samples, p):
+        return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+    print(f"distinct values:        {distinct}")
+    print(f"build:                  {build_ms:.1f} ms")
+    print(f"suggest p50 / p99:      {percentile(latencies, 0.5):.1f} / {percentile(latencies, 0.99):.1f} µs")
+    print(f"incremental update:     {update:.2f} µs")
+    print(f"after updates p50/p99:  {percentile(after_updates, 0.5):.1f} / {percentile(after_updates, 0.99):.1f} µs")
+    print(f"example: {queries[0]!r} -> {index.suggest(queries[0], 5)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Precision/recall and throughput benchmark for MinHash/LSH duplicate detection.
+
+Generates a synthetic corpus of dog listings built from shared phrase
+templates (so unrelated dogs look alike, as they do on real shelter sites),
+cross-posts a share of them with realistic edits, and measures how many true
+duplicate pairs the LSH index finds and how many it invents.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_dedup [--dogs 20000] [--duplicate-rate 0.3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.services.autocomplete import normalize
+from app.services.dedup import LSHIndex, MinHasher
+
+NAMES = ["Toby", "Luna", "Max", "Kira", "Rocky", "Nala", "Bruno", "Lola", "Coco", "Thor", "Mia", "Simba",
+         "Canela", "Zeus", "Nina", "Bobby", "Duna", "Leo", "Maya", "Chispa", "Lucas", "Bimba", "Rex", "Frida"]
+BREEDS = ["Mestizo", "Galgo", "Podenco", "Pastor Alemán", "Labrador", "Bodeguero", "Mastín", "Beagle", "Yorkshire"]
+COLORS = ["negro", "blanco", "canela", "atigrado", "marrón", "gris", "negro y fuego", "blanco y negro", "rubio"]
+PLACES = ["Madrid", "Sevilla", "Valencia", "Zaragoza", "Málaga", "Murcia", "Toledo", "Badajoz", "Lugo", "Huesca"]
+SUBJECTS = ["con otros perros", "con gatos", "con niños", "en casa", "con la correa", "en el coche", "con extraños"]
+MANNERS = ["es muy cariñoso", "es tranquilo", "se porta genial", "es algo tímido", "necesita paciencia", "es juguetón"]
+EXTRAS = [
+    "está vacunado y desparasitado", "tiene chip", "está esterilizado", "busca una familia responsable",
+    "fue encontrado abandonado en una carretera", "es ideal para familias activas", "necesita una casa con jardín",
+    "tiene mucha energía", "es un perro senior muy bueno", "le encanta jugar con la pelota",
+]
+
+
+def make_listing(rng: random.Random):
+    """A listing built from shared phrases plus the details that tell dogs apart"""
+    name = rng.choice(NAMES)
+    breed = rng.choice(BREEDS)
+    sentences = [
+        f"{name} es un {breed.lower()} {rng.choice(COLORS)} de {rng.randint(1, 14)} años y {rng.randint(4, 40)} kg",
+        f"Llegó a la protectora de {rng.choice(PLACES)} el {rng.randint(1, 28)}/{rng.randint(1, 12)}/{rng.randint(2019, 2024)}",
+    ]
+    sentences += [f"{rng.choice(MANNERS)} {subject}" for subject in rng.sample(SUBJECTS, rng.randint(1, 3))]
+    sentences += rng.sample(EXTRAS, rng.randint(1, 3))
+    return {"name": name, "breed": breed, "description": ". ".join(sentences) + "."}
+
+
+def repost(listing, rng: random.Random):
+    """Edits another shelter makes when cross-posting: case, accents, a typo, a footer or a dropped sentence"""
+    sentences = listing["description"].rstrip(".").split(". ")
+    if rng.random() < 0.3 and len(sentences) > 4:
+        sentences.pop(rng.randrange(2, len(sentences)))
+    description = ". ".join(sentences) + "."
+    if rng.random() < 0.3:
+        description = normalize(description)
+    if rng.random() < 0.3:
+        position = rng.randrange(len(description))
+        description = description[:position] + description[position + 1:]
+    if rng.random() < 0.3:
+        description += " Más información por mensaje privado."
+    name = listing["name"].upper() if rng.random() < 0.3 else listing["name"]
+    return {"name": name, "breed": listing["breed"].lower(), "description": description}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dogs", type=int, default=20000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    corpus = []  # (listing, original index)
+    originals = int(args.dogs / (1 + args.duplicate_rate * 1.5))
+    for original in range(originals):
+        listing = make_listing(rng)
+        corpus.append((listing, original))
+        if rng.random() < args.duplicate_rate:
+            for _ in range(rng.randint(1, 2)):
+                corpus.append((repost(listing, rng), original))
+    rng.shuffle(corpus)
+
+    hasher = MinHasher()
+    start = time.perf_counter()
+    signatures = [
+        hasher.signature(" | ".join(normalize(listing[field]) for field in ("name", "breed", "description")))
+        for listing, _ in corpus
+    ]
+    signing_s = time.perf_counter() - start
+
+    index = LSHIndex()
+    found = set()
+    candidates = 0
+    start = time.perf_counter()
+    for key, ((listing, _), signature) in enumerate(zip(corpus, signatures)):
+        candidates += len(index.candidates(signature))
+        for other, _ in index.query(signature, normalize(listing["name"])):
+            found.add((other, key))
+        index.add(key, signature, normalize(listing["name"]))
+    query_s = time.perf_counter() - start
+
+    by_original = {}
+    for key, (_, original) in enumerate(corpus):
+        by_original.setdefault(original, []).append(key)
+    truth = {(a, b) for keys in by_original.values() for i, a in enumerate(keys) for b in keys[i + 1:]}
+
+    true_positives = len(found & truth)
+    precision = true_positives / len(found) if found else 1.0
+    recall = true_positives / len(truth) if truth else 1.0
+
+    print(f"listings:            {len(corpus)} ({len(truth)} true duplicate pairs)")
+    print(f"signing throughput:  {len(corpus) / signing_s:,.0f} listings/s")
+    print(f"LSH query + insert:  {len(corpus) / query_s:,.0f} listings/s "
+          f"({candidates / len(corpus):.1f} candidates per query vs {len(corpus) / 2:,.0f} for a full scan)")
+    print(f"precision:           {precision:.3f}")
+    print(f"recall:              {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
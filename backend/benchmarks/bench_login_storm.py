@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Load test: /dogs latency while a login storm is in progress.
+
+Runs the app in-process against a throwaway SQLite database. Concurrent
+clients hammer POST /auth/login while a probe requests GET /dogs/ in a loop,
+first with bcrypt called inline on the event loop (the old behaviour) and
+then through the bounded password hasher pool. Reports probe p50/p99/max and
+login throughput for each.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_login_storm [--logins 16] [--duration 5] [--dogs 50]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-login-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/bench.db"
+os.environ["UPLOAD_DIR"] = WORKDIR
+
+import httpx
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.security import get_password_hash, password_hasher
+from app.main import app
+from app.models.dog import Dog, DogSize, DogStatus
+from app.models.user import User, UserType
+
+EMAIL = "storm@example.com"
+PASSWORD = "correct horse battery staple"
+
+
+def seed(dogs: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    owner = User(email=EMAIL, name="Storm", user_type=UserType.SHELTER_ADMIN,
+                 hashed_password=get_password_hash(PASSWORD))
+    db.add(owner)
+    db.flush()
+    for i in range(dogs):
+        db.add(Dog(name=f"Perro {i}", breed="Mestizo", age=12 + i % 100, size=DogSize.MEDIUM,
+                   status=DogStatus.AVAILABLE, location="Madrid", owner_id=owner.id))
+    db.commit()
+    db.close()
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def probe(client: httpx.AsyncClient, stop: float, interval: float):
+    latencies = []
+    while time.perf_counter() < stop:
+        started = time.perf_counter()
+        response = await client.get("/dogs/")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def storm(client: httpx.AsyncClient, stop: float):
+    done = rejected = 0
+    while time.perf_counter() < stop:
+        response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+        if response.status_code == 503:
+            rejected += 1
+            await asyncio.sleep(0.05)
+        else:
+            response.raise_for_status()
+            done += 1
+    return done, rejected
+
+
+async def run(logins: int, duration: float, interval: float):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/dogs/")  # Warm up imports and the connection pool
+        stop = time.perf_counter() + duration
+        results = await asyncio.gather(probe(client, stop, interval), *(storm(client, stop) for _ in range(logins)))
+    latencies = results[0]
+    done = sum(result[0] for result in results[1:])
+    rejected = sum(result[1] for result in results[1:])
+    return latencies, done, rejected
+
+
+async def inline(func, *args):
+    """The old behaviour: bcrypt runs on the event loop"""
+    return func(*args)
+
+
+def report(label: str, latencies, done: int, rejected: int, duration: float):
+    print(f"{label:<10} /dogs n={len(latencies):<5} p50={statistics.median(latencies):7.1f} ms "
+          f"p99={percentile(latencies, 0.99):7.1f} ms  max={max(latencies):7.1f} ms  "
+          f"logins={done / duration:5.1f}/s  rejected={rejected}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=16, help="Concurrent login clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per scenario")
+    parser.add_argument("--dogs", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.01, help="Pause between probe requests")
+    args = parser.parse_args()
+
+    seed(args.dogs)
+    print(f"{args.logins} login clients, {args.duration:.0f}s per scenario, "
+          f"{password_hasher.workers} bcrypt workers, {os.cpu_count()} CPUs")
+
+    latencies, _, _ = asyncio.run(run(0, args.duration / 2, args.interval))
+    report("idle", latencies, 0, 0, args.duration / 2)
+
+    password_hasher.run = inline
+    try:
+        report("inline", *asyncio.run(run(args.logins, args.duration, args.interval)), args.duration)
+    finally:
+        del password_hasher.run
+
+    report("pooled", *asyncio.run(run(args.logins, args.duration, args.interval)), args.duration)
+    print(f"pool stats: {password_hasher.stats()}")
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
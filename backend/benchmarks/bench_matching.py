@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the foster-to-dog matching engine.
+
+Fills the in-memory feature matrix with N synthetic dogs (local flags and
+external "unknown" traits) and reports top-k latency per foster profile and
+the cost of incremental updates.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_matching [--dogs 200000] [--limit 20]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.services.matching import (
+    EXTERNAL, LOCAL, TRAITS, FosterProfile, MatchingService, pack_features
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dogs", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    service = MatchingService()
+
+    start = time.perf_counter()
+    for dog_id in range(args.dogs):
+        kind = EXTERNAL if rng.random() < 0.6 else LOCAL
+        if kind == LOCAL:
+            values = {trait: rng.random() < 0.5 for trait in TRAITS}
+        else:
+            values = {trait: rng.choice([None, None, True, False]) for trait in TRAITS}
+        service.upsert(kind, dog_id, pack_features(values))
+    service.is_built = True
+    build_ms = (time.perf_counter() - start) * 1000
+    size = len(service)
+
+    profiles = [FosterProfile(*flags) for flags in itertools.product([False, True], repeat=4)]
+
+    latencies = []
+    for _ in range(args.repeat):
+        profile = rng.choice(profiles)
+        start = time.perf_counter()
+        service.top_matches(profile, args.limit)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    start = time.perf_counter()
+    updates = 10000
+    for _ in range(updates):
+        dog_id = rng.randrange(args.dogs)
+        if rng.random() < 0.2:
+            service.remove(LOCAL, dog_id)
+            service.remove(EXTERNAL, dog_id)
+        else:
+            service.upsert(LOCAL, dog_id, rng.randrange(256))
+    update_us = (time.perf_counter() - start) / updates * 1e6
+
+    print(f"dogs in matrix:      {size}")
+    print(f"matrix fill:         {build_ms:.0f} ms (includes Python feature packing)")
+    print(f"top-{args.limit} p50 / p99:   {latencies[len(latencies) // 2]:.2f} / "
+          f"{latencies[int(len(latencies) * 0.99)]:.2f} ms")
+    print(f"incremental update:  {update_us:.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark for perceptual-hash near-duplicate lookup.
+
+Checks how far pHash moves under the edits shelters make when reposting
+(resize, recompression, brightness, crops) and measures HammingIndex lookup latency against
+a brute-force scan as the index grows to 1M hashes.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_phash [--sizes 10000,100000,1000000] [--max-distance 8]
+"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from app.services.photo_hash import DEFAULT_MAX_DISTANCE, HammingIndex, hamming, phash
+
+
+def synthetic_photo(rng: np.random.Generator) -> Image.Image:
+    """Smooth random blobs, closer to a photo's spectrum than white noise"""
+    noise = rng.integers(0, 256, (24, 32, 3), dtype=np.uint8)
+    return Image.fromarray(noise).resize((640, 480), Image.BICUBIC).filter(ImageFilter.GaussianBlur(8))
+
+
+def recompress(image: Image.Image, quality: int = 60) -> Image.Image:
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, "JPEG", quality=quality)
+    return Image.open(io.BytesIO(buffer.getvalue()))
+
+
+def crop(image: Image.Image, fraction: float) -> Image.Image:
+    dx, dy = int(image.width * fraction), int(image.height * fraction)
+    return image.crop((dx, dy, image.width - dx, image.height - dy))
+
+
+# Edits shelters make when reposting another shelter's photo
+EDITS = {
+    "resize 640->400px": lambda image: image.resize((400, 300)),
+    "JPEG quality 60": recompress,
+    "brightness +20": lambda image: image.point(lambda p: min(255, p + 20)),
+    "resize + JPEG": lambda image: recompress(image.resize((400, 300))),
+    "crop 1% per side": lambda image: crop(image, 0.01),
+    "crop 2.5% per side": lambda image: crop(image, 0.025),
+}
+
+
+def hash_robustness(max_distance: int, samples: int = 50):
+    rng = np.random.default_rng(7)
+    photos = [synthetic_photo(rng) for _ in range(samples)]
+    hashes = [phash(photo) for photo in photos]
+    for name, edit in EDITS.items():
+        distances = [bin(phash(edit(photo)) ^ value).count("1") for photo, value in zip(photos, hashes)]
+        found = sum(distance <= max_distance for distance in distances) / samples
+        print(f"{name:<20} median {statistics.median(distances):4.0f}, max {max(distances):3d} bits, "
+              f"{found:6.1%} within {max_distance}")
+    different = [bin(a ^ b).count("1") for i, a in enumerate(hashes) for b in hashes[i + 1:]]
+    print(f"{'different photos':<20} median {statistics.median(different):4.0f}, min {min(different):3d} bits")
+
+
+def flip_bits(value: int, bits: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), bits):
+        value ^= 1 << bit
+    return value
+
+
+def bench_index(size: int, max_distance: int, queries: int):
+    rng = random.Random(size)
+    values = np.frombuffer(np.random.default_rng(size).bytes(size * 8), dtype=np.uint64).copy()
+
+    index = HammingIndex(capacity=size)
+    start = time.perf_counter()
+    index.load([(str(row), int(value)) for row, value in enumerate(values)])
+    build_s = time.perf_counter() - start
+
+    probes = [flip_bits(int(values[rng.randrange(size)]), rng.randint(0, max_distance), rng) for _ in range(queries)]
+
+    timings = []
+    results = []
+    for probe in probes:
+        start = time.perf_counter()
+        results.append(index.query(probe, max_distance))
+        timings.append(time.perf_counter() - start)
+    scan_timings = []
+    for probe, matches in zip(probes[:20], results):
+        start = time.perf_counter()
+        expected = np.flatnonzero(hamming(values, probe) <= max_distance)
+        scan_timings.append(time.perf_counter() - start)
+        assert sorted(int(key) for key, _ in matches) == sorted(expected.tolist())
+
+    timings.sort()
+    print(f"{size:>9,} hashes: build {build_s:6.2f}s | query p50 {timings[len(timings) // 2] * 1e3:7.3f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e3:7.3f} ms | "
+          f"brute-force scan {statistics.median(scan_timings) * 1e3:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--max-distance", type=int, default=DEFAULT_MAX_DISTANCE)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    print("pHash distance between a photo and its edited copy:")
+    hash_robustness(args.max_distance)
+    print(f"\nLookups within {args.max_distance} bits (results checked against the scan):")
+    for size in (int(size) for size in args.sizes.split(",")):
+        bench_index(size, args.max_distance, args.queries)
+
+
+if __name__ == "__main__":
+    main()
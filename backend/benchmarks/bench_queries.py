@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Query budget check for the list endpoints.
+
+Seeds a throwaway SQLite database, requests each list endpoint with a small
+and a large page and counts the SQL statements it runs. A count that grows
+with the page size is an N+1; a count above the endpoint's budget is a
+regression. Exits with status 1 if either happens. tests/test_query_budgets.py
+runs the same checks under pytest, so CI fails on a regression.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_queries [--small 5] [--large 50] [--verbose]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-queries-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/bench.db"
+os.environ["UPLOAD_DIR"] = WORKDIR
+
+import httpx
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.query_counter import count_queries
+from app.core.security import create_access_token
+from app.main import app
+from app.models.dog import Dog, DogSize, DogStatus
+from app.models.external_shelter import ExternalDog, ExternalShelter, ExternalShelterType
+from app.models.foster_application import FosterApplication
+from app.models.user import ShelterStatus, User, UserType
+
+# Endpoint -> most statements one request may run, whatever the page size
+BUDGETS = {
+    "/dogs/?limit={n}": 1,
+    "/dogs/?limit={n}&near=40.4,-3.7&radius_km=50": 1,
+    "/dogs/all?limit={n}": 2,
+    "/dogs/all?limit={n}&near=40.4,-3.7&radius_km=50": 2,
+    "/dogs/changes?since=2000-01-01T00:00:00&limit=2000": 4,
+    "/search/dogs?q=Perro&limit={n}": 1,
+    "/api/external-dogs?limit={n}": 2,
+    "/api/external-dogs?limit={n}&near=40.4,-3.7&radius_km=50": 2,
+    "/api/external-shelters/1/dogs": 3,
+    "/api/external-shelters": 1,
+    "/fosters/my-applications": 1,
+    "/fosters/applications?limit={n}": 1,
+    "/fosters/recommendations?limit={n}": 4,
+    "/auth/admin/users?limit={n}": 1,
+    "/auth/admin/stats": 1,
+    "/changes?limit={n}": 1,
+    "/api/shelters/pending": 1,
+    "/api/shelters/approved": 1,
+}
+
+
+def seed(count: int) -> dict:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    admin = User(email="admin@example.com", name="Admin", hashed_password="x", user_type=UserType.ADMIN)
+    db.add(admin)
+    owners = []
+    for i in range(count):
+        owner = User(email=f"shelter{i}@example.com", name=f"Protectora {i}", hashed_password="x",
+                     user_type=UserType.SHELTER_ADMIN if i % 2 else UserType.SHELTER, location="Madrid",
+                     shelter_status=ShelterStatus.APPROVED if i % 2 else ShelterStatus.PENDING)
+        owners.append(owner)
+    db.add_all(owners)
+    shelters = [ExternalShelter(name=f"Externa {i}", website_url=f"https://externa{i}.example",
+                                integration_type=ExternalShelterType.RSS, location="Madrid") for i in range(count)]
+    db.add_all(shelters)
+    db.flush()
+    for i in range(count):
+        dog = Dog(name=f"Perro {i}", breed="Mestizo", size=DogSize.MEDIUM, status=DogStatus.AVAILABLE,
+                  location="Madrid", owner_id=owners[i].id, good_with_kids=True, photos=[])
+        db.add(dog)
+        # Every dog from a different shelter, the worst case for lazy loading
+        db.add(ExternalDog(name=f"Externo {i}", breed="Galgo", location="Madrid", external_id=str(i),
+                           external_shelter_id=shelters[i].id, photos=[], is_available=True))
+        db.flush()
+        db.add(FosterApplication(user_id=admin.id, dog_id=dog.id, living_situation="Piso con niños"))
+    db.commit()
+    token = create_access_token(admin.id)
+    db.close()
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def measure(client: httpx.AsyncClient, url: str, headers: dict):
+    await client.get(url, headers=headers)  # Warm caches and indexes built on first use
+    with count_queries() as counter:
+        response = await client.get(url, headers=headers)
+    response.raise_for_status()
+    return counter
+
+
+async def run(small: int, large: int, verbose: bool) -> bool:
+    headers = seed(large)
+    transport = httpx.ASGITransport(app=app)
+    ok = True
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'endpoint':<60} {'n=' + str(small):>6} {'n=' + str(large):>6} {'budget':>7}")
+        for template, budget in BUDGETS.items():
+            few = await measure(client, template.format(n=small), headers)
+            many = await measure(client, template.format(n=large), headers)
+            failed = many.count != few.count or many.count > budget
+            ok = ok and not failed
+            print(f"{template:<60} {few.count:>6} {many.count:>6} {budget:>7}  {'FAIL' if failed else 'ok'}")
+            if verbose or failed:
+                for statement in many.statements:
+                    print("    " + " ".join(statement.split())[:150])
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--small", type=int, default=5)
+    parser.add_argument("--large", type=int, default=50)
+    parser.add_argument("--verbose", action="store_true", help="Print every statement")
+    args = parser.parse_args()
+
+    if not asyncio.run(run(args.small, args.large, args.verbose)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+End-to-end scraper benchmark against a local fake shelter.
+
+Starts benchmarks.fake_shelter in a background thread, registers one external
+shelter per integration type (web scraping, RSS, API) pointing at it, and
+runs SyncService.sync_shelter for several rounds on a throwaway SQLite
+database. Between rounds the fake site churns, so later rounds measure
+updates, removals and new photos rather than a cold import.
+
+For every sync it reports dogs/sec through fetch, DB commit and photo
+mirroring, the time per stage (from the scraper_stage_duration_seconds
+metric), SQL statements run, and what the fake server saw: requests,
+conditional requests and 304s.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_scrapers [--dogs 200] [--rounds 3] [--latency-ms 20]
+                                        [--error-rate 0.01] [--churn 0.1] [--photos 2]
+                                        [--no-etag] [--types scraper,rss,api]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-scrapers-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/bench.db"
+os.environ["UPLOAD_DIR"] = WORKDIR
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.metrics import scraper_stage_duration
+from app.core.query_counter import count_queries
+from app.models.external_shelter import ExternalShelter, ExternalShelterStatus, ExternalShelterType
+from app.services.images import image_pipeline
+from app.services.sync_service import SyncService
+from benchmarks.fake_shelter import FakeShelter, FakeShelterConfig, FakeShelterServer
+
+STAGES = ("fetch", "process", "commit", "mirror")
+
+SCRAPING_CONFIG = {
+    "dog_url_selector": "a.dog-link",
+    "selectors": {
+        "name": ".dog .name", "breed": ".dog .breed", "age": ".dog .age", "size": ".dog .size",
+        "gender": ".dog .gender", "weight": ".dog .weight", "location": ".dog .location",
+        "description": ".dog .description", "medical_info": ".dog .medical",
+        "behavior_notes": ".dog .behavior", "photos": ".dog img.photo",
+    },
+}
+
+
+def shelter_for(integration: ExternalShelterType, base_url: str) -> ExternalShelter:
+    shelter = ExternalShelter(name=f"Fake {integration.value}", website_url=base_url, integration_type=integration,
+                              status=ExternalShelterStatus.ACTIVE, location="Madrid")
+    if integration == ExternalShelterType.SCRAPER:
+        shelter.scraping_config = {**SCRAPING_CONFIG, "listing_url": f"{base_url}/perros"}
+    elif integration == ExternalShelterType.RSS:
+        shelter.rss_feed_url = f"{base_url}/rss.xml"
+    else:
+        shelter.api_endpoint = f"{base_url}/api/dogs"
+        shelter.api_config = {"dogs_key": "dogs"}
+    return shelter
+
+
+def stage_seconds(shelter: ExternalShelter) -> dict:
+    labels = {"shelter": shelter.id, "integration": shelter.integration_type.value}
+    return {stage: scraper_stage_duration.total(stage=stage, **labels)[0] for stage in STAGES}
+
+
+async def sync_once(db, shelter: ExternalShelter) -> dict:
+    # A failed sync leaves the shelter in error, which sync_shelter refuses
+    shelter.status = ExternalShelterStatus.ACTIVE
+    db.commit()
+
+    before = stage_seconds(shelter)
+    started = time.perf_counter()
+    with count_queries() as queries:
+        result = await SyncService(db).sync_shelter(shelter.id)
+    elapsed = time.perf_counter() - started
+    after = stage_seconds(shelter)
+    return {
+        "result": result,
+        "seconds": elapsed,
+        "queries": queries.count,
+        "stages": {stage: after[stage] - before[stage] for stage in STAGES},
+    }
+
+
+def print_row(integration: str, round_number: int, row: dict, expected: int):
+    result = row["result"]
+    rate = result.dogs_found / row["seconds"] if row["seconds"] else 0
+    stages = " ".join(f"{row['stages'][stage] * 1000:>8.0f}" for stage in STAGES)
+    if not result.success:
+        status = f"FAILED: {result.error}"
+    elif result.dogs_found < expected:
+        # Scrapers log fetch errors and carry on, so a partial fetch still "succeeds"
+        status = f"missed {expected - result.dogs_found} of {expected}"
+    else:
+        status = "ok"
+    print(f"{integration:<8} {round_number:>5} {result.dogs_found:>6} {result.dogs_created:>7} "
+          f"{result.dogs_updated:>7} {result.dogs_marked_unavailable:>6} {result.photos_mirrored:>6} "
+          f"{row['queries']:>7} {row['seconds']:>7.2f} {rate:>8.1f} {stages}  {status}")
+
+
+async def run(args) -> None:
+    integrations = [ExternalShelterType(name) for name in args.types.split(",")]
+    config = FakeShelterConfig(dogs=args.dogs, photos_per_dog=args.photos, latency_ms=args.latency_ms,
+                               error_rate=args.error_rate, etag=not args.no_etag, churn=args.churn,
+                               seed=args.seed)
+    fake = FakeShelter(config)
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    with FakeShelterServer(fake) as server:
+        shelters = [shelter_for(integration, server.base_url) for integration in integrations]
+        db.add_all(shelters)
+        db.commit()
+
+        totals = {integration.value: [0, 0.0] for integration in integrations}
+        print(f"{args.dogs} dogs, {args.photos} photos each, {args.latency_ms:g} ms latency, "
+              f"{args.error_rate:.1%} errors, {args.churn:.0%} churn, ETags {'off' if args.no_etag else 'on'}")
+        print(f"{'type':<8} {'round':>5} {'found':>6} {'created':>7} {'updated':>7} {'gone':>6} {'photos':>6} "
+              f"{'queries':>7} {'seconds':>7} {'dogs/s':>8} " + " ".join(f"{stage + '_ms':>8}" for stage in STAGES))
+        for round_number in range(1, args.rounds + 1):
+            for shelter in shelters:
+                row = await sync_once(db, shelter)
+                print_row(shelter.integration_type.value, round_number, row, len(fake.dogs))
+                totals[shelter.integration_type.value][0] += row["result"].dogs_found
+                totals[shelter.integration_type.value][1] += row["seconds"]
+            server.advance()
+
+    db.close()
+    image_pipeline.shutdown()
+
+    print()
+    for integration, (dogs, seconds) in totals.items():
+        print(f"{integration:<8} {dogs / seconds if seconds else 0:>8.1f} dogs/s over {args.rounds} rounds")
+    stats = fake.stats
+    print("\nfake shelter: " + ", ".join(f"{key}={value}" for key, value in sorted(stats.items())))
+    conditional = sum(value for key, value in stats.items() if key.endswith("_conditional"))
+    if not args.no_etag and not conditional:
+        print("No request was conditional: every round downloaded every page and feed again")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dogs", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added to every fake shelter response")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of fake shelter responses that are 500s")
+    parser.add_argument("--churn", type=float, default=0.1, help="Share of dogs changed and replaced per round")
+    parser.add_argument("--photos", type=int, default=2, help="Photos per dog")
+    parser.add_argument("--no-etag", action="store_true", help="Serve without ETags")
+    parser.add_argument("--types", default="scraper,rss,api", help="Integration types to benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="Show scraper warnings")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING if args.verbose else logging.CRITICAL)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
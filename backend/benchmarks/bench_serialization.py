@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for list endpoint serialization.
+
+Compares, per dog on 100-item pages, the previous response path (full ORM
+objects, from_orm, FastAPI's response_model round trip and the stdlib JSON
+encoder) with the current one (column-only query, a single model_validate
+and orjson), for local and external dogs, stage by stage.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_serialization [--page 100] [--repeat 200]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-serialization-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/bench.db"
+os.environ["UPLOAD_DIR"] = WORKDIR
+
+import json
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.responses import models_response
+from app.models.dog import Dog, DogGender, DogSize, DogStatus
+from app.models.external_shelter import ExternalDog, ExternalShelter, ExternalShelterType
+from app.routers.external_shelters import external_dog_responses
+from app.schemas.dog import DOG_RESPONSE_COLUMNS, DogResponse
+from app.schemas.external_shelter import EXTERNAL_DOG_RESPONSE_COLUMNS, ExternalDogResponse
+from app.schemas.image import _variants
+
+DESCRIPTION = ("Muy cariñosa con las personas, se lleva bien con otros perros y pasea sin tirar. "
+               "Busca una familia con paciencia que le dé tiempo para adaptarse. ") * 3
+
+
+def seed(count: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    shelters = [ExternalShelter(name=f"Protectora {i}", website_url=f"https://protectora{i}.example",
+                                integration_type=ExternalShelterType.RSS, location="Madrid") for i in range(5)]
+    db.add_all(shelters)
+    db.flush()
+    for i in range(count):
+        db.add(Dog(
+            name=f"Perro {i}", breed="Mestizo", age=6 + i % 120, size=list(DogSize)[i % 4],
+            gender=list(DogGender)[i % 2], weight=5.0 + i % 30, location="Madrid", description=DESCRIPTION,
+            good_with_kids=bool(i % 2), status=DogStatus.AVAILABLE, latitude=40.4, longitude=-3.7,
+            photos=[f"/uploads/photos/{i % 100:02d}/{i:064d}.jpg", f"/uploads/photos/00/{i + 1:064d}.jpg"],
+        ))
+        remote = [f"https://protectora.example/fotos/{i}-{n}.jpg" for n in range(3)]
+        db.add(ExternalDog(
+            name=f"Externo {i}", breed="Galgo", age=24, size="Mediano", gender="Hembra",
+            description=DESCRIPTION, location="Madrid", external_shelter_id=shelters[i % 5].id,
+            external_id=str(i), original_url=f"https://protectora.example/perros/{i}", photos=remote,
+            mirrored_photos={url: f"/uploads/mirror/{i % 100:02d}/{i}{n}.jpg" for n, url in enumerate(remote[:2])},
+        ))
+    db.commit()
+    db.close()
+
+
+def measure(label: str, func, page: int, repeat: int, baseline: float = None) -> float:
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    per_dog = (time.perf_counter() - started) / repeat / page * 1e6
+    speedup = f"  ({baseline / per_dog:.1f}x)" if baseline else ""
+    print(f"  {label:<44} {per_dog:7.1f} us/dog{speedup}")
+    return per_dog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    seed(args.page)
+    db = SessionLocal()
+    loop = asyncio.new_event_loop()
+
+    def fastapi_render(field, content) -> bytes:
+        """What FastAPI did with the returned models: dump, validate, serialize, encode"""
+        return JSONResponse(loop.run_until_complete(
+            serialize_response(field=field, response_content=content, is_coroutine=True)
+        )).body
+
+    for title, model, schema, columns, validate in (
+        ("Local dogs (GET /dogs)", Dog, DogResponse, DOG_RESPONSE_COLUMNS,
+         lambda rows: [DogResponse.model_validate(row._asdict()) for row in rows]),
+        ("External dogs (GET /api/external-dogs)", ExternalDog, ExternalDogResponse, EXTERNAL_DOG_RESPONSE_COLUMNS,
+         lambda rows: external_dog_responses(db, rows)),
+    ):
+        field = create_response_field(name="response", type_=List[schema])
+
+        def load_objects():
+            db.expire_all()
+            return db.query(model).limit(args.page).all()
+
+        def old_validate(objects):
+            _variants.cache_clear()  # Photo variants used to be rebuilt on every dump
+            return [schema.model_validate(obj) for obj in objects]
+
+        def old_path():
+            objects = load_objects()
+            _variants.cache_clear()
+            return fastapi_render(field, old_validate(objects))
+
+        def new_path():
+            return models_response(validate(db.query(*columns).limit(args.page).all())).body
+
+        assert json.loads(old_path()) == json.loads(new_path())
+        objects = load_objects()
+        rows = db.query(*columns).limit(args.page).all()
+        old_models = old_validate(objects)
+        new_models = validate(rows)
+
+        print(f"{title}, {args.page}-item pages")
+        query = measure("query: ORM objects", load_objects, args.page, args.repeat)
+        measure("query: columns only", lambda: db.query(*columns).limit(args.page).all(), args.page, args.repeat, query)
+        validation = measure("validate: from_orm", lambda: old_validate(objects), args.page, args.repeat)
+        measure("validate: model_validate on row dicts", lambda: validate(rows), args.page, args.repeat, validation)
+        render = measure("render: response_model round trip + json",
+                         lambda: (_variants.cache_clear(), fastapi_render(field, old_models)), args.page, args.repeat)
+        measure("render: model_dump + orjson", lambda: models_response(new_models).body, args.page, args.repeat, render)
+        total = measure("total: previous path", old_path, args.page, args.repeat)
+        measure("total: current path", new_path, args.page, args.repeat, total)
+        print()
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
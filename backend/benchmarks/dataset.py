@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Seeded dataset generator for benchmarks and load tests.
+
+Fills a database with users, shelters, dogs, external shelters, external dogs
+and foster applications. Distributions follow what the platform sees: most
+users are fosters, a few large shelters own most dogs, mixed breeds dominate,
+dogs are mostly young and available, and locations follow city population.
+The same seed always produces the same rows.
+
+Every user's password is PASSWORD. The first `reserved_fosters` fosters have
+no applications, so load tests can apply with them without hitting "already
+applied".
+
+Usage (from the backend directory; refuses a database that already has users):
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.dataset [--size medium] [--seed 42]
+"""
+
+import argparse
+import itertools
+import math
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.security import get_password_hash
+from app.models.dog import Dog, DogGender, DogSize, DogStatus
+from app.models.external_shelter import ExternalDog, ExternalShelter, ExternalShelterType
+from app.models.foster_application import ApplicationStatus, FosterApplication
+from app.models.user import ShelterStatus, User, UserType
+import app.services.geo  # noqa: F401  Geocodes locations on flush
+
+PASSWORD = "benchmark-password"
+BATCH = 1000
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+    users: int
+    shelters: int
+    dogs: int
+    external_shelters: int
+    external_dogs: int
+    applications: int
+    reserved_fosters: int = 100
+
+
+SIZES = {
+    "small": DatasetSize(users=200, shelters=10, dogs=500, external_shelters=5, external_dogs=500, applications=300),
+    "medium": DatasetSize(users=2000, shelters=50, dogs=5000, external_shelters=20, external_dogs=5000,
+                          applications=4000),
+    "large": DatasetSize(users=20000, shelters=300, dogs=50000, external_shelters=100, external_dogs=50000,
+                         applications=40000),
+}
+
+# (city, relative weight), roughly by population
+CITIES = [
+    ("Madrid", 30), ("Barcelona", 20), ("Valencia", 10), ("Sevilla", 8), ("Zaragoza", 6), ("Málaga", 6),
+    ("Murcia", 4), ("Palma", 4), ("Bilbao", 4), ("Alicante", 4), ("Córdoba", 3), ("Valladolid", 3),
+    ("Vigo", 3), ("Granada", 3), ("Oviedo", 2), ("Pamplona", 2), ("Santander", 2), ("Salamanca", 2),
+    ("Cádiz", 1), ("Toledo", 1),
+]
+
+# (breed, relative weight, size)
+BREEDS = [
+    ("Mestizo", 40, None), ("Podenco", 10, DogSize.MEDIUM), ("Galgo", 8, DogSize.LARGE),
+    ("Labrador Retriever", 5, DogSize.LARGE), ("Pastor Alemán", 4, DogSize.LARGE),
+    ("Bodeguero Andaluz", 4, DogSize.SMALL), ("Yorkshire Terrier", 3, DogSize.SMALL),
+    ("Chihuahua", 3, DogSize.SMALL), ("Beagle", 3, DogSize.MEDIUM), ("Border Collie", 3, DogSize.MEDIUM),
+    ("American Staffordshire", 3, DogSize.MEDIUM), ("Mastín Español", 2, DogSize.EXTRA_LARGE),
+    ("Setter Inglés", 2, DogSize.LARGE), ("Boxer", 2, DogSize.LARGE), ("Cocker Spaniel", 2, DogSize.MEDIUM),
+    ("Pinscher", 2, DogSize.SMALL), ("Husky Siberiano", 1, DogSize.LARGE), ("Gran Danés", 1, DogSize.EXTRA_LARGE),
+    ("Teckel", 1, DogSize.SMALL), ("Bretón", 1, DogSize.MEDIUM),
+]
+
+BREED_WEIGHTS = [weight for _, weight, _ in BREEDS]
+
+NAMES = [
+    "Luna", "Max", "Coco", "Rocky", "Nala", "Toby", "Lola", "Bruno", "Kira", "Thor", "Canela", "Simba",
+    "Maya", "Zeus", "Lía", "Rufo", "Chispa", "Duna", "Lúa", "Nico", "Trufa", "Odín", "Bimba", "Pipo",
+]
+
+STATUSES = [(DogStatus.AVAILABLE, 70), (DogStatus.FOSTERED, 15), (DogStatus.ADOPTED, 10), (DogStatus.MEDICAL_CARE, 5)]
+
+TRAITS = [
+    "Muy cariñosa con las personas.", "Pasea sin tirar de la correa.", "Necesita paciencia al principio.",
+    "Le encanta jugar con la pelota.", "Tranquilo en casa.", "Rescatado de la calle.",
+    "Ideal para familias con niños.", "Busca un hogar sin gatos.", "Sabe hacer sus necesidades fuera.",
+]
+
+LIVING_SITUATIONS = [
+    "Piso en ciudad, vivo solo.", "Casa con jardín y dos niños pequeños.", "Piso con terraza, tengo un gato.",
+    "Chalet con patio, ya tengo otro perro.", "Vivo en pareja en un piso sin mascotas.",
+    "Casa de campo con finca vallada, niños y perros.",
+]
+
+
+@dataclass
+class Dataset:
+    """What load tests need to know about the rows in the database"""
+    foster_emails: List[str]
+    reserved_foster_emails: List[str]
+    available_dog_ids: List[int]
+    points: Dict[str, Tuple[float, float]]
+    breeds: List[str] = field(default_factory=lambda: [breed for breed, _, _ in BREEDS])
+    cities: List[str] = field(default_factory=lambda: [city for city, _ in CITIES])
+
+
+def _weighted(rng: random.Random, pairs):
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _age_months(rng: random.Random) -> int:
+    # Log-normal: median around 2.5 years, long tail of seniors
+    return max(2, min(200, int(rng.lognormvariate(math.log(30), 0.8))))
+
+
+def _shelter_weights(count: int) -> List[float]:
+    # Zipf: a handful of large shelters hold most dogs
+    return [1 / (rank + 1) for rank in range(count)]
+
+
+def _add_batched(db, rows: list):
+    for start in range(0, len(rows), BATCH):
+        db.add_all(rows[start:start + BATCH])
+        db.flush()
+
+
+def generate(db, size: DatasetSize, seed: int = 42) -> Dataset:
+    """Insert a dataset of `size` rows, reproducible for a given seed"""
+    rng = random.Random(seed)
+    hashed_password = get_password_hash(PASSWORD)  # bcrypt once; every user shares it
+
+    admin = User(email="admin@bench.example", name="Admin", location="Madrid", user_type=UserType.ADMIN,
+                 hashed_password=hashed_password, is_verified=True)
+    shelters = [
+        User(email=f"shelter{i}@bench.example", name=f"Protectora {i}", location=_weighted(rng, CITIES),
+             user_type=UserType.SHELTER_ADMIN, shelter_status=ShelterStatus.APPROVED,
+             shelter_name=f"Protectora {i}", hashed_password=hashed_password, is_verified=True)
+        for i in range(size.shelters)
+    ]
+    fosters = [
+        User(email=f"foster{i}@bench.example", name=f"Acogida {i}", location=_weighted(rng, CITIES),
+             user_type=UserType.VOLUNTEER if rng.random() < 0.1 else UserType.FOSTER,
+             hashed_password=hashed_password, is_active=rng.random() > 0.02)
+        for i in range(max(0, size.users - size.shelters - 1))
+    ]
+    _add_batched(db, [admin] + shelters + fosters)
+    active_fosters = [user for user in fosters if user.is_active]
+
+    weights = _shelter_weights(len(shelters))
+    dogs = []
+    for i in range(size.dogs):
+        owner = rng.choices(shelters, weights=weights)[0] if shelters else None
+        breed, _, breed_size = rng.choices(BREEDS, weights=BREED_WEIGHTS)[0]
+        dogs.append(Dog(
+            name=rng.choice(NAMES), breed=breed, age=_age_months(rng), size=breed_size or rng.choice(list(DogSize)),
+            gender=rng.choice(list(DogGender)), weight=round(rng.uniform(3, 50), 1),
+            # Most dogs live where their shelter is
+            location=owner.location if owner and rng.random() < 0.8 else _weighted(rng, CITIES),
+            owner_id=owner.id if owner else None, status=_weighted(rng, STATUSES),
+            description=" ".join(rng.sample(TRAITS, 3)),
+            good_with_kids=rng.random() < 0.6, good_with_dogs=rng.random() < 0.7,
+            good_with_cats=rng.random() < 0.3, needs_yard=rng.random() < 0.2,
+            photos=[f"/uploads/photos/{i % 100:02d}/{i:08d}-{n}.jpg" for n in range(rng.choice([0, 1, 2, 2, 3, 4]))],
+        ))
+    _add_batched(db, dogs)
+    available_dog_ids = [dog.id for dog in dogs if dog.status == DogStatus.AVAILABLE]
+
+    external_shelters = [
+        ExternalShelter(name=f"Refugio externo {i}", website_url=f"https://refugio{i}.bench.example",
+                        integration_type=rng.choice(list(ExternalShelterType)), location=_weighted(rng, CITIES))
+        for i in range(size.external_shelters)
+    ]
+    _add_batched(db, external_shelters)
+    weights = _shelter_weights(len(external_shelters))
+    external_dogs = []
+    for i in range(size.external_dogs if external_shelters else 0):
+        shelter = rng.choices(external_shelters, weights=weights)[0]
+        breed = rng.choices(BREEDS, weights=BREED_WEIGHTS)[0][0]
+        photos = [f"https://refugio.bench.example/fotos/{i}-{n}.jpg" for n in range(rng.choice([0, 1, 2, 3]))]
+        external_dogs.append(ExternalDog(
+            external_shelter_id=shelter.id, external_id=str(i), name=rng.choice(NAMES), breed=breed,
+            age=_age_months(rng), size=rng.choice(["Pequeño", "Mediano", "Grande"]),
+            gender=rng.choice(["Macho", "Hembra"]), location=shelter.location,
+            description=" ".join(rng.sample(TRAITS, 2)), photos=photos,
+            original_url=f"{shelter.website_url}/perros/{i}", is_available=rng.random() < 0.85,
+        ))
+    _add_batched(db, external_dogs)
+
+    # Applications concentrate on popular dogs (Zipf); reserved fosters get none
+    applicants = active_fosters[size.reserved_fosters:]
+    popular = rng.sample(available_dog_ids, len(available_dog_ids))
+    pairs = set()
+    if applicants and popular:
+        cumulative = list(itertools.accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(popular))))
+        for dog_id in rng.choices(popular, cum_weights=cumulative, k=size.applications * 2):
+            pairs.add((rng.choice(applicants).id, dog_id))
+            if len(pairs) == size.applications:
+                break
+    applications = [
+        FosterApplication(user_id=user_id, dog_id=dog_id, living_situation=rng.choice(LIVING_SITUATIONS),
+                          message="Me gustaría acogerle.", availability=rng.choice(["Inmediata", "En un mes"]),
+                          status=_weighted(rng, [(ApplicationStatus.PENDING, 70), (ApplicationStatus.APPROVED, 15),
+                                                 (ApplicationStatus.REJECTED, 15)]))
+        for user_id, dog_id in sorted(pairs)
+    ]
+    _add_batched(db, applications)
+    db.commit()
+    return describe(db, size.reserved_fosters)
+
+
+def describe(db, reserved_fosters: int = SIZES["medium"].reserved_fosters) -> Dataset:
+    """Read back what load tests need, e.g. from a database seeded by an earlier run"""
+    fosters = db.query(User.email, User.id).filter(
+        User.user_type.in_([UserType.FOSTER, UserType.VOLUNTEER]), User.is_active == True
+    ).order_by(User.id).all()
+    applied = {user_id for user_id, in db.query(FosterApplication.user_id).distinct()}
+    dog_ids = db.query(Dog.id).filter(Dog.status == DogStatus.AVAILABLE).order_by(Dog.id).all()
+    located = db.query(Dog.location, Dog.latitude, Dog.longitude).filter(Dog.latitude.isnot(None)).distinct().all()
+    return Dataset(
+        foster_emails=[email for email, _ in fosters],
+        reserved_foster_emails=[email for email, user_id in fosters if user_id not in applied][:reserved_fosters],
+        available_dog_ids=[dog_id for dog_id, in dog_ids],
+        points={location: (latitude, longitude) for location, latitude, longitude in located},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=SIZES, default="medium")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from app.core.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    if db.query(User).count():
+        sys.exit(f"{engine.url} already has users; point DATABASE_URL at an empty database")
+    dataset = generate(db, SIZES[args.size], args.seed)
+    db.close()
+    print(f"Seeded {engine.url}: {SIZES[args.size]}, {len(dataset.available_dog_ids)} dogs available, "
+          f"password '{PASSWORD}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an external shelter website, for scraper benchmarks.
+
+One aiohttp app serves the same generated dogs in the three shapes the
+scrapers understand:
+
+    /perros              listing page, one a.dog-link per dog      (WebScraper)
+    /perros/{id}         detail page with the fields of one dog    (WebScraper)
+    /rss.xml             RSS 2.0 feed, "Raza: ..." lines per item   (RSSFeedScraper)
+    /api/dogs            JSON {"dogs": [...]}                       (APIScraper)
+    /fotos/{id}-{n}.jpg  a small JPEG, distinct per photo           (photo mirror)
+
+Size, latency, error rate and ETag behaviour are configurable. With ETags on,
+every response carries one and a matching If-None-Match gets a 304; the
+request counters show whether clients revalidate. `advance()` churns the data
+between rounds: some dogs change, some leave and new ones arrive.
+
+Usage (from the backend directory, to point a real shelter config at it):
+    python -m benchmarks.fake_shelter [--dogs 200] [--port 8081] [--latency-ms 20] [--error-rate 0.01]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from html import escape
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from aiohttp import web
+from PIL import Image, ImageDraw
+
+from benchmarks.dataset import BREEDS, BREED_WEIGHTS, CITIES, NAMES, TRAITS
+
+SIZE_LABELS = {"SMALL": "pequeño", "MEDIUM": "mediano", "LARGE": "grande", "EXTRA_LARGE": "muy grande"}
+
+
+@dataclass
+class FakeShelterConfig:
+    dogs: int = 200
+    photos_per_dog: int = 2
+    latency_ms: float = 0       # Added to every response
+    error_rate: float = 0       # Share of requests answered with a 500
+    etag: bool = True           # Send ETags and honour If-None-Match
+    churn: float = 0.1          # Share of dogs changed, and of dogs replaced, per advance()
+    seed: int = 42
+
+
+class FakeShelter:
+    """The generated dogs and the aiohttp app serving them"""
+
+    def __init__(self, config: FakeShelterConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.error_rng = random.Random(config.seed + 1)  # Apart, so errors don't shift the data
+        self.dogs: Dict[int, dict] = {}
+        self.next_id = 1
+        self.version = 0
+        self.stats: Counter = Counter()
+        self._photos: Dict[str, bytes] = {}
+        for _ in range(config.dogs):
+            self._add_dog()
+
+    # ----- Data -----
+
+    def _add_dog(self):
+        rng = self.rng
+        breed, _, size = rng.choices(BREEDS, weights=BREED_WEIGHTS)[0]
+        dog_id = self.next_id
+        self.next_id += 1
+        self.dogs[dog_id] = {
+            "id": dog_id,
+            "name": rng.choice(NAMES),
+            "breed": breed,
+            "age": f"{rng.randint(1, 12)} años" if rng.random() < 0.8 else f"{rng.randint(2, 11)} meses",
+            "size": SIZE_LABELS[size.name] if size else rng.choice(list(SIZE_LABELS.values())),
+            "gender": rng.choice(["macho", "hembra"]),
+            "weight": f"{rng.randint(3, 45)} kg",
+            "description": " ".join(rng.sample(TRAITS, 3)),
+            "medical_info": "Vacunado, desparasitado y con microchip.",
+            "behavior_notes": rng.choice(TRAITS),
+            "location": rng.choices([city for city, _ in CITIES], weights=[weight for _, weight in CITIES])[0],
+            "revision": 0,
+        }
+
+    def advance(self):
+        """Next round of the site: edit `churn` of the dogs, replace another `churn` with new ones"""
+        changes = min(int(len(self.dogs) * self.config.churn), len(self.dogs))
+        for dog_id in self.rng.sample(sorted(self.dogs), changes):
+            dog = self.dogs[dog_id]
+            dog["revision"] += 1
+            dog["description"] = " ".join(self.rng.sample(TRAITS, 3))
+        for dog_id in self.rng.sample(sorted(self.dogs), changes):
+            del self.dogs[dog_id]
+            self._add_dog()
+        self.version += 1
+
+    def photo_urls(self, dog: dict, origin: str = "") -> List[str]:
+        return [f"{origin}/fotos/{dog['id']}-{n}.jpg" for n in range(self.config.photos_per_dog)]
+
+    def photo(self, name: str) -> bytes:
+        """A 320x240 JPEG unique to `name`, so mirroring stores one file per photo"""
+        if name not in self._photos:
+            rng = random.Random(f"{self.config.seed}-{name}")
+            image = Image.new("RGB", (320, 240), tuple(rng.randrange(256) for _ in range(3)))
+            draw = ImageDraw.Draw(image)
+            for _ in range(6):
+                x, y = rng.randrange(300), rng.randrange(220)
+                draw.ellipse((x, y, x + rng.randint(20, 120), y + rng.randint(20, 120)),
+                             fill=tuple(rng.randrange(256) for _ in range(3)))
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=80)
+            self._photos[name] = buffer.getvalue()
+        return self._photos[name]
+
+    # ----- Rendering -----
+
+    def listing_html(self) -> str:
+        items = "".join(f'<li><a class="dog-link" href="/perros/{dog["id"]}">{escape(dog["name"])}</a></li>'
+                        for dog in self.dogs.values())
+        return f"<html><body><h1>Nuestros perros</h1><ul>{items}</ul></body></html>"
+
+    def detail_html(self, dog: dict) -> str:
+        fields = "".join(f'<span class="{name}">{escape(dog[name])}</span>'
+                         for name in ("breed", "age", "size", "gender", "weight", "location"))
+        photos = "".join(f'<img class="photo" src="{url}">' for url in self.photo_urls(dog))
+        return (f'<html><body><div class="dog"><h1 class="name">{escape(dog["name"])}</h1>{fields}'
+                f'<p class="description">{escape(dog["description"])}</p>'
+                f'<p class="medical">{escape(dog["medical_info"])}</p>'
+                f'<p class="behavior">{escape(dog["behavior_notes"])}</p>{photos}</div></body></html>')
+
+    def rss_xml(self, origin: str) -> str:
+        items = []
+        for dog in self.dogs.values():
+            summary = "\n".join([
+                dog["description"], f"Raza: {dog['breed']}", f"Edad: {dog['age']}", f"Sexo: {dog['gender']}",
+                f"Tamaño: {dog['size']}", f"Peso: {dog['weight']}", f"Ubicación: {dog['location']}",
+            ])
+            items.append(f"<item><title>{escape(dog['name'])}</title><link>{origin}/perros/{dog['id']}</link>"
+                         f"<guid isPermaLink=\"false\">{dog['id']}</guid>"
+                         f"<description>{escape(summary)}</description></item>")
+        return ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                f"<title>Protectora de pruebas</title><link>{origin}/</link>{''.join(items)}</channel></rss>")
+
+    def api_json(self, origin: str) -> dict:
+        return {"dogs": [
+            {**{key: value for key, value in dog.items() if key != "revision"},
+             "url": f"{origin}/perros/{dog['id']}", "photos": self.photo_urls(dog, origin)}
+            for dog in self.dogs.values()
+        ]}
+
+    # ----- HTTP -----
+
+    def _etag(self, kind: str, revision) -> str:
+        return '"' + hashlib.sha1(f"{self.config.seed}-{kind}-{revision}".encode()).hexdigest()[:16] + '"'
+
+    @web.middleware
+    async def _behaviour(self, request: web.Request, handler):
+        kind = request.match_info.route.name or "unmatched"
+        self.stats[f"{kind}_requests"] += 1
+        if self.config.latency_ms:
+            await asyncio.sleep(self.config.latency_ms / 1000)
+        if self.config.error_rate and self.error_rng.random() < self.config.error_rate:
+            self.stats[f"{kind}_errors"] += 1
+            raise web.HTTPInternalServerError(text="Error simulado")
+        if "If-None-Match" in request.headers:
+            self.stats[f"{kind}_conditional"] += 1
+        response = await handler(request)
+        if response.status == 304:
+            self.stats[f"{kind}_not_modified"] += 1
+        self.stats["bytes_sent"] += response.content_length or 0
+        return response
+
+    def _respond(self, request: web.Request, etag: str, build) -> web.StreamResponse:
+        if self.config.etag:
+            if request.headers.get("If-None-Match") == etag:
+                return web.Response(status=304, headers={"ETag": etag})
+            response = build()
+            response.headers["ETag"] = etag
+            return response
+        return build()
+
+    async def _listing(self, request):
+        return self._respond(request, self._etag("listing", self.version),
+                             lambda: web.Response(text=self.listing_html(), content_type="text/html"))
+
+    async def _detail(self, request):
+        dog = self.dogs.get(int(request.match_info["dog_id"]))
+        if dog is None:
+            raise web.HTTPNotFound()
+        return self._respond(request, self._etag(f"dog-{dog['id']}", dog["revision"]),
+                             lambda: web.Response(text=self.detail_html(dog), content_type="text/html"))
+
+    async def _rss(self, request):
+        origin = f"{request.scheme}://{request.host}"
+        return self._respond(request, self._etag("rss", self.version),
+                             lambda: web.Response(text=self.rss_xml(origin), content_type="application/rss+xml"))
+
+    async def _api(self, request):
+        origin = f"{request.scheme}://{request.host}"
+        return self._respond(request, self._etag("api", self.version),
+                             lambda: web.json_response(self.api_json(origin)))
+
+    async def _photo(self, request):
+        name = request.match_info["name"]
+        return self._respond(request, self._etag(f"photo-{name}", 0),
+                             lambda: web.Response(body=self.photo(name), content_type="image/jpeg"))
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._behaviour])
+        app.router.add_get("/perros", self._listing, name="listing")
+        app.router.add_get("/perros/{dog_id:\\d+}", self._detail, name="detail")
+        app.router.add_get("/rss.xml", self._rss, name="rss")
+        app.router.add_get("/api/dogs", self._api, name="api")
+        app.router.add_get("/fotos/{name}.jpg", self._photo, name="photo")
+        return app
+
+
+class FakeShelterServer:
+    """Serves a FakeShelter from a background thread with its own event loop.
+
+    The scrapers under test run on the caller's loop, and RSSFeedScraper blocks
+    it while feedparser downloads, so the server can't share that loop.
+    """
+
+    def __init__(self, shelter: FakeShelter, host: str = "127.0.0.1", port: int = 0):
+        self.shelter = shelter
+        self.host = host
+        self.port = port
+        self.base_url: Optional[str] = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fake-shelter", daemon=True)
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _start(self):
+        self._runner = web.AppRunner(self.shelter.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{self.host}:{port}"
+
+    def start(self) -> str:
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self.base_url
+
+    def advance(self):
+        """FakeShelter.advance, run on the server loop so no request sees half a round"""
+        async def advance():
+            self.shelter.advance()
+        asyncio.run_coroutine_threadsafe(advance(), self._loop).result()
+
+    def stop(self):
+        if self._runner is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dogs", type=int, default=200)
+    parser.add_argument("--photos", type=int, default=2, help="Photos per dog")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--no-etag", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    config = FakeShelterConfig(dogs=args.dogs, photos_per_dog=args.photos, latency_ms=args.latency_ms,
+                               error_rate=args.error_rate, etag=not args.no_etag, seed=args.seed)
+    print(f"Serving {args.dogs} dogs on http://{args.host}:{args.port} (/perros, /rss.xml, /api/dogs)")
+    web.run_app(FakeShelter(config).make_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Every test run gets a throwaway database and uploads directory, set before the app reads its settings
+WORKDIR = tempfile.mkdtemp(prefix="foster-dogs-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/test.db"
+os.environ["UPLOAD_DIR"] = WORKDIR
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def empty_database():
+    from app.core.database import Base, engine
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
@@ -0,0 +1,64 @@
+from app.core.database import SessionLocal
+from app.models.external_shelter import ExternalDog, ExternalShelter, ExternalShelterType
+from app.services.dedup import DedupService, collapse_duplicates
+
+
+def test_collapse_picks_the_representative_among_filtered_dogs(empty_database):
+    db = SessionLocal()
+    try:
+        shelter = ExternalShelter(
+            name="Perrera", website_url="https://perrera.example", integration_type=ExternalShelterType.API,
+        )
+        db.add(shelter)
+        db.flush()
+        first = ExternalDog(external_shelter_id=shelter.id, external_id="1", name="Kira", location="Sevilla")
+        copy = ExternalDog(external_shelter_id=shelter.id, external_id="2", name="Kira", location="Madrid")
+        db.add_all([first, copy])
+        db.flush()
+        first.cluster_id = copy.cluster_id = first.id
+        db.commit()
+
+        dogs = db.query(ExternalDog.id).filter(ExternalDog.is_available == True)
+        assert [row.id for row in collapse_duplicates(dogs).all()] == [first.id]
+        in_madrid = dogs.filter(ExternalDog.location.ilike("%madrid%"))
+        assert [row.id for row in collapse_duplicates(in_madrid).all()] == [copy.id]
+    finally:
+        db.close()
+
+
+def test_signatures_reach_the_index_on_commit_and_changed_dogs_leave_their_cluster(empty_database):
+    service = DedupService()
+    db = SessionLocal()
+    try:
+        shelter = ExternalShelter(
+            name="Perrera", website_url="https://perrera.example", integration_type=ExternalShelterType.API,
+        )
+        db.add(shelter)
+        db.commit()
+        description = "Perra muy cariñosa y tranquila, se lleva bien con niños y otros perros"
+
+        def add_dogs():
+            dogs = [
+                ExternalDog(external_shelter_id=shelter.id, external_id=key, name="Kira", breed="Mestiza", description=description)
+                for key in ("1", "2")
+            ]
+            db.add_all(dogs)
+            db.flush()
+            return dogs
+
+        assert service.deduplicate(db, add_dogs()) == 1
+        db.rollback()
+        assert len(service.index) == 0
+
+        first, copy = add_dogs()
+        assert service.deduplicate(db, [first, copy]) == 1
+        db.commit()
+        assert set(service.index.signatures) == {first.id, copy.id}
+        assert first.cluster_id == copy.cluster_id == first.id
+
+        first.description = "Macho joven y enérgico que necesita paseos largos y una familia activa"
+        assert service.deduplicate(db, [first]) == 0
+        db.commit()
+        assert first.cluster_id is None and copy.cluster_id is None
+    finally:
+        db.close()
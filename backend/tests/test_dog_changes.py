@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+import app.main  # noqa: F401  (registers the change log listeners)
+from app.core.database import SessionLocal
+from app.models.change_log import ChangeLogEntry
+from app.models.dog import Dog
+from app.services.dog_changes import dog_changes_service
+
+
+def test_changes_include_the_watermark_second(empty_database):
+    db = SessionLocal()
+    try:
+        dog = Dog(name="Luna")
+        db.add(dog)
+        db.commit()
+        created_at = dog.created_at.replace(tzinfo=None)
+
+        changes = dog_changes_service.changes(db, created_at, limit=10)
+        assert [row.id for row in changes.dogs] == [dog.id]
+        assert not dog_changes_service.changes(db, created_at + timedelta(seconds=1), limit=10).dogs
+
+        dog_id = dog.id
+        db.delete(dog)
+        db.commit()
+        deleted_at = db.query(ChangeLogEntry.changed_at).filter(ChangeLogEntry.action == "deleted").scalar()
+
+        changes = dog_changes_service.changes(db, deleted_at.replace(tzinfo=None), limit=10)
+        assert changes.removed == [{"type": "local", "id": dog_id, "reason": "deleted"}]
+    finally:
+        db.close()
@@ -0,0 +1,42 @@
+import csv
+import io
+import json
+
+from app.core.database import SessionLocal
+from app.models.external_shelter import ExternalDog, ExternalShelter, ExternalShelterType
+from app.services.change_log import change_log
+from app.services.dog_transfer import dog_transfer_service
+
+
+def export(format, updated_since):
+    return b"".join(dog_transfer_service.export_external_dogs(format, updated_since)).decode()
+
+
+def test_incremental_export_includes_the_watermark_second_and_deletions(empty_database):
+    db = SessionLocal()
+    try:
+        shelter = ExternalShelter(
+            name="Perrera", website_url="https://perrera.example", integration_type=ExternalShelterType.API,
+        )
+        db.add(shelter)
+        db.flush()
+        kept, gone = (ExternalDog(external_shelter_id=shelter.id, external_id=name, name=name) for name in ("Kira", "Toby"))
+        db.add_all([kept, gone])
+        db.commit()
+        since = kept.created_at.replace(tzinfo=None)
+
+        dogs = db.query(ExternalDog).filter(ExternalDog.id == gone.id)
+        change_log.forget(db, dogs)
+        dogs.delete()
+        db.commit()
+
+        records = [json.loads(line) for line in export("ndjson", since).splitlines()]
+        assert [(record["id"], record["deleted"]) for record in records] == [(kept.id, False), (gone.id, True)]
+        assert records[1] == {"id": gone.id, "is_available": False, "deleted": True}
+
+        rows = list(csv.DictReader(io.StringIO(export("csv", since))))
+        assert [(row["id"], row["deleted"]) for row in rows] == [(str(kept.id), "false"), (str(gone.id), "true")]
+
+        assert "deleted" not in json.loads(export("ndjson", None))
+    finally:
+        db.close()
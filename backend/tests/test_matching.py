@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.dog import Dog
+from app.schemas.dog import DogCreate
+from app.services.matching import (
+    CATS, CONFLICT_PENALTY, DOGS, KIDS, KNOWN_SHIFT, YARD, FosterProfile, local_features, mentions,
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Se lleva bien con perros, no con gatos", {DOGS: True, CATS: False}),
+    ("No tengo jardín pero tengo dos perros y un niño", {YARD: False, DOGS: True, KIDS: True}),
+    ("Good with dogs but not with cats", {DOGS: True, CATS: False}),
+    ("No se lleva bien con otros perros", {DOGS: False}),
+    ("Ideal para familias con niños. Nunca ha vivido con gatos", {KIDS: True, CATS: False}),
+    ("Perros y gatos sin problema", {DOGS: True, CATS: True}),
+    ("Piso sin terraza", {YARD: None, KIDS: None}),
+])
+def test_negation_only_reaches_its_clause(text, expected):
+    assert {trait: mentions(text, trait) for trait in expected} == expected
+
+
+def test_foster_with_kids_but_no_yard():
+    profile = FosterProfile.from_text("No tengo jardín pero tengo dos perros y un niño")
+    assert (profile.has_kids, profile.has_dogs, profile.has_yard) == (True, True, False)
+
+
+def test_unknown_local_traits_are_not_conflicts():
+    dog = SimpleNamespace(good_with_kids=None, good_with_dogs=True, good_with_cats=False, needs_yard=None)
+    features = local_features(dog)
+
+    assert not features & (1 << (KIDS + KNOWN_SHIFT))
+    assert not features & (1 << (YARD + KNOWN_SHIFT))
+    assert features & (1 << (CATS + KNOWN_SHIFT)) and not features & (1 << CATS)
+
+    scores = FosterProfile(has_kids=True, has_dogs=True).score_table()
+    assert scores[features] > 0
+    assert scores[local_features(SimpleNamespace(
+        good_with_kids=False, good_with_dogs=True, good_with_cats=None, needs_yard=None,
+    ))] <= CONFLICT_PENALTY / 2
+
+
+def test_unset_flags_of_a_created_dog_stay_unknown():
+    dog = Dog(**DogCreate(name="Kira", good_with_dogs=True).model_dump())
+    features = local_features(dog)
+
+    assert dog.good_with_kids is None and dog.good_with_cats is None
+    assert not features & (1 << (KIDS + KNOWN_SHIFT))
+    assert not features & (1 << (CATS + KNOWN_SHIFT))
+    assert FosterProfile(has_kids=True, has_cats=True).score_table()[features] >= 0
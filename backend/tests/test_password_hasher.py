@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.security import PasswordHasher, PasswordHasherBusy
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiters_give_their_queue_slot_back():
+    hasher = PasswordHasher(workers=1, max_queue=3)
+    release = threading.Event()
+    calls = []
+
+    def hash_job(name):
+        calls.append(name)
+        if name == "blocker":
+            release.wait(5)
+        return name
+
+    try:
+        blocker = asyncio.create_task(hasher.run(hash_job, "blocker"))
+        await wait_for(lambda: hasher.running == 1)
+
+        waiting = [asyncio.create_task(hasher.run(hash_job, f"waiting-{i}")) for i in range(2)]
+        await wait_for(lambda: hasher.queued == 2)
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        assert hasher.queued == 0
+
+        release.set()
+        assert await blocker == "blocker"
+        assert await hasher.run(hash_job, "after") == "after"
+        assert calls == ["blocker", "after"]
+        assert hasher.stats()["queued"] == 0
+    finally:
+        release.set()
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_and_recovers():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        blocker = asyncio.create_task(hasher.run(release.wait, 5))
+        await wait_for(lambda: hasher.running == 1)
+        queued = asyncio.create_task(hasher.run(lambda: "queued"))
+        await wait_for(lambda: hasher.queued == 1)
+
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.run(lambda: "rejected")
+
+        release.set()
+        await blocker
+        assert await queued == "queued"
+        assert await hasher.run(lambda: "later") == "later"
+        assert hasher.queued == 0
+    finally:
+        release.set()
+        hasher.shutdown()
@@ -0,0 +1,32 @@
+"""Query budgets of the list endpoints (see benchmarks/bench_queries.py), so N+1 regressions fail CI"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.main import app
+from benchmarks.bench_queries import BUDGETS, measure, seed
+
+SMALL = 5
+LARGE = 50
+
+
+@pytest.fixture(scope="module")
+def headers():
+    from app.core.database import Base, engine
+    Base.metadata.drop_all(bind=engine)
+    return seed(LARGE)
+
+
+@pytest.mark.parametrize("template, budget", list(BUDGETS.items()), ids=list(BUDGETS))
+def test_query_budget(template, budget, headers):
+    async def counts():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            few = await measure(client, template.format(n=SMALL), headers)
+            many = await measure(client, template.format(n=LARGE), headers)
+        return few, many
+
+    few, many = asyncio.run(counts())
+    statements = "\n".join(many.statements)
+    assert many.count == few.count, f"query count grows with the page size (N+1):\n{statements}"
+    assert many.count <= budget, f"{many.count} queries, budget {budget}:\n{statements}"
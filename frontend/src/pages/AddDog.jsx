@@ -47,7 +47,12 @@ const AddDog = () => {
         ...formData,
         age: formData.age ? parseInt(formData.age) : null,
         weight: formData.weight ? parseFloat(formData.weight) : null,
-        photos: formData.photos ? formData.photos.split(',').map(url => url.trim()) : []
+        photos: formData.photos ? formData.photos.split(',').map(url => url.trim()) : [],
+        // An unchecked box means "not stated", not "no"
+        good_with_kids: formData.good_with_kids || null,
+        good_with_dogs: formData.good_with_dogs || null,
+        good_with_cats: formData.good_with_cats || null,
+        needs_yard: formData.needs_yard || null
       }
 
       await api.post('/dogs/', dogData)
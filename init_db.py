@@ -17,7 +17,7 @@ else:
     sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 
 try:
-    from sqlalchemy import create_engine, text
+    from sqlalchemy import create_engine, text, inspect
     from app.core.config import settings
     from app.core.database import Base
     from app.models import User, Dog, FosterApplication, ExternalShelter, ExternalDog
@@ -39,6 +39,9 @@ def create_tables():
         Base.metadata.create_all(bind=engine)
         print("✅ Tables created successfully!")
         
+        # Existing tables are skipped by create_all, so add any new columns
+        add_missing_columns(engine)
+        
         # Add any necessary initial data
         with engine.connect() as connection:
             # Check if we need to add any default data
@@ -50,6 +53,81 @@ def create_tables():
     
     return True
 
+def add_missing_columns(engine):
+    """Add columns and indexes defined in the models but missing from existing tables"""
+    
+    inspector = inspect(engine)
+    
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    print(f"  ➕ Added column {table.name}.{column.name}")
+            
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+def normalize_dog_photos():
+    """Rewrite dogs.photos values stored before it became a JSON column"""
+    
+    import json
+    
+    engine = create_engine(settings.DATABASE_URL)
+    fixed = 0
+    
+    with engine.begin() as connection:
+        rows = connection.execute(text("SELECT id, photos FROM dogs WHERE photos IS NOT NULL")).all()
+        for dog_id, photos in rows:
+            try:
+                value = json.loads(photos)
+            except (TypeError, ValueError):
+                value = photos  # A bare URL or an empty string
+            if isinstance(value, list):
+                continue
+            value = [value] if isinstance(value, str) and value.strip() else None
+            connection.execute(
+                text("UPDATE dogs SET photos = :photos WHERE id = :id"),
+                {"photos": json.dumps(value) if value else None, "id": dog_id}
+            )
+            fixed += 1
+    
+    if fixed:
+        print(f"  🖼️  dogs: {fixed} photo lists converted to JSON")
+
+def backfill_geocoding():
+    """Geocode locations of rows created before latitude/longitude existed"""
+    
+    from sqlalchemy.orm import sessionmaker
+    from app.services.geo import apply_geocoding
+    
+    engine = create_engine(settings.DATABASE_URL)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    db = SessionLocal()
+    
+    try:
+        for model in (User, Dog, ExternalShelter, ExternalDog):
+            rows = db.query(model).filter(
+                model.location.isnot(None),
+                model.latitude.is_(None)
+            ).all()
+            
+            located = sum(1 for row in rows if apply_geocoding(row))
+            db.commit()
+            
+            if rows:
+                print(f"  📍 {model.__tablename__}: {located}/{len(rows)} locations geocoded")
+        
+    except Exception as e:
+        print(f"❌ Error geocoding locations: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
 def add_sample_external_shelter():
     """Add a sample external shelter for testing"""
     
@@ -113,6 +191,11 @@ if __name__ == "__main__":
     
     # Create tables
     if create_tables():
+        normalize_dog_photos()
+        
+        print("\n📍 Geocoding existing locations...")
+        backfill_geocoding()
+        
         print("\n📝 Adding sample data...")
         add_sample_external_shelter()
         